@@ -1,24 +1,55 @@
-import importlib.util
+import asyncio
+import atexit
 import json
 import os
 import sys
+import time
 
-from argparse import ArgumentParser
-from random import random, randint, seed
+from argparse import ArgumentParser, ArgumentTypeError
+from random import Random
 
-from action import Action, NOTHING, run_turn
+import benchmark
+import cache
+import campaign
+from checkpoint import checkpoint, read_checkpoint, restore, write_checkpoint
 from character import new_character
-from cli import CliDisplay
-from randomizer import randomize_species
-from world import World
+
+from cli import BufferedDisplay, CliDisplay, FileDisplay, NullDisplay
+from env import BATTLE, DROP, ENCOUNTER, EXPLORE, STARTER, QuestEnv
+from events import LEVELS, create_sink
+from generator import FORMATS, JSONL_FORMAT, generate_worlds, write_worlds
+from instrument import STDERR, Profile
+from logic import RANDOM_LOGIC, load_logic
+from randomizer import randomize_world
+from replay import create_replay, logic_rng, read_replay, replay_env, replay_logic, run_replay, verify_replay, write_replay
+from rng import new_seed
+from server import DEFAULT_ADDRESS, GameServer
+from simulator import ENGINES, MAX_TURNS, REFERENCE_ENGINE, format_combatant, format_summary, parse_matchup, simulate, summarize
+from tournament import CACHE_SUFFIX, format_matrix, run_tournament
 
 
 CLI_DISPLAY = 'cli'
+BUFFERED_DISPLAY = 'buffered'
+FILE_DISPLAY = 'file'
+NULL_DISPLAY = 'null'
+SERVER_DISPLAY = 'server'
+SIMULATE_COMMAND = 'simulate'
+COMPILE_COMMAND = 'compile-world'
+TOURNAMENT_COMMAND = 'tournament'
+SOLVE_COMMAND = 'solve'
+GENERATE_COMMAND = 'generate'
+BENCHMARK_COMMAND = 'benchmark'
+REPLAY_COMMAND = 'replay'
+CAMPAIGN_COMMAND = 'campaign'
+RESULTS_COMMAND = 'results'
 DEFAULT_WORLD = os.path.join(os.path.dirname(__file__), 'test_world.json')
 
 
-def choose(choices):
-    return randint(0, len(choices) - 1)
+def positive_int(value):
+    number = int(value)
+    if number < 1:
+        raise ArgumentTypeError(f'{value} is not at least 1')
+    return number
 
 
 def parse_args():
@@ -31,7 +62,19 @@ def parse_args():
         '--display',
         type=str,
         default=CLI_DISPLAY,
-        choices=[CLI_DISPLAY], help='where to display the game')
+        choices=[CLI_DISPLAY, BUFFERED_DISPLAY, FILE_DISPLAY, NULL_DISPLAY, SERVER_DISPLAY],
+        help='where to display the game. buffered writes to the terminal in bulk, file writes to --output, null shows nothing and the server hosts many games over a socket')
+    parser.add_argument(
+        '-o',
+        '--output',
+        type=str,
+        default=None,
+        help='the file for the file display')
+    parser.add_argument(
+        '--address',
+        type=str,
+        default=DEFAULT_ADDRESS,
+        help='host:port or unix:path for the server to listen on')
     parser.add_argument(
         '-w',
         '--world',
@@ -42,180 +85,546 @@ def parse_args():
     parser.add_argument(
         '--logic',
         default=None,
-        choices=['random', 'file.py'],
-        help='how the player is controlled, which is manual by default. a python file can be provided for decisions making')
+        metavar='{random,mcts[:options],file.py,exec:command}',
+        help='how the player is controlled, which is manual by default. a python file can be provided for decisions making, or a command that speaks the pipe protocol. mcts searches each battle decision and takes options like mcts:rollouts=1000,time=0.5,workers=4,depth=50')
     parser.add_argument(
         '--randomize',
         action='store_true',
         help='randomizes the world')
     parser.add_argument('--seed', default=None, help='randomization seed')
+    parser.add_argument(
+        '--record',
+        type=str,
+        default=None,
+        metavar='FILE',
+        help='records the game as a compact replay of its seed and decisions')
+    parser.add_argument(
+        '--save',
+        type=str,
+        default=None,
+        metavar='FILE',
+        help='saves the game if it stops before it is over, as json if the file ends in .json')
+    parser.add_argument(
+        '--resume',
+        type=str,
+        default=None,
+        metavar='FILE',
+        help='carries on a game saved with --save')
+    parser.add_argument(
+        '--log-level',
+        type=str,
+        default='debug',
+        choices=list(LEVELS),
+        help='how much of each battle to show')
+    parser.add_argument(
+        '--profile',
+        action='store_true',
+        help='counts and times turns, actions, effects, level ups, rng calls and display writes, printing a table at exit')
+    parser.add_argument(
+        '--profile-output',
+        type=str,
+        default=STDERR,
+        metavar='FILE.json',
+        help='writes the profile counters to a json file instead')
+
+    commands = parser.add_subparsers(dest='command')
+    commands.add_parser(
+        COMPILE_COMMAND,
+        help='validates the world and writes a compiled cache next to it for faster starts')
+    simulate_parser = commands.add_parser(
+        SIMULATE_COMMAND,
+        help='runs headless battles across all cores')
+    simulate_parser.add_argument(
+        'matchups',
+        nargs='+',
+        type=parse_matchup,
+        metavar='species:level[:logic],species:level[:logic]',
+        help='the player and enemy of each matchup')
+    simulate_parser.add_argument(
+        '-n',
+        '--battles',
+        type=int,
+        default=1000,
+        help='how many battles to run for each matchup')
+    simulate_parser.add_argument(
+        '-p',
+        '--processes',
+        type=int,
+        default=None,
+        help='how many worker processes to use, which is every core by default')
+    simulate_parser.add_argument(
+        '-e',
+        '--engine',
+        type=str,
+        default=REFERENCE_ENGINE,
+        choices=ENGINES,
+        help='which battle engine to use. the numpy engine runs a whole chunk of battles at once')
+    simulate_parser.add_argument(
+        '--store',
+        type=str,
+        default=None,
+        metavar='DIRECTORY',
+        help='appends every battle to a columnar results store')
+
+    solve_parser = commands.add_parser(
+        SOLVE_COMMAND,
+        help='computes the exact outcome of battles between random logics')
+    solve_parser.add_argument(
+        'matchups',
+        nargs='+',
+        type=parse_matchup,
+        metavar='species:level,species:level',
+        help='the player and enemy of each matchup')
+    solve_parser.add_argument(
+        '-t',
+        '--max-turns',
+        type=int,
+        default=MAX_TURNS,
+        help='the number of turns before a battle is a draw')
+    solve_parser.add_argument(
+        '--optimal',
+        action='store_true',
+        help='also solves for the player choices with the best chance to win')
+
+    generate_parser = commands.add_parser(
+        GENERATE_COMMAND,
+        help='writes many randomized copies of the world, each reproducible from the seed and its index')
+    generate_parser.add_argument(
+        'destination',
+        help='the jsonl file, or the directory for world files')
+    generate_parser.add_argument(
+        '-n',
+        '--count',
+        type=int,
+        default=1000,
+        help='how many worlds to generate')
+    generate_parser.add_argument(
+        '-f',
+        '--format',
+        type=str,
+        default=JSONL_FORMAT,
+        choices=FORMATS,
+        help='one world per line, or one world file each')
+    generate_parser.add_argument(
+        '--new-actions',
+        type=int,
+        default=0,
+        help='how many new random actions to add to each world')
+    generate_parser.add_argument(
+        '-p',
+        '--processes',
+        type=int,
+        default=None,
+        help='how many worker processes to use, which is every core by default')
+
+    results_parser = commands.add_parser(
+        RESULTS_COMMAND,
+        help='shows the win rates, battle lengths and action usage kept by a results store')
+    results_parser.add_argument('store', help='the results store directory')
+
+    campaign_parser = commands.add_parser(
+        CAMPAIGN_COMMAND,
+        help='plays whole games headless across all cores with --logic, which is random by default, and reports how long they survive')
+    campaign_parser.add_argument(
+        '-n',
+        '--runs',
+        type=int,
+        default=1000,
+        help='how many games to play')
+    campaign_parser.add_argument(
+        '-c',
+        '--columns',
+        type=str,
+        default=None,
+        metavar='FILE.npz',
+        help='writes the stats of every run and the levels of every battle to a numpy file')
+    campaign_parser.add_argument(
+        '--max-battles',
+        type=positive_int,
+        default=campaign.MAX_BATTLES,
+        help='the number of battles a run stops at if it survives them')
+    campaign_parser.add_argument(
+        '-p',
+        '--processes',
+        type=int,
+        default=None,
+        help='how many worker processes to use, which is every core by default')
+    campaign_parser.add_argument(
+        '--json',
+        action='store_true',
+        help='prints the summary as json')
+
+    replay_parser = commands.add_parser(
+        REPLAY_COMMAND,
+        help='plays a recorded game back, checking it plays out the same way')
+    replay_parser.add_argument('replay', help='the recorded replay file')
+    replay_parser.add_argument(
+        '--at',
+        type=int,
+        default=None,
+        metavar='DECISION',
+        help='fast forwards to this decision and shows the rest of the game, instead of playing it all back silently')
+
+    benchmark_parser = commands.add_parser(
+        BENCHMARK_COMMAND,
+        help='times the engine hot paths and flags regressions against a baseline')
+    benchmark_parser.add_argument(
+        'benchmarks',
+        nargs='*',
+        metavar='benchmark',
+        help=f"which benchmarks to run out of {', '.join(benchmark.BENCHMARKS)}, which is all of them by default")
+    benchmark_parser.add_argument(
+        '--history',
+        type=str,
+        default=benchmark.HISTORY_FILE,
+        help='the json file runs are recorded in')
+    benchmark_parser.add_argument(
+        '--baseline',
+        action='store_true',
+        help='makes this run the baseline later runs are compared against')
+    benchmark_parser.add_argument(
+        '-t',
+        '--threshold',
+        type=float,
+        default=benchmark.THRESHOLD,
+        help='how much slower than the baseline counts as a regression')
+    benchmark_parser.add_argument(
+        '-r',
+        '--repeat',
+        type=int,
+        default=benchmark.REPEAT,
+        help='how many times to run each benchmark, keeping the best')
+
+    tournament_parser = commands.add_parser(
+        TOURNAMENT_COMMAND,
+        help='computes the win rate of every species against every species')
+    tournament_parser.add_argument(
+        '-l',
+        '--levels',
+        type=int,
+        nargs='+',
+        default=[5],
+        help='the levels both sides fight at')
+    tournament_parser.add_argument(
+        '-n',
+        '--battles',
+        type=int,
+        default=1000,
+        help='how many battles to run for each cell')
+    tournament_parser.add_argument(
+        '--player-logic',
+        default=RANDOM_LOGIC,
+        help='the logic of the row species')
+    tournament_parser.add_argument(
+        '--enemy-logic',
+        default=RANDOM_LOGIC,
+        help='the logic of the column species')
+    tournament_parser.add_argument(
+        '-c',
+        '--cache',
+        type=str,
+        default=None,
+        help=f'where to cache cell results, which is the world file plus {CACHE_SUFFIX} by default')
+    tournament_parser.add_argument(
+        '-p',
+        '--processes',
+        type=int,
+        default=None,
+        help='how many worker processes to use, which is every core by default')
+    tournament_parser.add_argument(
+        '-e',
+        '--engine',
+        type=str,
+        default=REFERENCE_ENGINE,
+        choices=ENGINES,
+        help='which battle engine to use')
+    tournament_parser.add_argument(
+        '--json',
+        action='store_true',
+        help='prints every cell with its confidence interval as json')
     return parser.parse_args()
 
 
-def create_world(args):
-    if args.generate:
-        return
-        # if args.world_file != DEFAULT_WORLD:
-        #     with open(args.world_file, 'w') as f:
-        #         json.dump(world_dict, f)
-    else:
-        with open(args.world_file, 'r') as f:
-            world_dict = json.load(f)
-        world = World(
-            species=[{
-                'name': species['name'],
-                'attributes': species['attributes'],
-                # TODO: json can't have dicts of ints -> obj
-                'actions': {int(k): v for k, v in species['actions'].items()}
-            } for species in world_dict['species']],
-            actions={action.name: action for action in map(
-                Action.from_dict, world_dict['actions'])}
-        )
+def create_display(args, rng, world):
+    logic = load_logic(args.logic, rng, world)
 
-    if args.randomize is not None:
-        world = World(
-            [randomize_species(s, world.actions) for s in world.species],
-            world.actions,
+    if args.display == CLI_DISPLAY:
+        return CliDisplay(logic=logic)
+    elif args.display == BUFFERED_DISPLAY:
+        return BufferedDisplay(logic=logic)
+    elif args.display == FILE_DISPLAY:
+        if args.output is None:
+            raise ValueError('the file display needs --output')
+        return FileDisplay(args.output, logic=logic)
+    elif args.display == NULL_DISPLAY:
+        return NullDisplay(logic=logic)
+
+
+def play(env, display, name=None, decisions=None):
+    """ Plays a whole game, making every decision through the display and appending it to decisions if given. """
+    env.reset(name)
+    resume(env, display, decisions)
+
+
+def resume(env, display, decisions=None, count=None):
+    """ Plays the rest of a game through the display, or only count more decisions. """
+    while not env.done and count != 0:
+        if count is not None:
+            count -= 1
+        phase = env.phase
+        if phase == STARTER:
+            display.display_log('Choose a starter')
+            choice = display.display_choice(env.legal_actions())
+        elif phase == BATTLE:
+            choice = display.display_battle(env.player, env.enemy)
+        elif phase == DROP:
+            display.display_character(env.player)
+            display.display_log('Please drop an action')
+            choice = display.display_choice(
+                env.legal_actions(), env.player)
+        elif phase == EXPLORE:
+            display.display_character(env.player)
+            choice = display.display_choice(
+                env.legal_actions(), env.player)
+        elif phase == ENCOUNTER:
+            display.display_battle_frame(env.player, env.enemy)
+            choice = display.display_choice(
+                env.legal_actions(), env.player, env.enemy)
+        env.advance(choice)
+        if decisions is not None:
+            decisions.append(choice)
+        if phase != STARTER and phase != DROP:
+            display.display_blank()
+
+
+def run_simulation(args, world):
+    seed = args.seed if args.seed is not None else str(new_seed())
+    print(f'seed: {seed}')
+    store = None
+    if args.store is not None:
+        # numpy is only needed for the results store
+        from results import ResultStore
+        store = ResultStore(args.store)
+    results = simulate(world, args.matchups, args.battles,
+                       args.processes, engine=args.engine, seed=seed, details=store is not None)
+    if store is not None:
+        from results import store_results
+        results = store_results(store, args.matchups, results)
+    try:
+        summary = summarize(args.matchups, results)
+    finally:
+        if store is not None:
+            store.close()
+    for line in format_summary(args.matchups, summary):
+        print(line)
+
+
+def run_results(args):
+    from results import ResultStore, format_store
+
+    for line in format_store(ResultStore(args.store, read_only=True)):
+        print(line)
+
+
+def run_solve(args, world):
+    # numpy is only needed for the solver
+    from solver import BattleSolver
+
+    for player, enemy in args.matchups:
+        if player['logic'] != RANDOM_LOGIC or enemy['logic'] != RANDOM_LOGIC:
+            raise ValueError('the solver only supports random logic')
+        player_species = world.find_species(player['species'])
+        enemy_species = world.find_species(enemy['species'])
+        solver = BattleSolver(
+            new_character(player_species, level=player['level'],
+                          table=world.level_table(player_species)),
+            new_character(enemy_species, level=enemy['level'],
+                          table=world.level_table(enemy_species)),
+            world.table,
         )
+        outcomes = [('', solver.evaluate(max_turns=args.max_turns))]
+        if args.optimal:
+            outcomes.append(('OPTIMAL ', solver.optimal_policy(max_turns=args.max_turns)[1]))
+        for label, outcome in outcomes:
+            print(' '.join([
+                f'{label}{format_combatant(player)} vs {format_combatant(enemy)}',
+                f"WIN:{outcome['win']:.6f} LOSS:{outcome['loss']:.6f} DRAW:{outcome['draw']:.6f}",
+                f"TURNS:{outcome['turns']:.2f} STATES:{outcome['states']}",
+            ]))
+
+
+def run_generate(args, world):
+    seed = args.seed if args.seed is not None else str(new_seed())
+    print(f'seed: {seed}')
+    worlds = generate_worlds(world, args.count, seed,
+                             args.processes, args.new_actions)
+    count = write_worlds(worlds, args.destination, args.format)
+    print(f'generated {count} worlds into {args.destination}')
+
+
+def run_tournament_command(args, world):
+    cells, computed = run_tournament(
+        world,
+        args.levels,
+        args.battles,
+        args.player_logic,
+        args.enemy_logic,
+        args.cache if args.cache is not None else args.world_file + CACHE_SUFFIX,
+        args.processes,
+        args.engine,
+        args.seed if args.seed is not None else 0,
+    )
+    if args.json:
+        print(json.dumps(cells, indent=2))
+        return
+    print(f'computed {computed} of {len(cells)} cells')
+    for line in format_matrix(world, cells):
+        print(line)
+
+
+def run_campaign(args, world):
+    seed = args.seed if args.seed is not None else str(new_seed())
+    print(f'seed: {seed}')
+    logic = args.logic if args.logic is not None else RANDOM_LOGIC
+    columns = campaign.CampaignColumns()
+    for stats in campaign.simulate_campaigns(world, args.runs, logic, seed, args.processes, args.max_battles):
+        columns.append(stats)
+    if args.columns is not None:
+        campaign.write_campaigns(args.columns, columns)
+    summary = campaign.summarize_campaigns(columns.arrays())
+    if args.json:
+        print(json.dumps(summary, indent=2))
+        return
+    for line in campaign.format_campaigns(summary):
+        print(line)
 
-    return world
 
+def run_replay_command(args, world):
+    replay = read_replay(args.replay)
+    if args.at is None:
+        start = time.perf_counter()
+        env = run_replay(world, replay)
+        seconds = time.perf_counter() - start
+        print(f"replayed {len(replay['decisions'])} decisions and {env.battles} battles in {seconds:.4f}s")
+        return
+
+    if not 0 <= args.at <= len(replay['decisions']):
+        raise ValueError(
+            f"--at must be between 0 and the replay's {len(replay['decisions'])} decisions")
+    env = replay_env(world, replay)
+    for decision in replay['decisions'][:args.at]:
+        env.advance(decision)
+    remaining = replay['decisions'][args.at:]
+    display = CliDisplay(logic=replay_logic(remaining))
+    env.events = create_sink(display, args.log_level)
+    try:
+        resume(env, display, count=len(remaining))
+    finally:
+        display.close()
+    verify_replay(env, replay)
+
+
+def run_benchmark(args):
+    history = benchmark.load_history(args.history)
+    run = benchmark.run_benchmarks(
+        args.world_file, args.benchmarks, args.repeat)
+    baseline = history['baseline']
+    regressions = benchmark.compare(
+        run, baseline, args.threshold) if baseline is not None else {}
+    for line in benchmark.format_run(run, baseline, regressions):
+        print(line)
+
+    history['runs'].append(run)
+    if args.baseline:
+        history['baseline'] = run
+    benchmark.save_history(args.history, history)
+    if regressions:
+        sys.exit(f"regressed: {', '.join(regressions)}")
 
-def create_display(args):
-    if args.logic is None:
-        logic = None
-    elif args.logic == 'random':
-        logic = choose
-    elif os.path.exists(args.logic) and os.path.splitext(args.logic)[-1] == 'py':
-        spec = importlib.util.spec_from_file_location(
-            'auto_quest.logic', args.logic)
-        logic = importlib.util.module_from_spec(spec)
-        sys.modules['auto_quest.logic'] = logic
-        spec.loader.exec_module(logic)
-        logic = logic.choose
 
-    if args.display == 'cli':
-        return CliDisplay(logic=logic)
+def main():
+    args = parse_args()
 
+    if args.profile:
+        profile = Profile()
+        profile.install()
+        atexit.register(profile.dump, args.profile_output)
 
-def battle(player, enemy, actions, display):
-    logs = []
-    while player.health > 0 and enemy.health > 0:
-        display.display_log(f'Turn {len(logs) + 1}')
-        choice = display.display_battle(player, enemy)
+    if args.command == RESULTS_COMMAND:
+        run_results(args)
+        return
+    if args.command == COMPILE_COMMAND:
+        print(f'compiled {cache.compile_world(args.world_file)}')
+        return
+    if args.command == BENCHMARK_COMMAND:
+        run_benchmark(args)
+        return
 
-        player_action = actions[player.actions[choice]]
-        enemy_action = actions[enemy.actions[choose(enemy.actions)]]
-        log = run_turn(player, player_action, enemy, enemy_action)
+    if args.record is not None and args.resume is not None:
+        raise ValueError('a resumed game can not be recorded')
+    # a recording needs a seed to replay from
+    if args.record is not None and args.seed is None:
+        args.seed = str(new_seed())
 
-        display.display_log(log)
-        logs.append(log)
-        print()
-    return logs
+    # setup the world and seed
+    rng = Random(args.seed)
+    base_world = cache.load(args.world_file)
+    world = randomize_world(base_world, rng) if args.randomize else base_world
 
+    if args.command == SIMULATE_COMMAND:
+        run_simulation(args, world)
+        return
+    if args.command == TOURNAMENT_COMMAND:
+        run_tournament_command(args, world)
+        return
+    if args.command == SOLVE_COMMAND:
+        run_solve(args, world)
+        return
+    if args.command == GENERATE_COMMAND:
+        run_generate(args, world)
+        return
+    if args.command == REPLAY_COMMAND:
+        run_replay_command(args, base_world)
+        return
+    if args.command == CAMPAIGN_COMMAND:
+        run_campaign(args, world)
+        return
 
-def main():
-    args = parse_args()
+    if args.display == SERVER_DISPLAY:
+        try:
+            asyncio.run(GameServer(world, args.seed,
+                        args.log_level).serve(args.address))
+        except KeyboardInterrupt:
+            pass
+        return
 
-    # setup the world and seed
-    if args.seed is not None:
-        seed(args.seed)
-    world = create_world(args)
-    display = create_display(args)
+    display = create_display(args, logic_rng(args.seed), world)
+    events = create_sink(display, args.log_level)
+    env = QuestEnv(world, rng, events)
+    name = None
+    decisions = [] if args.record is not None else None
 
     try:
-        display.display_log('What is your name?')
-        name = display.read_input().strip()
-        if not name:
-            name = None
-
-        # select starters
-        starters = world.create_starters()
-        display.display_log('Choose a starter')
-        choice = display.display_choice(
-            [starter['name'] for starter in starters])
-
-        player = new_character(starters[choice], name=name, level=5)
-        enemy = new_character(starters[(choice + 1) % len(starters)], level=3)
-        battles = 0
-
-        # lab battle
-        battle(player, enemy, world.actions, display)
-
-        if player.health <= 0:
-            display.display_log('died')
-            return
-        display.display_log(f'gained {enemy.experience} experience')
-        player.gain_experience(enemy.experience)
-        display.display_character(player)
-        while len(player.actions) > 4:
-            display.display_log('Please drop an action')
-            choice = display.display_choice(player.actions)
-            player.forget_action(choice)
-        player.refresh()
-        battles += 1
-        print()
-
-        # post-lab
-        while True:
-            display.display_character(player)
-            choice = display.display_choice(['scout', 'battle'])
-
-            if choice == 0:
-                difficulty = int(
-                    player.level + randint(0, battles) / player.level)
-                enemy = world.random_character(level=difficulty)
-
-                counter = 1
-                while True:
-                    if player.health <= 0:
-                        display.display_log('died')
-                        return
-                    display.display_battle_frame(player, enemy)
-                    choice = display.display_choice(['scout', 'tame', 'flee'])
-                    if choice == 1:
-                        counter += 1
-                        if random() > 1 / counter:
-                            display.display_log(
-                                f'successfully tamed {enemy.name}')
-                            enemy.name = player.name
-                            player = enemy
-                            break
-                        else:
-                            display.display_log(f'failed to tame {enemy.name}')
-                    elif choice == 2:
-                        counter += 1
-                        if random() > 1 / counter:
-                            display.display_log(f'successfully fled')
-                            break
-                        else:
-                            display.display_log(f'failed to flee')
-                    enemy_action = world.actions[enemy.actions[choose(
-                        enemy.actions)]]
-                    log = run_turn(player, NOTHING, enemy, enemy_action)
-                    display.display_log(log)
-                    print()
-            elif choice == 1:
-                difficulty = int(
-                    player.level + randint(0, battles) / player.level)
-                enemy = world.random_character(level=difficulty)
-                battle(player, enemy, world.actions, display)
-
-                if player.health <= 0:
-                    display.display_log('died')
-                    return
-                display.display_log(f'gained {enemy.experience} experience')
-                player.gain_experience(enemy.experience)
-                while len(player.actions) > 4:
-                    display.display_log('Please drop an action')
-                    choice = display.display_choice(player.actions)
-                    player.forget_action(choice)
-                    print()
-                battles += 1
-            print()
-
-    except KeyboardInterrupt:
-        print()
+        if args.resume is not None:
+            restore(env, read_checkpoint(args.resume), base_world, args.seed, args.randomize)
+            resume(env, display)
+        else:
+            display.display_log('What is your name?')
+            name = display.read_input().strip()
+            if not name:
+                name = None
+
+            play(env, display, name, decisions)
+    except (KeyboardInterrupt, EOFError):
+        display.display_blank()
+    finally:
+        display.close()
+        if args.save is not None and not env.done:
+            write_checkpoint(args.save, checkpoint(env, base_world, args.seed, args.randomize))
+        # unfinished games are recorded too, up to where they stopped, once they've started
+        if decisions is not None and (decisions or not env.done):
+            write_replay(args.record, create_replay(
+                base_world, args.seed, name, decisions, env.observation(), args.randomize))
 
 
 if __name__ == '__main__':
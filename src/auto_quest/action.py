@@ -1,9 +1,12 @@
-from random import random
+import random
+
+from events import ACTION, BLOCKED, CONDITION, DEFEND, FAINT, HEAL, HIT, MISS
+from events import NOTHING as DID_NOTHING
 
 
 class Effect:
-    def apply(self, user, target):
-        return ''
+    def apply(self, user, target, rng=random, events=None):
+        pass
 
 
 def attack_scaling(user, target):
@@ -24,21 +27,26 @@ class Attack(Effect):
             'accuracy': self.accuracy,
         }
 
-    def apply(self, user, target):
+    def apply(self, user, target, rng=random, events=None):
         """ Deal scaled damage to the target. """
         if target.has_condition('defend'):
-            return f"{target.name} is defending"
-        # TODO: find a way to provide a custom random engine
-        if random() > self.accuracy / 100:
-            return f"{user.name} missed"
+            if events is not None:
+                events.emit(BLOCKED, target.name)
+            return
+        if rng.random() > self.accuracy / 100:
+            if events is not None:
+                events.emit(MISS, user.name)
+            return
 
         user_power = user.level * user.strength
         target_power = target.strength + target.smarts + target.speed
         scale = user_power / target_power
 
-        target.damage(int(self.power * scale))
+        damage = int(self.power * scale)
+        target.damage(damage)
 
-        return f"{user.name} attacks {target.name}"
+        if events is not None:
+            events.emit(HIT, user.name, target.name, damage)
 
 
 class Heal(Effect):
@@ -51,11 +59,13 @@ class Heal(Effect):
             'power': self.power,
         }
 
-    def apply(self, user, target):
+    def apply(self, user, target, rng=random, events=None):
         """ Recover fraction of max health for the user. """
-        user.heal(int((self.power * user.max_health) // 100))
+        value = int((self.power * user.max_health) // 100)
+        user.heal(value)
 
-        return f"{user.name} heals"
+        if events is not None:
+            events.emit(HEAL, user.name, value)
 
 
 class Condition(Effect):
@@ -68,24 +78,28 @@ class Condition(Effect):
             'condition': self.condition,
         }
 
-    def apply(self, user, target):
+    def apply(self, user, target, rng=random, events=None):
         """ Adds a condition to the target. """
         if target.has_condition('defend'):
-            return f"{target.name} is defending"
+            if events is not None:
+                events.emit(BLOCKED, target.name)
+            return
         target.add_condition(self.condition)
 
-        return f"{target.name} has {self.condition}"
+        if events is not None:
+            events.emit(CONDITION, target.name, self.condition)
 
 
 class Defend(Effect):
     def to_dict(self):
         return {'type': 'defend'}
 
-    def apply(self, user, target):
+    def apply(self, user, target, rng=random, events=None):
         """ Applies defend to the user. """
         user.add_condition('defend')
 
-        return f"{user.name} defends"
+        if events is not None:
+            events.emit(DEFEND, user.name)
 
 
 def dict_to_effect(effect):
@@ -98,6 +112,8 @@ def dict_to_effect(effect):
         return Heal(effect['power'])
     elif effect['type'] == 'defend':
         return Defend()
+    elif effect['type'] == 'condition':
+        return Condition(effect['condition'])
     else:
         return None
 
@@ -119,25 +135,26 @@ class Action:
             'priority': self.priority,
         }
 
-    def act(self, user, target):
-        logs = []
-        logs.append(f"{user.name} uses {self.name}")
-        logs.extend([effect.apply(user, target) for effect in self.effects])
-        return logs
+    def act(self, user, target, rng=random, events=None):
+        if events is not None:
+            events.emit(ACTION, user.name, self.name)
+        for effect in self.effects:
+            effect.apply(user, target, rng, events)
 
 
 class DoNothing:
     def __init__(self):
         self.priority = 100
 
-    def act(self, user, target):
-        return [f'{user.name} did nothing']
+    def act(self, user, target, rng=random, events=None):
+        if events is not None:
+            events.emit(DID_NOTHING, user.name)
 
 
 NOTHING = DoNothing()
 
 
-def run_turn(player, player_action, enemy, enemy_action):
+def run_turn(player, player_action, enemy, enemy_action, rng=random, events=None):
     # get the turn order
     order = []
 
@@ -153,8 +170,7 @@ def run_turn(player, player_action, enemy, enemy_action):
     elif player.speed < enemy.speed:
         order = [enemy, player]
         action_order = [enemy_action, player_action]
-    # TODO: find a way to provide a custom random engine
-    elif random() < 0.5:
+    elif rng.random() < 0.5:
         order = [player, enemy]
         action_order = [player_action, enemy_action]
     else:
@@ -162,13 +178,14 @@ def run_turn(player, player_action, enemy, enemy_action):
         action_order = [enemy_action, player_action]
 
     # don't let things happen if someone is dead
-    logs = []
     if player.health > 0 and enemy.health > 0:
-        logs.extend(action_order[0].act(order[0], order[1]))
+        action_order[0].act(order[0], order[1], rng, events)
+        if events is not None and order[1].health <= 0:
+            events.emit(FAINT, order[1].name)
     if player.health > 0 and enemy.health > 0:
-        logs.extend(action_order[1].act(order[1], order[0]))
+        action_order[1].act(order[1], order[0], rng, events)
+        if events is not None and order[0].health <= 0:
+            events.emit(FAINT, order[0].name)
 
     player.remove_condition('defend')
     enemy.remove_condition('defend')
-
-    return logs
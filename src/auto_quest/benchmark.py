@@ -0,0 +1,193 @@
+"""
+Benchmarks of the engine's hot paths.
+
+Every benchmark runs a fixed amount of work from a fixed seed and reports the best
+time per operation over a few repeats. Runs are appended to a json history file,
+which also holds a baseline run that later runs are compared against, so a change
+that makes a benchmark slower than the threshold allows gets flagged.
+"""
+import json
+import os
+import platform
+import time
+
+from random import Random
+
+import cache
+from action import run_turn
+from character import TABLE_LEVELS, new_character
+from env import BATTLE, QuestEnv
+from logic import choose
+from randomizer import randomize_species
+
+REPEAT = 5
+THRESHOLD = 0.1
+HISTORY_FILE = 'benchmarks.json'
+BATTLE_LEVEL = 10
+
+
+def bench_world_load(world_file, world, rng, scale):
+    for _ in range(20 * scale):
+        cache.load(world_file)
+    return 20 * scale
+
+
+def bench_new_character(world_file, world, rng, scale):
+    for _ in range(20 * scale):
+        for species in world.species:
+            new_character(species, level=TABLE_LEVELS,
+                          table=world.level_table(species))
+    return 20 * scale * len(world.species)
+
+
+def _battle_pair(world, rng):
+    return world.random_character(BATTLE_LEVEL, rng), world.random_character(BATTLE_LEVEL, rng)
+
+
+def bench_run_turn(world_file, world, rng, scale):
+    player, enemy = _battle_pair(world, rng)
+    for _ in range(5000 * scale):
+        if player.health <= 0 or enemy.health <= 0:
+            player.refresh()
+            enemy.refresh()
+        run_turn(
+            player,
+            world.actions[player.actions[choose(player.actions, rng)]],
+            enemy,
+            world.actions[enemy.actions[choose(enemy.actions, rng)]],
+            rng,
+        )
+    return 5000 * scale
+
+
+def bench_compiled_turn(world_file, world, rng, scale):
+    table = world.table
+    player, enemy = _battle_pair(world, rng)
+    player_actions = table.action_ids(player.actions)
+    enemy_actions = table.action_ids(enemy.actions)
+    for _ in range(5000 * scale):
+        if player.health <= 0 or enemy.health <= 0:
+            player.refresh()
+            enemy.refresh()
+        table.run_turn(
+            player,
+            player_actions[choose(player_actions, rng)],
+            enemy,
+            enemy_actions[choose(enemy_actions, rng)],
+            rng,
+        )
+    return 5000 * scale
+
+
+def bench_encounter(world_file, world, rng, scale):
+    encounters = world.encounters
+    for _ in range(1000 * scale):
+        for level in range(1, 21):
+            encounters.encounter(level, rng)
+    return 20000 * scale
+
+
+def bench_battle(world_file, world, rng, scale):
+    # the first battle of a fresh game, stepped through the env like the game does
+    env = QuestEnv(world, rng)
+    for _ in range(50 * scale):
+        env.reset()
+        env.advance(choose(range(env.choice_count()), rng))
+        while env.phase == BATTLE:
+            env.advance(choose(range(env.choice_count()), rng))
+    return 50 * scale
+
+
+def bench_randomize_species(world_file, world, rng, scale):
+    for _ in range(200 * scale):
+        for species in world.species:
+            randomize_species(species, world.actions, rng)
+    return 200 * scale * len(world.species)
+
+
+def bench_campaign(world_file, world, rng, scale):
+    env = QuestEnv(world, rng)
+    for _ in range(5 * scale):
+        env.reset()
+        while not env.done:
+            env.advance(choose(range(env.choice_count()), rng))
+    return 5 * scale
+
+
+BENCHMARKS = {
+    'world_load': bench_world_load,
+    'new_character': bench_new_character,
+    'run_turn': bench_run_turn,
+    'compiled_turn': bench_compiled_turn,
+    'encounter': bench_encounter,
+    'battle': bench_battle,
+    'randomize_species': bench_randomize_species,
+    'campaign': bench_campaign,
+}
+
+
+def measure(benchmark, world_file, repeat=REPEAT, scale=1):
+    """ The best seconds per operation over the repeats, each starting from the same seed. """
+    world = cache.load(world_file)
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        operations = benchmark(world_file, world, Random(0), scale)
+        seconds = (time.perf_counter() - start) / operations
+        best = seconds if best is None else min(best, seconds)
+    return best
+
+
+def run_benchmarks(world_file, names=None, repeat=REPEAT, scale=1):
+    """ Runs the named benchmarks, or all of them, and returns a history run. """
+    results = {}
+    for name in names or BENCHMARKS:
+        if name not in BENCHMARKS:
+            raise ValueError(f'unknown benchmark {name}')
+        seconds = measure(BENCHMARKS[name], world_file, repeat, scale)
+        results[name] = {'seconds': seconds, 'per_second': 1 / seconds}
+    return {
+        'time': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'python': platform.python_version(),
+        'machine': platform.machine(),
+        'results': results,
+    }
+
+
+def compare(run, baseline, threshold=THRESHOLD):
+    """ The benchmarks that got slower than the baseline by more than the threshold, with their slowdown. """
+    regressions = {}
+    for name, result in run['results'].items():
+        if name not in baseline['results']:
+            continue
+        slowdown = result['seconds'] / baseline['results'][name]['seconds'] - 1
+        if slowdown > threshold:
+            regressions[name] = slowdown
+    return regressions
+
+
+def load_history(path):
+    if not os.path.exists(path):
+        return {'baseline': None, 'runs': []}
+    with open(path, 'r') as f:
+        return json.load(f)
+
+
+def save_history(path, history):
+    with open(path + '.tmp', 'w') as f:
+        json.dump(history, f, indent=2)
+    os.replace(path + '.tmp', path)
+
+
+def format_run(run, baseline=None, regressions=()):
+    lines = []
+    for name, result in run['results'].items():
+        line = f"{name:<20}{result['seconds'] * 1e6:>14.2f}us {result['per_second']:>14.1f}/s"
+        if baseline is not None and name in baseline['results']:
+            change = result['seconds'] / \
+                baseline['results'][name]['seconds'] - 1
+            line += f' {change:+8.1%}'
+            if name in regressions:
+                line += ' REGRESSION'
+        lines.append(line)
+    return lines
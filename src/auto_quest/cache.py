@@ -0,0 +1,298 @@
+"""
+Compiled world caches.
+
+A cache sits next to its world file and holds the validated world laid out as flat
+numpy arrays, behind a header with the sha256 of the json it was built from, so a cache
+for an edited world is never used. Species stats, learnsets, encounter keys and action
+effects are columns, with species, action and condition names interned into name
+tables that the columns hold positions in. A small index after the header gives each
+column's dtype, shape and offset.
+
+Loading memory maps the cache and wraps the columns without copying them. Species are
+only turned into records the first time they're used and the encounter index is built
+straight from the columns, so nothing is parsed up front. The cache is only ever read
+as data, so a cache someone else left next to a world can't run code.
+"""
+import hashlib
+import json
+import mmap
+import os
+import struct
+
+from action import Action, Attack, Condition, Defend, Heal
+from character import ATTRIBUTES
+from compiled import ATTACK_OP, CONDITION_OP, DEFEND_OP, HEAL_OP, compile_effect
+from encounters import DEFAULT_WEIGHT, EncounterIndex
+from world import SpeciesList, World, parse_world
+
+CACHE_MAGIC = b'AQWC'
+CACHE_VERSION = 4
+CACHE_SUFFIX = '.aqc'
+HEADER = struct.Struct('<4sH32sI')
+ALIGNMENT = 8
+NO_STARTER_KEY = -1
+
+
+def cache_path(world_file):
+    return world_file + CACHE_SUFFIX
+
+
+def content_hash(data):
+    return hashlib.sha256(data).digest()
+
+
+def validate_world(world):
+    """ Checks that every species is complete and only uses actions that exist. """
+    if len(world.species) == 0:
+        raise ValueError('the world has no species')
+    for name, action in world.actions.items():
+        if None in action.effects:
+            raise ValueError(f'action {name} has an unknown effect')
+    names = set()
+    for species in world.species:
+        if species['name'] in names:
+            raise ValueError(f"species {species['name']} is defined twice")
+        names.add(species['name'])
+        for attribute in ATTRIBUTES:
+            if attribute not in species['attributes']:
+                raise ValueError(
+                    f"species {species['name']} has no {attribute}")
+        for level, action in species['actions'].items():
+            if action not in world.actions:
+                raise ValueError(
+                    f"species {species['name']} learns unknown action {action} at level {level}")
+        if species.get('weight', 1) <= 0:
+            raise ValueError(
+                f"species {species['name']} has a weight that isn't positive")
+        if 'levels' in species:
+            low, high = species['levels']
+            if low > high:
+                raise ValueError(
+                    f"species {species['name']} has no levels to be encountered at")
+
+
+def _whole(value, what):
+    if not isinstance(value, int):
+        raise ValueError(f"{what} isn't a whole number, so the world can't be compiled")
+    return value
+
+
+def _names(names):
+    return '\0'.join(names).encode()
+
+
+def _columns(world):
+    """ Lays a validated world out as named numpy arrays. """
+    # numpy is only needed for compiled caches
+    import numpy as np
+
+    species = list(world.species)
+    action_ids = {name: i for i, name in enumerate(world.actions)}
+    conditions = {}
+
+    attributes = []
+    learn_offsets = [0]
+    learn_levels = []
+    learn_actions = []
+    weights = []
+    has_weight = []
+    levels = []
+    has_levels = []
+    starter = []
+    for record in species:
+        if set(record['attributes']) != set(ATTRIBUTES):
+            raise ValueError(
+                f"species {record['name']} has attributes other than {', '.join(ATTRIBUTES)}, so the world can't be compiled")
+        attributes.append([_whole(record['attributes'][attribute], f"species {record['name']}'s {attribute}")
+                           for attribute in ATTRIBUTES])
+        for level, action in record['actions'].items():
+            learn_levels.append(level)
+            learn_actions.append(action_ids[action])
+        learn_offsets.append(len(learn_levels))
+        has_weight.append('weight' in record)
+        weights.append(record.get('weight', DEFAULT_WEIGHT))
+        has_levels.append('levels' in record)
+        levels.append([_whole(level, f"species {record['name']}'s levels")
+                       for level in record.get('levels', (0, 0))])
+        starter.append(int(record['starter']) if 'starter' in record else NO_STARTER_KEY)
+
+    priority = []
+    effect_offsets = [0]
+    effect_ops = []
+    effect_power = []
+    effect_accuracy = []
+    effect_condition = []
+    for name, action in world.actions.items():
+        priority.append(_whole(action.priority, f"action {name}'s priority"))
+        for effect in action.effects:
+            op = compile_effect(effect)[0]
+            effect_ops.append(op)
+            effect_power.append(_whole(getattr(effect, 'power', 0), f"action {name}'s power"))
+            effect_accuracy.append(_whole(getattr(effect, 'accuracy', 0), f"action {name}'s accuracy"))
+            condition = getattr(effect, 'condition', None)
+            effect_condition.append(
+                -1 if condition is None else conditions.setdefault(condition, len(conditions)))
+        effect_offsets.append(len(effect_ops))
+
+    whole_weights = all(isinstance(weight, int) for weight in weights)
+    return {
+        'species_names': np.frombuffer(_names(record['name'] for record in species), dtype=np.uint8),
+        'action_names': np.frombuffer(_names(world.actions), dtype=np.uint8),
+        'condition_names': np.frombuffer(_names(conditions), dtype=np.uint8),
+        'attributes': np.array(attributes, dtype=np.int64).reshape(len(species), len(ATTRIBUTES)),
+        'learn_offsets': np.array(learn_offsets, dtype=np.int64),
+        'learn_levels': np.array(learn_levels, dtype=np.int64),
+        'learn_actions': np.array(learn_actions, dtype=np.int32),
+        'weight': np.array(weights, dtype=np.int64 if whole_weights else np.float64),
+        'has_weight': np.array(has_weight, dtype=bool),
+        'levels': np.array(levels, dtype=np.int64).reshape(len(species), 2),
+        'has_levels': np.array(has_levels, dtype=bool),
+        'starter': np.array(starter, dtype=np.int8),
+        'priority': np.array(priority, dtype=np.int64),
+        'effect_offsets': np.array(effect_offsets, dtype=np.int64),
+        'effect_ops': np.array(effect_ops, dtype=np.int8),
+        'effect_power': np.array(effect_power, dtype=np.int64),
+        'effect_accuracy': np.array(effect_accuracy, dtype=np.int64),
+        'effect_condition': np.array(effect_condition, dtype=np.int32),
+    }
+
+
+def _aligned(size):
+    return -(-size // ALIGNMENT) * ALIGNMENT
+
+
+def compile_world(world_file):
+    """ Parses, validates and compiles a world file, then writes its cache. """
+    with open(world_file, 'rb') as f:
+        data = f.read()
+    world = parse_world(data)
+    validate_world(world)
+    columns = _columns(world)
+
+    # offsets are from the start of the columns, which is the first aligned byte after the index
+    index = {}
+    offset = 0
+    for name, column in columns.items():
+        index[name] = [column.dtype.str, column.shape, offset]
+        offset = _aligned(offset + column.nbytes)
+    index = json.dumps(index).encode()
+    start = _aligned(HEADER.size + len(index))
+
+    path = cache_path(world_file)
+    with open(path + '.tmp', 'wb') as f:
+        f.write(HEADER.pack(CACHE_MAGIC, CACHE_VERSION, content_hash(data), len(index)))
+        f.write(index)
+        for column in columns.values():
+            f.write(bytes(_aligned(f.tell() - start) + start - f.tell()))
+            f.write(column.tobytes())
+    os.replace(path + '.tmp', path)
+    return path
+
+
+class CachedSpecies(SpeciesList):
+    def __init__(self, columns, action_names):
+        """ Species read from a cache's columns the first time they're used. """
+        self.columns = columns
+        self.names = _read_names(columns['species_names'])
+        self.action_names = action_names
+        self._species = [None] * len(self.names)
+
+    def __len__(self):
+        return len(self.names)
+
+    def _record(self, index):
+        index = range(len(self))[index]
+        columns = self.columns
+        start, end = columns['learn_offsets'][index:index + 2].tolist()
+        species = {
+            'name': self.names[index],
+            'attributes': dict(zip(ATTRIBUTES, columns['attributes'][index].tolist())),
+            'actions': {level: self.action_names[action] for level, action in zip(
+                columns['learn_levels'][start:end].tolist(), columns['learn_actions'][start:end].tolist())},
+        }
+        if columns['has_weight'][index]:
+            species['weight'] = columns['weight'][index].item()
+        if columns['has_levels'][index]:
+            species['levels'] = columns['levels'][index].tolist()
+        if columns['starter'][index] != NO_STARTER_KEY:
+            species['starter'] = bool(columns['starter'][index])
+        return species
+
+    def encounter_index(self):
+        columns = self.columns
+        lows, highs = columns['levels'].T.tolist()
+        bands = [(low, high) if has else (None, None)
+                 for low, high, has in zip(lows, highs, columns['has_levels'].tolist())]
+        return EncounterIndex.from_columns(
+            self.names, columns['weight'].tolist(), bands, (columns['starter'] == 1).nonzero()[0].tolist())
+
+
+def _read_names(column):
+    text = bytes(column).decode()
+    return text.split('\0') if text else []
+
+
+def _actions(columns):
+    names = _read_names(columns['action_names'])
+    conditions = _read_names(columns['condition_names'])
+    offsets = columns['effect_offsets'].tolist()
+    ops = columns['effect_ops'].tolist()
+    power = columns['effect_power'].tolist()
+    accuracy = columns['effect_accuracy'].tolist()
+    condition = columns['effect_condition'].tolist()
+    actions = {}
+    for i, (name, priority) in enumerate(zip(names, columns['priority'].tolist())):
+        effects = []
+        for j in range(offsets[i], offsets[i + 1]):
+            if ops[j] == ATTACK_OP:
+                effects.append(Attack(power[j], accuracy[j]))
+            elif ops[j] == HEAL_OP:
+                effects.append(Heal(power[j]))
+            elif ops[j] == CONDITION_OP:
+                effects.append(Condition(conditions[condition[j]]))
+            elif ops[j] == DEFEND_OP:
+                effects.append(Defend())
+        actions[name] = Action(name, effects, priority)
+    return actions
+
+
+def load_cached_world(world_file):
+    """ Loads the world from its cache, or returns None if there is no fresh cache. """
+    path = cache_path(world_file)
+    if not os.path.exists(path):
+        return None
+    try:
+        # numpy is only needed for compiled caches
+        import numpy as np
+    except ImportError:
+        return None
+    with open(world_file, 'rb') as f:
+        digest = content_hash(f.read())
+
+    with open(path, 'rb') as f:
+        data = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    if len(data) < HEADER.size:
+        return None
+    magic, version, cached_digest, index_size = HEADER.unpack_from(data)
+    if magic != CACHE_MAGIC or version != CACHE_VERSION or cached_digest != digest:
+        return None
+    index = json.loads(data[HEADER.size:HEADER.size + index_size])
+    start = _aligned(HEADER.size + index_size)
+    columns = {}
+    for name, (dtype, shape, offset) in index.items():
+        count = 1
+        for size in shape:
+            count *= size
+        columns[name] = np.frombuffer(data, dtype, count, start + offset).reshape(shape)
+
+    actions = _actions(columns)
+    return World(CachedSpecies(columns, list(actions)), actions)
+
+
+def load(world_file):
+    """ Loads a world, preferring its compiled cache. """
+    world = load_cached_world(world_file)
+    if world is None:
+        with open(world_file, 'rb') as f:
+            world = parse_world(f.read())
+    return world
@@ -0,0 +1,178 @@
+"""
+Headless campaigns.
+
+A campaign is a whole game played by a logic from the starter to the player's death, or
+until it reaches the battle or decision cap. Runs stuck in a battle neither side can win
+are stopped at the turn cap and marked stalled. Runs are played across a process pool, each
+from its own engines derived from the seed and the run's index, and are collected into
+columns: one value per run, plus the player's and enemy's level at the start of every
+battle stored flat with each run's offset into them. Columns are saved as a numpy .npz
+file so the difficulty curve can be analyzed without scraping the game's output.
+"""
+from env import BATTLE, ENCOUNTER, EXPLORE, QuestEnv
+from logic import RANDOM_LOGIC, load_logic
+from rng import derive_rng
+from simulator import MAX_TURNS
+from workers import create_pool, shared_state, worker_cache
+
+MAX_BATTLES = 1000
+MAX_DECISIONS = 100000
+CHUNK_SIZE = 16
+TAME = 1
+FLEE = 2
+RUN_COLUMNS = ['run', 'battles', 'decisions', 'turns', 'tames',
+               'tame_attempts', 'flees', 'died', 'stalled', 'level', 'species']
+BATTLE_COLUMNS = ['player_levels', 'enemy_levels']
+CURVE_BATTLES = [1, 5, 10, 25, 50, 100]
+
+def play_campaign(world, logic, seed, run, max_battles=MAX_BATTLES, max_decisions=MAX_DECISIONS, max_turns=MAX_TURNS):
+    """ Plays one run with a loaded logic, or a logic name to load for this run, and returns its stats. """
+    if max_battles < 1:
+        raise ValueError('a campaign needs at least one battle')
+    env = QuestEnv(world, derive_rng(seed, run))
+    if isinstance(logic, str):
+        logic = load_logic(logic, derive_rng(seed, run, 'logic'), world)
+    env.reset()
+    stats = {
+        'run': run,
+        'decisions': 0,
+        'turns': 0,
+        'tames': 0,
+        'tame_attempts': 0,
+        'flees': 0,
+        'player_levels': [],
+        'enemy_levels': [],
+    }
+    stalled = False
+    while not env.done and env.battles < max_battles and stats['decisions'] < max_decisions:
+        if env.phase == BATTLE and env.turn > max_turns:
+            stalled = True
+            break
+        phase = env.phase
+        choice = logic(env.legal_actions(), env.player, env.enemy)
+        env.advance(choice)
+        stats['decisions'] += 1
+        if phase == BATTLE:
+            stats['turns'] += 1
+        elif env.phase == BATTLE:
+            stats['player_levels'].append(env.player.level)
+            stats['enemy_levels'].append(env.enemy.level)
+        elif phase == ENCOUNTER and choice == TAME:
+            stats['tame_attempts'] += 1
+            stats['tames'] += env.phase == EXPLORE
+        elif phase == ENCOUNTER and choice == FLEE:
+            stats['flees'] += env.phase == EXPLORE
+
+    stats['battles'] = env.battles
+    stats['died'] = env.done
+    stats['stalled'] = stalled
+    stats['level'] = env.player.level
+    stats['species'] = env.player.species
+    return stats
+
+
+def _play_chunk(task):
+    logic, seed, start, count, max_battles, max_decisions, max_turns = task
+    # random logic gets each run's own engine so runs are reproducible, and the rest are
+    # loaded once per worker, for the world the pool was created with
+    if logic != RANDOM_LOGIC:
+        logics = worker_cache()
+        if logic not in logics:
+            logics[logic] = load_logic(logic, world=shared_state())
+        logic = logics[logic]
+    return [play_campaign(shared_state(), logic, seed, run, max_battles, max_decisions, max_turns) for run in range(start, start + count)]
+
+
+def simulate_campaigns(world, runs, logic, seed, processes=None, max_battles=MAX_BATTLES, max_decisions=MAX_DECISIONS, max_turns=MAX_TURNS, chunk_size=CHUNK_SIZE):
+    """ Plays runs across a process pool, yielding each run's stats in run order. """
+    tasks = ((logic, seed, start, min(chunk_size, runs - start), max_battles, max_decisions, max_turns)
+             for start in range(0, runs, chunk_size))
+    with create_pool(world, processes) as pool:
+        for results in pool.imap(_play_chunk, tasks):
+            yield from results
+
+
+class CampaignColumns:
+    def __init__(self):
+        """ Collects run stats into columns. """
+        self.columns = {column: [] for column in RUN_COLUMNS + BATTLE_COLUMNS}
+        self.offsets = [0]
+
+    def append(self, stats):
+        for column in RUN_COLUMNS:
+            self.columns[column].append(stats[column])
+        for column in BATTLE_COLUMNS:
+            self.columns[column].extend(stats[column])
+        self.offsets.append(len(self.columns[BATTLE_COLUMNS[0]]))
+
+    def arrays(self):
+        # numpy is only needed for the columns
+        import numpy as np
+
+        arrays = {column: np.asarray(values, dtype=np.int64)
+                  for column, values in self.columns.items() if column != 'species'}
+        arrays['died'] = arrays['died'].astype(bool)
+        arrays['stalled'] = arrays['stalled'].astype(bool)
+        arrays['species'] = np.asarray(self.columns['species'], dtype=str)
+        arrays['offsets'] = np.asarray(self.offsets, dtype=np.int64)
+        return arrays
+
+
+def write_campaigns(path, columns):
+    import numpy as np
+
+    np.savez_compressed(path, **columns.arrays())
+
+
+def read_campaigns(path):
+    import numpy as np
+
+    with np.load(path) as data:
+        return {column: data[column] for column in data.files}
+
+
+def level_curve(arrays, column='player_levels'):
+    """ The mean level at the start of each battle over the runs that got that far. """
+    import numpy as np
+
+    offsets = arrays['offsets']
+    lengths = np.diff(offsets)
+    if len(arrays[column]) == 0:
+        return np.zeros(0)
+    # the index of every battle within its run
+    positions = np.arange(len(arrays[column])) - np.repeat(offsets[:-1], lengths)
+    totals = np.bincount(positions, weights=arrays[column])
+    return totals / np.bincount(positions)
+
+
+def summarize_campaigns(arrays):
+    import numpy as np
+
+    runs = len(arrays['run'])
+    player_curve = level_curve(arrays)
+    enemy_curve = level_curve(arrays, 'enemy_levels')
+    return {
+        'runs': runs,
+        'deaths': int(arrays['died'].sum()),
+        'stalls': int(arrays['stalled'].sum()),
+        'battles': float(arrays['battles'].mean()) if runs else 0.0,
+        'median_battles': float(np.median(arrays['battles'])) if runs else 0.0,
+        'max_battles': int(arrays['battles'].max()) if runs else 0,
+        'turns': float(arrays['turns'].mean()) if runs else 0.0,
+        'tames': float(arrays['tames'].mean()) if runs else 0.0,
+        'tame_rate': float(arrays['tames'].sum() / max(arrays['tame_attempts'].sum(), 1)),
+        'level': float(arrays['level'].mean()) if runs else 0.0,
+        'curve': {battle: (float(player_curve[battle - 1]), float(enemy_curve[battle - 1]))
+                  for battle in CURVE_BATTLES if battle <= len(player_curve)},
+    }
+
+
+def format_campaigns(summary):
+    lines = [
+        f"RUNS:{summary['runs']} DEATHS:{summary['deaths']} STALLS:{summary['stalls']}",
+        f"BATTLES:{summary['battles']:.2f} MEDIAN:{summary['median_battles']:.1f} MAX:{summary['max_battles']}",
+        f"TURNS:{summary['turns']:.2f} TAMES:{summary['tames']:.2f} TAME RATE:{summary['tame_rate']:.3f} LEVEL:{summary['level']:.2f}",
+    ]
+    for battle, (player, enemy) in summary['curve'].items():
+        lines.append(f'BATTLE {battle}: PLAYER LVL:{player:.2f} ENEMY LVL:{enemy:.2f}')
+    return lines
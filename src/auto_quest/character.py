@@ -1,9 +1,58 @@
-import copy
+from bisect import bisect_right
 
 ATTRIBUTES = ['health', 'strength', 'smarts', 'speed']
+LEVEL_EXPERIENCE = 1000
+TABLE_LEVELS = 100
 
+# conditions are stored as bits; new conditions get the next free bit
+CONDITION_BITS = {'defend': 1}
 
-def new_character(species, name=None, level=0):
+
+def condition_bit(condition):
+    """ Gets the bit for a condition, assigning one if it's new. """
+    if condition not in CONDITION_BITS:
+        CONDITION_BITS[condition] = 1 << len(CONDITION_BITS)
+    return CONDITION_BITS[condition]
+
+
+DEFEND = condition_bit('defend')
+
+
+class LevelTable:
+    def __init__(self, species, levels=TABLE_LEVELS):
+        """ Precomputes a species' stats per level and the order it learns actions in. """
+        self.species = species
+        self.stats = [self._compute_stats(level) for level in range(levels + 1)]
+        learned = sorted(species['actions'].items())
+        self.learn_levels = [level for level, _ in learned]
+        self.learn_actions = [action for _, action in learned]
+
+    def _compute_stats(self, level):
+        attributes = self.species['attributes']
+        return tuple(int(level * attributes[attribute]) for attribute in ATTRIBUTES)
+
+    def attributes(self, level):
+        """ The (health, strength, smarts, speed) of the species at a level. """
+        if level < len(self.stats):
+            return self.stats[level]
+        return self._compute_stats(level)
+
+    def actions_between(self, low, high):
+        """ The actions learned after the low level up to and including the high level. """
+        return self.learn_actions[bisect_right(self.learn_levels, low):bisect_right(self.learn_levels, high)]
+
+    def experience_threshold(self, level):
+        """ How much experience can be held before leaving the level. """
+        return level * LEVEL_EXPERIENCE
+
+    def level_for_experience(self, experience, level):
+        """ The level reached from a level once the experience is gained. """
+        if experience <= self.experience_threshold(level):
+            return level
+        return -(-experience // LEVEL_EXPERIENCE)
+
+
+def new_character(species, name=None, level=0, table=None):
     """ Creates a fresh character. """
     character = Character(
         species=species,
@@ -18,130 +67,190 @@ def new_character(species, name=None, level=0):
             'health': 0,
             'conditions': set(),
         },
+        table=table,
     )
     if level > 0:
-        for _ in range(level):
-            character.gain_level()
+        character.level_up(level)
         character.refresh()
     return character
 
 
+def character_state(character):
+    """ A plain snapshot of what can be seen of a character. """
+    if character is None:
+        return None
+    return {
+        'name': character.name,
+        'species': character.species,
+        'level': character.level,
+        'experience': character.experience,
+        'health': character.health,
+        'max_health': character.max_health,
+        'strength': character.strength,
+        'smarts': character.smarts,
+        'speed': character.speed,
+        'conditions': list(character.conditions),
+        'actions': list(character.actions),
+    }
+
+
 class Character:
-    def __init__(self, species, character, status):
+    __slots__ = [
+        '_species',
+        'species',
+        'name',
+        'level',
+        'experience',
+        'max_health',
+        'strength',
+        'smarts',
+        'speed',
+        'health',
+        '_actions',
+        'condition_bits',
+        '_table',
+    ]
+
+    def __init__(self, species, character, status, table=None):
         self._species = species
-        self._character = character
-        self._status = status
+        self._table = table
+        self.species = species['name']
+        self.name = character['name']
+        self.level = character['level']
+        self.experience = character['experience']
+        self.max_health = int(character['attributes']['health'])
+        self.strength = int(character['attributes']['strength'])
+        self.smarts = int(character['attributes']['smarts'])
+        self.speed = int(character['attributes']['speed'])
+        self.health = int(status['health'])
+        self._actions = tuple(character['actions'])
+        self.condition_bits = 0
+        for condition in status['conditions']:
+            self.condition_bits |= condition_bit(condition)
+
+    def __reduce__(self):
+        # condition bits are only stable within a process so pickle the dict form
+        state = self.to_dict()
+        return (Character, (state['species'], state['character'], state['status']))
 
     def to_dict(self):
         return {
             'species': self._species,
-            'character': self._character,
-            'status': self._status,
+            'character': {
+                'name': self.name,
+                'attributes': {
+                    'health': self.max_health,
+                    'strength': self.strength,
+                    'smarts': self.smarts,
+                    'speed': self.speed,
+                },
+                'actions': list(self._actions),
+                'experience': self.experience,
+                'level': self.level,
+            },
+            'status': {
+                'health': self.health,
+                'conditions': set(self.conditions),
+            },
         }
 
     def __str__(self):
         return str(self.to_dict())
 
-    @property
-    def name(self):
-        return self._character['name']
-
-    @name.setter
-    def name(self, name):
-        self._character['name'] = name
-
-    @property
-    def species(self):
-        return self._species['name']
+    def snapshot(self):
+        """
+        Captures everything that can change about the character as a flat tuple.
 
-    @property
-    def level(self):
-        return self._character['level']
+        The species, level table and actions tuple are never mutated in place so they're shared, not copied.
+        """
+        return (self.name, self.level, self.experience, self.max_health, self.strength,
+                self.smarts, self.speed, self.health, self._actions, self.condition_bits)
 
-    @property
-    def health(self):
-        return self._status['health']
+    def restore(self, snapshot):
+        """ Rewinds the character to a snapshot. """
+        (self.name, self.level, self.experience, self.max_health, self.strength,
+         self.smarts, self.speed, self.health, self._actions, self.condition_bits) = snapshot
 
-    @property
-    def max_health(self):
-        return self._character['attributes']['health']
+    def fork(self):
+        """ A copy that can be changed without touching this character. """
+        character = Character.__new__(Character)
+        character._species = self._species
+        character.species = self.species
+        character._table = self._table
+        character.restore(self.snapshot())
+        return character
 
     @property
-    def strength(self):
-        return self._character['attributes']['strength']
-
-    @property
-    def smarts(self):
-        return self._character['attributes']['smarts']
-
-    @property
-    def speed(self):
-        return self._character['attributes']['speed']
+    def level_table(self):
+        """ The species' level table, built on first use if one wasn't given. """
+        if self._table is None:
+            self._table = LevelTable(self._species)
+        return self._table
 
     @property
     def attribute_total(self):
         return self.strength + self.smarts + self.speed
 
-    @property
-    def experience(self):
-        return self._character['experience']
-
     @property
     def experience_value(self):
         return self.level * self.attribute_total
 
     @property
     def actions(self):
-        return copy.copy(self._character['actions'])
+        """ The learned actions as a read-only tuple. """
+        return self._actions
 
     @property
     def conditions(self):
-        return copy.copy(self._status['conditions'])
+        """ The names of the active conditions. """
+        return tuple(condition for condition, bit in CONDITION_BITS.items() if self.condition_bits & bit)
 
     def forget_action(self, action):
-        self._character['actions'].remove(action)
+        actions = list(self._actions)
+        actions.remove(action)
+        self._actions = tuple(actions)
 
     def damage(self, value):
         """ Decreases health so it won't be negative. """
-        self._status['health'] = int(max(self._status['health'] - value, 0))
+        self.health = int(max(self.health - value, 0))
 
     def heal(self, value):
         """ Increases health so it doesn't exceed the character's max health. """
-        self._status['health'] = int(min(
-            self._status['health'] + value, self._character['attributes']['health']))
+        self.health = int(min(self.health + value, self.max_health))
 
     def has_condition(self, condition):
         """ Checks if the condition is active. """
-        return condition in self._status['conditions']
+        # looking a condition up mustn't assign it a bit
+        return self.condition_bits & CONDITION_BITS.get(condition, 0) != 0
 
     def add_condition(self, condition):
         """ Adds the condition. """
-        self._status['conditions'].add(condition)
+        self.condition_bits |= condition_bit(condition)
 
     def remove_condition(self, condition):
         """ Removes the condition. """
-        if condition in self._status['conditions']:
-            self._status['conditions'].remove(condition)
+        self.condition_bits &= ~CONDITION_BITS.get(condition, 0)
 
     def refresh(self):
         """ Resets to max health and removes all conditions. """
-        self._status['health'] = self._character['attributes']['health']
-        self._status['conditions'] = set()
+        self.health = self.max_health
+        self.condition_bits = 0
 
     def gain_level(self):
         """ Sets the character to their scaled stats and maybe learns a new move. """
-        self._character['level'] += 1
-        self._character['attributes'] = {
-            'health':  int(self.level * self._species['attributes']['health']),
-            'strength':  int(self.level * self._species['attributes']['strength']),
-            'smarts':  int(self.level * self._species['attributes']['smarts']),
-            'speed':  int(self.level * self._species['attributes']['speed']),
-        }
-        if self.level in self._species['actions']:
-            self._character['actions'].append(
-                self._species['actions'][self.level])
+        self.level_up(self.level + 1)
+
+    def level_up(self, level):
+        """ Jumps straight to a higher level, learning every action along the way. """
+        if level <= self.level:
+            return
+        table = self.level_table
+        self._actions += tuple(table.actions_between(self.level, level))
+        self.max_health, self.strength, self.smarts, self.speed = table.attributes(
+            level)
+        self.level = level
 
     def gain_experience(self, experience):
-        self._character['experience'] += experience
-        while self.experience > self.level * 1000:
-            self.gain_level()
+        self.experience += experience
+        self.level_up(self.level_table.level_for_experience(
+            self.experience, self.level))
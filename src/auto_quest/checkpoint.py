@@ -0,0 +1,260 @@
+"""
+Saving and resuming games.
+
+A checkpoint is everything a QuestEnv needs to carry on exactly where it was: the phase
+and counters, the starters, both characters as character_state dicts and the state of
+the random engine. Like a replay it also records the sha256 of the world, whether the
+world was randomized and the seed, and a checkpoint is only restored with the same. Checkpoints are plain dicts in memory, and are stored either as a
+compact binary encoding or as json for anything that can't read it.
+"""
+import json
+import random
+import struct
+
+from character import character_state
+from env import BATTLE, DONE, DROP, ENCOUNTER, EXPLORE, STARTER, QuestEnv
+from replay import world_hash
+
+CHECKPOINT_MAGIC = b'AQCK'
+CHECKPOINT_VERSION = 2
+JSON_SUFFIX = '.json'
+PHASES = [STARTER, BATTLE, DROP, EXPLORE, ENCOUNTER, DONE]
+
+HEADER = struct.Struct('<4sHBIIIB32sB')
+LENGTH = struct.Struct('<H')
+CHARACTER = struct.Struct('<IqIIIII')
+RNG_HEADER = struct.Struct('<BH')
+GAUSS = struct.Struct('<Bd')
+NO_NAME = 0xFFFF
+
+
+def checkpoint(env, world=None, seed=None, randomized=False):
+    """ Captures the whole state of a game, where world is the base world before any randomizing, env.world by default. """
+    return {
+        'world': world_hash(world if world is not None else env.world),
+        'randomized': randomized,
+        'seed': seed,
+        'name': env.name,
+        'phase': env.phase,
+        'battles': env.battles,
+        'turn': env.turn,
+        'counter': env.counter,
+        'lab': env.lab,
+        'starters': [starter['name'] for starter in env.starters],
+        'player': character_state(env.player),
+        'enemy': character_state(env.enemy),
+        'rng': env.rng.getstate(),
+    }
+
+
+def _describe_seed(seed):
+    return 'no seed' if seed is None else f'seed {seed}'
+
+
+def check_checkpoint(state, world, seed=None, randomized=False):
+    """ Raises a ValueError unless the checkpoint was saved in world with the same seed and randomizing. """
+    if world_hash(world) != state['world']:
+        raise ValueError('the checkpoint was saved in a different world')
+    if randomized != state['randomized']:
+        raise ValueError('the checkpoint was saved in a randomized world' if state['randomized']
+                         else "the checkpoint was saved in a world that wasn't randomized")
+    if seed != state['seed']:
+        raise ValueError(
+            f"the checkpoint was saved with {_describe_seed(state['seed'])}, not {_describe_seed(seed)}")
+
+
+def restore(env, state, world=None, seed=None, randomized=False):
+    """ Puts a game back into a checkpointed state, once it's checked the checkpoint was saved with the same base world, seed and randomizing. """
+    check_checkpoint(state, world if world is not None else env.world, seed, randomized)
+    return _restore(env, state)
+
+
+def _restore(env, state):
+    world = env.world
+    env.name = state['name']
+    env.phase = state['phase']
+    env.battles = state['battles']
+    env.turn = state['turn']
+    env.counter = state['counter']
+    env.lab = state['lab']
+    env.starters = [world.find_species(name) for name in state['starters']]
+    env.player = world.load_character(
+        state['player']) if state['player'] is not None else None
+    env.enemy = world.load_character(
+        state['enemy']) if state['enemy'] is not None else None
+    version, internal, gauss = state['rng']
+    env.rng.setstate((version, tuple(internal), gauss))
+    return env
+
+
+def fork(world, state, rng=None, events=None):
+    """
+    Starts a new game from a checkpoint.
+
+    The world is the one the game was played in, randomized or not, so it isn't checked.
+    The fork continues with the checkpoint's random engine unless it's given one of its own,
+    which lets many games branch off the same checkpoint.
+    """
+    env = _restore(QuestEnv(world, random.Random(), events), state)
+    if rng is not None:
+        env.rng = rng
+    return env
+
+
+def _pack_string(value):
+    if value is None:
+        return LENGTH.pack(NO_NAME)
+    data = value.encode()
+    return LENGTH.pack(len(data)) + data
+
+
+def _pack_strings(values):
+    return LENGTH.pack(len(values)) + b''.join(map(_pack_string, values))
+
+
+def _pack_character(character):
+    if character is None:
+        return b'\x00'
+    return b''.join([
+        b'\x01',
+        CHARACTER.pack(
+            character['level'],
+            character['experience'],
+            character['max_health'],
+            character['strength'],
+            character['smarts'],
+            character['speed'],
+            character['health'],
+        ),
+        _pack_string(character['species']),
+        _pack_string(character['name']),
+        _pack_strings(character['actions']),
+        _pack_strings(character['conditions']),
+    ])
+
+
+def encode(state):
+    """ Packs a checkpoint into bytes. """
+    version, internal, gauss = state['rng']
+    return b''.join([
+        HEADER.pack(
+            CHECKPOINT_MAGIC,
+            CHECKPOINT_VERSION,
+            PHASES.index(state['phase']),
+            state['battles'],
+            state['turn'],
+            state['counter'],
+            state['lab'],
+            state['world'],
+            state['randomized'],
+        ),
+        _pack_string(state['seed']),
+        _pack_string(state['name']),
+        _pack_strings(state['starters']),
+        _pack_character(state['player']),
+        _pack_character(state['enemy']),
+        RNG_HEADER.pack(version, len(internal)),
+        struct.pack(f'<{len(internal)}I', *internal),
+        GAUSS.pack(gauss is not None, gauss or 0.0),
+    ])
+
+
+class _Reader:
+    def __init__(self, data):
+        self.data = data
+        self.offset = 0
+
+    def unpack(self, layout):
+        values = layout.unpack_from(self.data, self.offset)
+        self.offset += layout.size
+        return values
+
+    def string(self):
+        (length,) = self.unpack(LENGTH)
+        if length == NO_NAME:
+            return None
+        value = self.data[self.offset:self.offset + length].decode()
+        self.offset += length
+        return value
+
+    def strings(self):
+        (count,) = self.unpack(LENGTH)
+        return [self.string() for _ in range(count)]
+
+    def character(self):
+        present = self.data[self.offset]
+        self.offset += 1
+        if not present:
+            return None
+        level, experience, max_health, strength, smarts, speed, health = self.unpack(
+            CHARACTER)
+        return {
+            'species': self.string(),
+            'name': self.string(),
+            'level': level,
+            'experience': experience,
+            'max_health': max_health,
+            'strength': strength,
+            'smarts': smarts,
+            'speed': speed,
+            'health': health,
+            'actions': self.strings(),
+            'conditions': self.strings(),
+        }
+
+
+def decode(data):
+    """ Unpacks bytes from encode. """
+    reader = _Reader(data)
+    magic, version, phase, battles, turn, counter, lab, world, randomized = reader.unpack(HEADER)
+    if magic != CHECKPOINT_MAGIC or version != CHECKPOINT_VERSION:
+        raise ValueError('not a checkpoint, or one from another version')
+    state = {
+        'world': world,
+        'randomized': bool(randomized),
+        'seed': reader.string(),
+        'name': reader.string(),
+        'phase': PHASES[phase],
+        'battles': battles,
+        'turn': turn,
+        'counter': counter,
+        'lab': bool(lab),
+        'starters': reader.strings(),
+        'player': reader.character(),
+        'enemy': reader.character(),
+    }
+    rng_version, count = reader.unpack(RNG_HEADER)
+    internal = reader.unpack(struct.Struct(f'<{count}I'))
+    has_gauss, gauss = reader.unpack(GAUSS)
+    state['rng'] = (rng_version, internal, gauss if has_gauss else None)
+    return state
+
+
+def to_json(state):
+    return json.dumps(dict(state, world=state['world'].hex()))
+
+
+def from_json(data):
+    state = json.loads(data)
+    state['world'] = bytes.fromhex(state['world'])
+    version, internal, gauss = state['rng']
+    state['rng'] = (version, tuple(internal), gauss)
+    return state
+
+
+def write_checkpoint(path, state):
+    """ Saves a checkpoint, as json if the path ends in .json and binary otherwise. """
+    if path.endswith(JSON_SUFFIX):
+        with open(path, 'w') as f:
+            f.write(to_json(state))
+    else:
+        with open(path, 'wb') as f:
+            f.write(encode(state))
+
+
+def read_checkpoint(path):
+    if path.endswith(JSON_SUFFIX):
+        with open(path, 'r') as f:
+            return from_json(f.read())
+    with open(path, 'rb') as f:
+        return decode(f.read())
@@ -1,4 +1,9 @@
+import sys
+
+from logic import Logic
+
 USER_CONTROL = 'user'
+BUFFER_SIZE = 1 << 20
 
 
 def display_character(character):
@@ -12,24 +17,42 @@ def display_character(character):
 
 
 class CliDisplay:
-    # TODO: custom output
-    def __init__(self, logic=None):
+    # set when nothing is ever shown so callers can skip producing text
+    quiet = False
+
+    def __init__(self, logic=None, output=None):
         if logic is None or logic == USER_CONTROL:
             self.logic = USER_CONTROL
-        else:
+        elif isinstance(logic, Logic):
             self.logic = logic
+        else:
+            self.logic = Logic(logic)
+        self.output = output if output is not None else sys.stdout
 
         header = 4 * '\t'
         self.input_fmt = header + '{}'
         self.message_fmt = header + '  {}'
 
+    def write(self, line):
+        self.output.write(line + '\n')
+
+    def flush(self):
+        self.output.flush()
+
+    def close(self):
+        self.flush()
+
     def read_input(self):
+        self.flush()
         return input(self.input_fmt.format('> ')).strip()
 
-    def display_choice(self, choices):
-        print(self.message_fmt.format('  '.join(choices)))
+    def display_blank(self):
+        self.write('')
+
+    def display_choice(self, choices, player=None, enemy=None):
+        self.write(self.message_fmt.format('  '.join(choices)))
         if self.logic != USER_CONTROL:
-            return self.logic(choices)
+            return self.logic(choices, player, enemy)
         else:
             while True:
                 choice = self.read_input()
@@ -38,37 +61,111 @@ class CliDisplay:
                     if choice < len(choices):
                         return choice
                     else:
-                        print(self.message_fmt.format(
+                        self.write(self.message_fmt.format(
                             f"{choice} is not valid!"))
                         continue
                 except:
                     if choice in choices:
                         return choices.index(choice)
-                print(self.message_fmt.format(
+                self.write(self.message_fmt.format(
                     f"{choice if len(choice) > 0 else None} is not valid!"))
 
     def display_character(self, character):
-        print(self.message_fmt.format(' '.join(display_character(character))))
-        print(self.message_fmt.format(
+        self.write(self.message_fmt.format(
+            ' '.join(display_character(character))))
+        self.write(self.message_fmt.format(
             f'STR:{character.strength} SMT:{character.smarts} SPD:{character.speed}'))
-        print(self.message_fmt.format(
+        self.write(self.message_fmt.format(
             f"ACTIONS: {' '.join(character.actions)}"))
 
     def display_battle_frame(self, player, enemy):
-        print(self.message_fmt.format(
+        self.write(self.message_fmt.format(
             'ENEMY: ' + ' '.join(display_character(enemy))))
-        print(self.message_fmt.format(
+        self.write(self.message_fmt.format(
             'PLAYER: ' + ' '.join(display_character(player))))
 
     def display_battle(self, player, enemy):
         self.display_battle_frame(player, enemy)
-        print(self.message_fmt.format(
+        self.write(self.message_fmt.format(
             f'STR:{player.strength} SMT:{player.smarts} SPD:{player.speed}'))
-        print(self.message_fmt.format('ACTIONS:'))
-        return self.display_choice(player.actions)
+        self.write(self.message_fmt.format('ACTIONS:'))
+        return self.display_choice(player.actions, player, enemy)
 
     def display_log(self, log):
         if isinstance(log, str):
-            print(self.message_fmt.format(log))
+            self.write(self.message_fmt.format(log))
         else:
-            print('\n'.join(map(self.message_fmt.format, log)))
+            self.write('\n'.join(map(self.message_fmt.format, log)))
+
+
+class BufferedDisplay(CliDisplay):
+    def __init__(self, logic=None, output=None, buffer_size=BUFFER_SIZE):
+        """ Collects lines in memory and writes them out in bulk. """
+        super().__init__(logic, output)
+        self.buffer_size = buffer_size
+        self.lines = []
+        self.size = 0
+
+    def write(self, line):
+        self.lines.append(line)
+        self.size += len(line) + 1
+        if self.size >= self.buffer_size:
+            self.flush()
+
+    def flush(self):
+        if self.lines:
+            self.lines.append('')
+            self.output.write('\n'.join(self.lines))
+            self.lines = []
+            self.size = 0
+        self.output.flush()
+
+
+class FileDisplay(BufferedDisplay):
+    def __init__(self, path, logic=None, buffer_size=BUFFER_SIZE):
+        """ Writes the game to a file instead of the terminal. """
+        super().__init__(logic, open(path, 'w'), buffer_size)
+
+    def close(self):
+        self.flush()
+        self.output.close()
+
+
+class NullDisplay:
+    quiet = True
+
+    def __init__(self, logic):
+        """ Shows nothing and formats nothing, so a logic has to make every choice. """
+        if logic is None or logic == USER_CONTROL:
+            raise ValueError('the null display needs a logic')
+        self.logic = logic if isinstance(logic, Logic) else Logic(logic)
+
+    def write(self, line):
+        pass
+
+    def flush(self):
+        pass
+
+    def close(self):
+        pass
+
+    def read_input(self):
+        return ''
+
+    def display_blank(self):
+        pass
+
+    def display_choice(self, choices, player=None, enemy=None):
+        return self.logic(choices, player, enemy)
+
+    def display_character(self, character):
+        pass
+
+    def display_battle_frame(self, player, enemy):
+        pass
+
+    def display_battle(self, player, enemy):
+        return self.logic(player.actions, player, enemy)
+
+    def display_log(self, log):
+        pass
@@ -0,0 +1,101 @@
+import random
+
+from action import Attack, Condition, Defend, Heal, NOTHING
+from character import DEFEND, condition_bit
+
+# opcodes of the flattened effects
+ATTACK_OP = 0
+HEAL_OP = 1
+CONDITION_OP = 2
+DEFEND_OP = 3
+
+
+def compile_effect(effect):
+    """ Flattens an effect into an (opcode, value, chance) triple. """
+    if isinstance(effect, Attack):
+        return (ATTACK_OP, effect.power, effect.accuracy / 100)
+    elif isinstance(effect, Heal):
+        return (HEAL_OP, effect.power, 0)
+    elif isinstance(effect, Condition):
+        return (CONDITION_OP, condition_bit(effect.condition), 0)
+    elif isinstance(effect, Defend):
+        return (DEFEND_OP, 0, 0)
+    else:
+        raise ValueError(f'cannot compile effect {effect}')
+
+
+def _attack(power, accuracy, user, target, rng):
+    if target.condition_bits & DEFEND:
+        return
+    if rng.random() > accuracy:
+        return
+    user_power = user.level * user.strength
+    target_power = target.strength + target.smarts + target.speed
+    target.damage(int(power * (user_power / target_power)))
+
+
+def _heal(power, chance, user, target, rng):
+    user.heal(int((power * user.max_health) // 100))
+
+
+def _condition(bit, chance, user, target, rng):
+    if not target.condition_bits & DEFEND:
+        target.condition_bits |= bit
+
+
+def _defend(value, chance, user, target, rng):
+    user.condition_bits |= DEFEND
+
+
+# what runs each opcode, indexed by the opcode
+OPS = [_attack, _heal, _condition, _defend]
+OP_NAMES = ['attack', 'heal', 'condition', 'defend']
+
+
+class ActionTable:
+    def __init__(self, actions):
+        """ Interns action names to ids and compiles each action's effects into opcodes. """
+        self.names = list(actions)
+        self.ids = {name: i for i, name in enumerate(self.names)}
+        self.priority = [actions[name].priority for name in self.names]
+        self.ops = [tuple(map(compile_effect, actions[name].effects))
+                    for name in self.names]
+
+        # doing nothing gets the last id
+        self.nothing = len(self.names)
+        self.priority.append(NOTHING.priority)
+        self.ops.append(())
+
+    def action_ids(self, actions):
+        """ Translates action names into ids. """
+        return tuple(self.ids[action] for action in actions)
+
+    def execute(self, action, user, target, rng=random):
+        """ Runs an action's opcodes without producing any logs. """
+        for op, value, chance in self.ops[action]:
+            OPS[op](value, chance, user, target, rng)
+
+    def run_turn(self, player, player_action, enemy, enemy_action, rng=random):
+        """ The same turn as action.run_turn but with action ids. """
+        player_priority = self.priority[player_action]
+        enemy_priority = self.priority[enemy_action]
+        if player_priority != enemy_priority:
+            player_first = player_priority > enemy_priority
+        elif player.speed != enemy.speed:
+            player_first = player.speed > enemy.speed
+        else:
+            player_first = rng.random() < 0.5
+
+        if player_first:
+            first, first_action, second, second_action = player, player_action, enemy, enemy_action
+        else:
+            first, first_action, second, second_action = enemy, enemy_action, player, player_action
+
+        # don't let things happen if someone is dead
+        if player.health > 0 and enemy.health > 0:
+            self.execute(first_action, first, second, rng)
+        if player.health > 0 and enemy.health > 0:
+            self.execute(second_action, second, first, rng)
+
+        player.condition_bits &= ~DEFEND
+        enemy.condition_bits &= ~DEFEND
@@ -0,0 +1,140 @@
+"""
+Encounter indexes for large worlds.
+
+Species can carry optional encounter keys in the world file:
+
+- weight: how likely the species is to be encountered relative to the others, 1 by default
+- levels: the [lowest, highest] levels the species is encountered at, any level by default
+- starter: whether the species can be picked as a starter. If no species is, any can be
+
+An EncounterIndex is built once per world. It splits the levels into bands at every
+species' lowest and highest level, and samples each band's species in constant time with
+an alias table, built the first time the band is used. Bands where every weight is the
+same draw with a single randint, exactly like a plain uniform pick, so worlds without
+weights play out the same as they always have.
+"""
+from bisect import bisect_right
+
+ENCOUNTER_KEYS = ['weight', 'levels', 'starter']
+DEFAULT_WEIGHT = 1
+
+
+class AliasTable:
+    def __init__(self, weights):
+        """ Vose's alias method over a list of positive weights. """
+        n = len(weights)
+        total = sum(weights)
+        self.size = n
+        self.probability = [0.0] * n
+        self.alias = list(range(n))
+        scaled = [weight * n / total for weight in weights]
+        small = [i for i, weight in enumerate(scaled) if weight < 1]
+        large = [i for i, weight in enumerate(scaled) if weight >= 1]
+        while small and large:
+            less = small.pop()
+            more = large.pop()
+            self.probability[less] = scaled[less]
+            self.alias[less] = more
+            scaled[more] -= 1 - scaled[less]
+            (small if scaled[more] < 1 else large).append(more)
+        # whatever is left is 1 up to rounding
+        for i in small + large:
+            self.probability[i] = 1.0
+
+    def sample(self, rng):
+        """ Draws an index with a single random(). """
+        point = rng.random() * self.size
+        column = int(point)
+        return column if point - column < self.probability[column] else self.alias[column]
+
+
+class Bucket:
+    def __init__(self, members, weights):
+        """ Species indices to sample from, uniformly if every weight is the same. """
+        self.members = members
+        self.alias = None
+        if len(set(weights)) > 1:
+            self.alias = AliasTable(weights)
+
+    def __len__(self):
+        return len(self.members)
+
+    def sample(self, rng):
+        if self.alias is None:
+            return self.members[rng.randint(0, len(self.members) - 1)]
+        return self.members[self.alias.sample(rng)]
+
+
+def _band(record):
+    levels = record.get('levels')
+    return (None, None) if levels is None else tuple(levels)
+
+
+class EncounterIndex:
+    def __init__(self, records):
+        """ Indexes species records, which only need their names and encounter keys. """
+        names = []
+        weights = []
+        bands = []
+        starters = []
+        for i, record in enumerate(records):
+            names.append(record['name'])
+            weights.append(record.get('weight', DEFAULT_WEIGHT))
+            bands.append(_band(record))
+            if record.get('starter'):
+                starters.append(i)
+        self._index(names, weights, bands, starters)
+
+    @staticmethod
+    def from_columns(names, weights, bands, starters):
+        """ Indexes species from their names, weights, (low, high) bands and the positions of the starters. """
+        index = EncounterIndex([])
+        index._index(names, weights, bands, starters)
+        return index
+
+    def _index(self, names, weights, bands, starters):
+        self.positions = {name: i for i, name in enumerate(names)}
+        self.weights = weights
+        self.bands = bands
+
+        # a band starts at every lowest level and right after every highest level
+        self.boundaries = sorted({low for low, _ in self.bands if low is not None} | {
+            high + 1 for _, high in self.bands if high is not None})
+        self.everyone = Bucket(range(len(names)), self.weights)
+        self.starters = Bucket(starters, [self.weights[i] for i in starters]) \
+            if starters else self.everyone
+        self._buckets = {}
+
+    def find(self, name):
+        """ The position of a species by name. """
+        return self.positions[name]
+
+    def bucket(self, level):
+        """ The species encountered at a level, or every species if none are. """
+        band = bisect_right(self.boundaries, level)
+        bucket = self._buckets.get(band)
+        if bucket is None:
+            members = [i for i, (low, high) in enumerate(self.bands)
+                       if (low is None or low <= level) and (high is None or level <= high)]
+            if 0 < len(members) < len(self.bands):
+                bucket = Bucket(members, [self.weights[i] for i in members])
+            else:
+                bucket = self.everyone
+            self._buckets[band] = bucket
+        return bucket
+
+    def encounter(self, level, rng):
+        """ Picks the position of a species to encounter at a level. """
+        return self.bucket(level).sample(rng)
+
+    def pick_starters(self, count, rng):
+        """ Picks the positions of count different starters. """
+        if len(self.starters) < count:
+            raise ValueError(
+                f'the world needs at least {count} starter species')
+        starters = []
+        while len(starters) < count:
+            species = self.starters.sample(rng)
+            if species not in starters:
+                starters.append(species)
+        return starters
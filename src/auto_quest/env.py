@@ -0,0 +1,218 @@
+"""
+A step-based Auto-Quest game for programs to play.
+
+The environment runs the same game as the cli, but every decision is made by
+calling `step` with the index of one of `legal_actions()` instead of reading
+from a display. Nothing is printed; messages go to the optional events sink.
+"""
+import random
+
+from action import NOTHING, run_turn
+from character import character_state, new_character
+from events import DIED, FLED, FLEE_FAILED, GAINED_EXPERIENCE, TAMED, TAME_FAILED, TURN_START
+from logic import choose
+
+# phases
+STARTER = 'starter'
+BATTLE = 'battle'
+DROP = 'drop'
+EXPLORE = 'explore'
+ENCOUNTER = 'encounter'
+DONE = 'done'
+
+EXPLORE_CHOICES = ['scout', 'battle']
+ENCOUNTER_CHOICES = ['scout', 'tame', 'flee']
+MAX_ACTIONS = 4
+PLAYER_LEVEL = 5
+RIVAL_LEVEL = 3
+
+
+class QuestEnv:
+    def __init__(self, world, rng=random, events=None):
+        self.world = world
+        self.rng = rng
+        self.events = events
+        self.phase = DONE
+
+    def reset(self, name=None):
+        """ Starts a new game and returns the first observation. """
+        self.name = name
+        self.player = None
+        self.enemy = None
+        self.starters = self.world.create_starters(self.rng)
+        self.battles = 0
+        self.turn = 0
+        self.counter = 1
+        self.lab = True
+        self.phase = STARTER
+        return self.observation()
+
+    @property
+    def done(self):
+        return self.phase == DONE
+
+    def legal_actions(self):
+        """ The names of the choices that step accepts, in index order. """
+        if self.phase == STARTER:
+            return [starter['name'] for starter in self.starters]
+        elif self.phase in [BATTLE, DROP]:
+            return list(self.player.actions)
+        elif self.phase == EXPLORE:
+            return list(EXPLORE_CHOICES)
+        elif self.phase == ENCOUNTER:
+            return list(ENCOUNTER_CHOICES)
+        else:
+            return []
+
+    def choice_count(self):
+        """ How many choices step accepts, without listing them. """
+        if self.phase == STARTER:
+            return len(self.starters)
+        elif self.phase in [BATTLE, DROP]:
+            return len(self.player.actions)
+        elif self.phase == EXPLORE:
+            return len(EXPLORE_CHOICES)
+        elif self.phase == ENCOUNTER:
+            return len(ENCOUNTER_CHOICES)
+        else:
+            return 0
+
+    def observation(self):
+        return {
+            'phase': self.phase,
+            'choices': self.legal_actions(),
+            'player': character_state(self.player),
+            'enemy': character_state(self.enemy),
+            'battles': self.battles,
+            'turn': self.turn,
+        }
+
+    def step(self, choice):
+        """ Makes a decision and returns the (observation, reward, done, info) it leads to. """
+        reward = self.advance(choice)
+        return self.observation(), reward, self.done, {}
+
+    def advance(self, choice):
+        """ Makes a decision without building an observation and returns the reward. """
+        if self.phase == DONE:
+            raise ValueError('the game is over')
+        if not 0 <= choice < self.choice_count():
+            raise ValueError(f'{choice} is not a legal choice')
+
+        reward = 0
+        if self.phase == STARTER:
+            self._choose_starter(choice)
+        elif self.phase == BATTLE:
+            reward = self._battle_turn(choice)
+        elif self.phase == DROP:
+            self._drop(choice)
+        elif self.phase == EXPLORE:
+            self._explore(choice)
+        elif self.phase == ENCOUNTER:
+            self._encounter(choice)
+        return reward
+
+    def _emit(self, kind, *args):
+        if self.events is not None:
+            self.events.emit(kind, *args)
+
+    def _choose_starter(self, choice):
+        starter = self.starters[choice]
+        rival = self.starters[(choice + 1) % len(self.starters)]
+        self.player = new_character(
+            starter, name=self.name, level=PLAYER_LEVEL, table=self.world.level_table(starter))
+        self.enemy = new_character(
+            rival, level=RIVAL_LEVEL, table=self.world.level_table(rival))
+        self._start_battle()
+
+    def _start_battle(self):
+        self.phase = BATTLE
+        self.turn = 1
+
+    def _run_turn(self, player_action):
+        """ Runs a turn on the compiled actions, or on the actions themselves when someone is listening for events. """
+        enemy_action = self.enemy.actions[choose(self.enemy.actions, self.rng)]
+        if self.events is None:
+            table = self.world.table
+            player_id = table.nothing if player_action is None else table.ids[player_action]
+            table.run_turn(self.player, player_id, self.enemy,
+                           table.ids[enemy_action], self.rng)
+        else:
+            actions = self.world.actions
+            run_turn(self.player, NOTHING if player_action is None else actions[player_action],
+                     self.enemy, actions[enemy_action], self.rng, self.events)
+
+    def _battle_turn(self, choice):
+        self._emit(TURN_START, self.turn)
+        self._run_turn(self.player.actions[choice])
+        return self.end_turn()
+
+    def end_turn(self):
+        """ Moves the battle on once a turn has been resolved, here or by a VectorQuestEnv, and returns the reward. """
+        if self.player.health > 0 and self.enemy.health > 0:
+            self.turn += 1
+            return 0
+        elif self.player.health <= 0:
+            self._die()
+            return 0
+
+        self._emit(GAINED_EXPERIENCE, self.enemy.experience)
+        self.player.gain_experience(self.enemy.experience)
+        self._finish_battle()
+        return 1
+
+    def _finish_battle(self):
+        if len(self.player.actions) > MAX_ACTIONS:
+            self.phase = DROP
+            return
+        if self.lab:
+            self.player.refresh()
+            self.lab = False
+        self.battles += 1
+        self.enemy = None
+        self.phase = EXPLORE
+
+    def _drop(self, choice):
+        self.player.forget_action(self.player.actions[choice])
+        self._finish_battle()
+
+    def _random_enemy(self):
+        difficulty = int(self.player.level +
+                         self.rng.randint(0, self.battles) / self.player.level)
+        self.enemy = self.world.random_character(level=difficulty, rng=self.rng)
+
+    def _explore(self, choice):
+        self._random_enemy()
+        if choice == 0:
+            self.counter = 1
+            self.phase = ENCOUNTER
+        else:
+            self._start_battle()
+
+    def _encounter(self, choice):
+        if choice == 1:
+            self.counter += 1
+            if self.rng.random() > 1 / self.counter:
+                self._emit(TAMED, self.enemy.name)
+                self.enemy.name = self.player.name
+                self.player = self.enemy
+                self.enemy = None
+                self.phase = EXPLORE
+                return
+            self._emit(TAME_FAILED, self.enemy.name)
+        elif choice == 2:
+            self.counter += 1
+            if self.rng.random() > 1 / self.counter:
+                self._emit(FLED)
+                self.enemy = None
+                self.phase = EXPLORE
+                return
+            self._emit(FLEE_FAILED)
+
+        self._run_turn(None)
+        if self.player.health <= 0:
+            self._die()
+
+    def _die(self):
+        self._emit(DIED)
+        self.phase = DONE
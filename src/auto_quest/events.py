@@ -0,0 +1,124 @@
+"""
+Structured battle events.
+
+Emitters pass an event kind and its raw arguments to a sink, which only formats
+them when something asks for text. Passing no sink (`events=None`) turns events
+off entirely, which is what bulk simulations should do.
+"""
+from collections import deque
+
+# levels
+DEBUG = 10
+INFO = 20
+NOTICE = 30
+OFF = 100
+LEVELS = {'debug': DEBUG, 'info': INFO, 'notice': NOTICE, 'off': OFF}
+
+# kinds
+TURN_START = 'turn_start'
+ACTION = 'action'
+NOTHING = 'nothing'
+HIT = 'hit'
+MISS = 'miss'
+BLOCKED = 'blocked'
+HEAL = 'heal'
+DEFEND = 'defend'
+CONDITION = 'condition'
+FAINT = 'faint'
+GAINED_EXPERIENCE = 'gained_experience'
+TAMED = 'tamed'
+TAME_FAILED = 'tame_failed'
+FLED = 'fled'
+FLEE_FAILED = 'flee_failed'
+DIED = 'died'
+
+KIND_LEVELS = {
+    TURN_START: INFO,
+    ACTION: INFO,
+    NOTHING: INFO,
+    HIT: DEBUG,
+    MISS: DEBUG,
+    BLOCKED: DEBUG,
+    HEAL: DEBUG,
+    DEFEND: DEBUG,
+    CONDITION: DEBUG,
+    FAINT: INFO,
+    GAINED_EXPERIENCE: NOTICE,
+    TAMED: NOTICE,
+    TAME_FAILED: NOTICE,
+    FLED: NOTICE,
+    FLEE_FAILED: NOTICE,
+    DIED: NOTICE,
+}
+
+FORMATS = {
+    TURN_START: 'Turn {0}',
+    ACTION: '{0} uses {1}',
+    NOTHING: '{0} did nothing',
+    HIT: '{0} attacks {1}',
+    MISS: '{0} missed',
+    BLOCKED: '{0} is defending',
+    HEAL: '{0} heals',
+    DEFEND: '{0} defends',
+    CONDITION: '{0} has {1}',
+    FAINT: '{0} fainted',
+    GAINED_EXPERIENCE: 'gained {0} experience',
+    TAMED: 'successfully tamed {0}',
+    TAME_FAILED: 'failed to tame {0}',
+    FLED: 'successfully fled',
+    FLEE_FAILED: 'failed to flee',
+    DIED: 'died',
+}
+
+
+class Event:
+    __slots__ = ['kind', 'args']
+
+    def __init__(self, kind, args):
+        self.kind = kind
+        self.args = args
+
+    @property
+    def level(self):
+        return KIND_LEVELS[self.kind]
+
+    def __str__(self):
+        return FORMATS[self.kind].format(*self.args)
+
+    def __repr__(self):
+        return f'Event({self.kind!r}, {self.args!r})'
+
+
+class EventLog:
+    def __init__(self, level=DEBUG, limit=None):
+        """ Keeps the most recent events at or above the level. """
+        self.level = level
+        self.events = deque(maxlen=limit)
+
+    def emit(self, kind, *args):
+        if KIND_LEVELS[kind] >= self.level:
+            self.events.append(Event(kind, args))
+
+    def lines(self):
+        return [str(event) for event in self.events]
+
+    def clear(self):
+        self.events.clear()
+
+
+class DisplaySink:
+    def __init__(self, display, level=DEBUG):
+        """ Formats events onto a display as they happen. """
+        self.display = display
+        self.level = level
+
+    def emit(self, kind, *args):
+        if KIND_LEVELS[kind] >= self.level:
+            self.display.display_log(FORMATS[kind].format(*args))
+
+
+def create_sink(display, level):
+    """ Creates a display sink for a level name, or no sink when it's off or nothing is shown. """
+    if LEVELS[level] >= OFF or display.quiet:
+        return None
+    return DisplaySink(display, LEVELS[level])
@@ -0,0 +1,79 @@
+"""
+Bulk world generation.
+
+Every generated world is the base world with randomized species, drawn from its own
+engine seeded by the run's seed and the world's index, so any world can be regenerated
+on its own. Worlds are generated across a process pool and streamed to disk in order,
+either as one json world per line or as a directory of world files.
+"""
+import json
+import os
+
+from random import Random
+
+from action import Action
+from randomizer import randomize_action, randomize_species
+from rng import derive_seed
+from workers import create_pool, shared_state
+from world import World, world_to_dict
+
+JSONL_FORMAT = 'jsonl'
+WORLD_FORMAT = 'world'
+FORMATS = [JSONL_FORMAT, WORLD_FORMAT]
+NEW_ACTION_PREFIX = 'move'
+CHUNK_SIZE = 16
+
+
+def world_seed(seed, index):
+    return derive_seed(seed, index)
+
+
+def generate_world(base, seed, new_actions=0):
+    """ Randomizes the base world's species, optionally adding new actions for them to learn. """
+    rng = Random(seed)
+    actions = dict(base.actions)
+    for i in range(new_actions):
+        action = Action.from_dict(randomize_action(
+            f'{NEW_ACTION_PREFIX}-{i}', rng))
+        actions[action.name] = action
+    return World([randomize_species(species, actions, rng) for species in base.species], actions)
+
+
+def _generate(task):
+    index, seed, new_actions = task
+    world = world_to_dict(generate_world(shared_state(), seed, new_actions))
+    world['index'] = index
+    world['seed'] = seed
+    return json.dumps(world)
+
+
+def generate_worlds(base, count, seed, processes=None, new_actions=0, chunk_size=CHUNK_SIZE):
+    """
+    Yields each generated world as a line of json, in index order.
+
+    The lines are world files with the world's index and seed added.
+    """
+    tasks = ((index, world_seed(seed, index), new_actions)
+             for index in range(count))
+    with create_pool(base, processes) as pool:
+        yield from pool.imap(_generate, tasks, chunk_size)
+
+
+def write_worlds(worlds, destination, format=JSONL_FORMAT):
+    """ Streams generated worlds into a jsonl file or a directory of world files, returning the count. """
+    count = 0
+    if format == JSONL_FORMAT:
+        with open(destination, 'w') as f:
+            for world in worlds:
+                f.write(world)
+                f.write('\n')
+                count += 1
+    elif format == WORLD_FORMAT:
+        os.makedirs(destination, exist_ok=True)
+        for world in worlds:
+            with open(os.path.join(destination, f'world-{count}.json'), 'w') as f:
+                f.write(world)
+            count += 1
+    else:
+        raise ValueError(f'unknown format {format}')
+    return count
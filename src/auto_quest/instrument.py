@@ -0,0 +1,178 @@
+"""
+Opt-in counters for the engine's hot paths.
+
+`--profile` installs a Profile, which wraps the turn, action, effect, level up, rng and
+display write functions in place, along with the compiled effect handlers, and counts and times every call until the program
+exits. Nothing is wrapped unless it's installed, so the counters cost nothing when
+they're off. Only the main process is counted, not simulator workers.
+"""
+import json
+import random
+import sys
+import time
+
+from collections import defaultdict
+from functools import wraps
+
+import action
+import cli
+from character import Character
+import compiled
+from compiled import ActionTable
+
+TURN = 'turn'
+ACTION = 'action'
+EFFECT = 'effect'
+LEVEL_UP = 'level_up'
+RNG = 'rng'
+DISPLAY_WRITE = 'display_write'
+RNG_METHODS = ['random', 'randrange', 'randint', 'choice', 'sample']
+STDERR = '-'
+
+
+def _subclasses(cls):
+    """ The class and every class derived from it. """
+    classes = [cls]
+    for subclass in cls.__subclasses__():
+        classes.extend(_subclasses(subclass))
+    return classes
+
+
+class Profile:
+    def __init__(self):
+        """ Counts and total seconds of the wrapped calls, by category and key. """
+        self.counts = defaultdict(int)
+        self.seconds = defaultdict(float)
+        self._patches = []
+        self._rng_depth = 0
+
+    def record(self, category, key, seconds, count=1):
+        self.counts[(category, key)] += count
+        self.seconds[(category, key)] += seconds
+
+    def _wrap(self, function, category, key):
+        """ Times a function, recording it under key(*args). """
+        @wraps(function)
+        def timed(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                return function(*args, **kwargs)
+            finally:
+                self.record(category, key(*args), time.perf_counter() - start)
+        return timed
+
+    def _wrap_rng(self, function, name):
+        # rng methods call each other so only the outermost call is counted
+        @wraps(function)
+        def timed(*args, **kwargs):
+            if self._rng_depth:
+                return function(*args, **kwargs)
+            self._rng_depth += 1
+            start = time.perf_counter()
+            try:
+                return function(*args, **kwargs)
+            finally:
+                self._rng_depth -= 1
+                self.record(RNG, name, time.perf_counter() - start)
+        return timed
+
+    def _wrap_level_up(self, function):
+        @wraps(function)
+        def timed(character, level, *args, **kwargs):
+            start_level = character.level
+            start = time.perf_counter()
+            try:
+                return function(character, level, *args, **kwargs)
+            finally:
+                self.record(LEVEL_UP, character.species, time.perf_counter() - start,
+                            character.level - start_level)
+        return timed
+
+    def _patch(self, owner, name, replacement):
+        # classes may inherit the attribute, in which case uninstalling deletes the override
+        original = vars(owner).get(name) if isinstance(
+            owner, type) else getattr(owner, name)
+        self._patches.append((owner, name, original))
+        setattr(owner, name, replacement)
+
+    def _patch_item(self, items, index, replacement):
+        self._patches.append((items, index, items[index]))
+        items[index] = replacement
+
+    def install(self):
+        """ Wraps every hot path in place. """
+        # modules that imported run_turn hold their own reference to it
+        original = action.run_turn
+        run_turn = self._wrap(original, TURN, lambda *args: 'reference')
+        for module in list(sys.modules.values()):
+            if getattr(module, 'run_turn', None) is original:
+                self._patch(module, 'run_turn', run_turn)
+        self._patch(ActionTable, 'run_turn', self._wrap(
+            ActionTable.run_turn, TURN, lambda *args: 'compiled'))
+
+        self._patch(action.Action, 'act', self._wrap(
+            action.Action.act, ACTION, lambda user_action, *args: user_action.name))
+        self._patch(action.DoNothing, 'act', self._wrap(
+            action.DoNothing.act, ACTION, lambda *args: 'nothing'))
+        self._patch(ActionTable, 'execute', self._wrap(ActionTable.execute, ACTION, lambda table, action_id, *args: (
+            table.names[action_id] if action_id < len(table.names) else 'nothing')))
+        for effect in _subclasses(action.Effect)[1:]:
+            if 'apply' in vars(effect):
+                self._patch(effect, 'apply', self._wrap(
+                    effect.apply, EFFECT, lambda applied, *args: type(applied).__name__))
+        # the compiled table looks its handlers up in OPS on every effect
+        for op, name in enumerate(compiled.OP_NAMES):
+            self._patch_item(compiled.OPS, op, self._wrap(
+                compiled.OPS[op], EFFECT, lambda *args, name=name: name))
+
+        self._patch(Character, 'level_up',
+                    self._wrap_level_up(Character.level_up))
+
+        for name in RNG_METHODS:
+            self._patch(random.Random, name, self._wrap_rng(
+                getattr(random.Random, name), name))
+        # the module functions are bound to the hidden instance before it was wrapped
+        for name in RNG_METHODS:
+            self._patch(random, name, getattr(random._inst, name))
+
+        for display in _subclasses(cli.CliDisplay) + [cli.NullDisplay]:
+            if 'write' in vars(display):
+                self._patch(display, 'write', self._wrap(
+                    display.write, DISPLAY_WRITE, lambda shown, *args: type(shown).__name__))
+
+    def uninstall(self):
+        """ Puts back everything install wrapped. """
+        for owner, name, original in reversed(self._patches):
+            if isinstance(owner, list):
+                owner[name] = original
+            elif original is None:
+                delattr(owner, name)
+            else:
+                setattr(owner, name, original)
+        self._patches = []
+
+    def to_dict(self):
+        summary = defaultdict(dict)
+        for (category, key), count in sorted(self.counts.items()):
+            summary[category][key] = {
+                'count': count,
+                'seconds': self.seconds[(category, key)],
+            }
+        return dict(summary)
+
+    def format(self):
+        lines = [f"{'category':<16}{'key':<20}{'count':>12}{'seconds':>12}{'mean us':>12}"]
+        for (category, key), count in sorted(self.counts.items(), key=lambda item: -self.seconds[item[0]]):
+            seconds = self.seconds[(category, key)]
+            mean = seconds / count * 1e6 if count else 0
+            lines.append(
+                f'{category:<16}{key:<20}{count:>12}{seconds:>12.4f}{mean:>12.2f}')
+        return lines
+
+    def dump(self, path=STDERR):
+        """ Prints the summary table to stderr, or writes the counters to a json file. """
+        if path == STDERR:
+            print('\n'.join(self.format()), file=sys.stderr)
+            return
+        with open(path, 'w') as f:
+            json.dump(self.to_dict(), f, indent=2)
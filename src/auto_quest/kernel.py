@@ -0,0 +1,208 @@
+import numpy as np
+
+from character import DEFEND
+from compiled import ATTACK_OP, CONDITION_OP, DEFEND_OP, HEAL_OP
+
+NO_EFFECT = 0
+ATTACK_EFFECT = 1
+HEAL_EFFECT = 2
+DEFEND_EFFECT = 3
+TARGET_DEFEND_EFFECT = 4
+CONDITION_EFFECT = 5
+
+PLAYER_SIDE = 0
+ENEMY_SIDE = 1
+NO_WINNER = -1
+
+
+class ActionArrays:
+    def __init__(self, table):
+        """ Lays the compiled action table out as arrays indexed by action id. """
+        self.ids = table.ids
+
+        effect_count = max([len(ops) for ops in table.ops] + [1])
+        shape = (len(table.ops), effect_count)
+        self.priority = np.array(table.priority, dtype=np.int64)
+        self.effect_type = np.full(shape, NO_EFFECT, dtype=np.int64)
+        self.power = np.zeros(shape, dtype=np.int64)
+        self.accuracy = np.zeros(shape, dtype=np.float64)
+        # the condition bit a condition effect gives its target
+        self.condition = np.zeros(shape, dtype=np.int64)
+
+        for i, ops in enumerate(table.ops):
+            for j, (op, value, chance) in enumerate(ops):
+                if op == ATTACK_OP:
+                    self.effect_type[i, j] = ATTACK_EFFECT
+                    self.power[i, j] = value
+                    self.accuracy[i, j] = chance
+                elif op == HEAL_OP:
+                    self.effect_type[i, j] = HEAL_EFFECT
+                    self.power[i, j] = value
+                elif op == DEFEND_OP:
+                    self.effect_type[i, j] = DEFEND_EFFECT
+                elif op == CONDITION_OP and value & DEFEND:
+                    self.effect_type[i, j] = TARGET_DEFEND_EFFECT
+                # other conditions don't change how battles play out, but they're kept for the characters
+                elif op == CONDITION_OP:
+                    self.effect_type[i, j] = CONDITION_EFFECT
+                    self.condition[i, j] = value
+
+
+class BattleBatch:
+    def __init__(self, arrays, players, enemies):
+        """
+        Holds N battles as arrays of shape (N, 2), with the player on side 0.
+
+        A row whose player and enemy are None is left empty until a battle is loaded into it.
+        """
+        self.arrays = arrays
+        self.size = len(players)
+        shape = (self.size, 2)
+        self.health = np.zeros(shape, dtype=np.int64)
+        self.max_health = np.zeros(shape, dtype=np.int64)
+        self.strength = np.zeros(shape, dtype=np.int64)
+        self.smarts = np.zeros(shape, dtype=np.int64)
+        self.speed = np.zeros(shape, dtype=np.int64)
+        self.level = np.zeros(shape, dtype=np.int64)
+        self.defend = np.zeros(shape, dtype=bool)
+        # the condition bits of every condition but defend
+        self.conditions = np.zeros(shape, dtype=np.int64)
+
+        action_count = max([len(c.actions) for pair in zip(players, enemies)
+                            for c in pair if c is not None] + [1])
+        self.actions = np.zeros(shape + (action_count,), dtype=np.int64)
+        self.action_count = np.zeros(shape, dtype=np.int64)
+        # how often each side chose each of its actions
+        self.usage = np.zeros(shape + (action_count,), dtype=np.int64)
+        self.turns = np.zeros(self.size, dtype=np.int64)
+        self.rows = np.arange(self.size)
+
+        for i, (player, enemy) in enumerate(zip(players, enemies)):
+            if player is not None:
+                self.load(i, player, enemy)
+
+    def load(self, i, player, enemy):
+        """ Starts a battle between two characters in row i. """
+        for side, character in enumerate([player, enemy]):
+            self.health[i, side] = character.health
+            self.max_health[i, side] = character.max_health
+            self.strength[i, side] = character.strength
+            self.smarts[i, side] = character.smarts
+            self.speed[i, side] = character.speed
+            self.level[i, side] = character.level
+            self.conditions[i, side] = character.condition_bits & ~DEFEND
+
+            ids = [self.arrays.ids[action] for action in character.actions]
+            if len(ids) > self.actions.shape[2]:
+                width = ((0, 0), (0, 0), (0, len(ids) - self.actions.shape[2]))
+                self.actions = np.pad(self.actions, width)
+                self.usage = np.pad(self.usage, width)
+            self.actions[i, side, :len(ids)] = ids
+            self.action_count[i, side] = len(ids)
+        self.defend[i] = False
+        self.usage[i] = 0
+        self.turns[i] = 0
+
+    @property
+    def active(self):
+        return (self.health[:, PLAYER_SIDE] > 0) & (self.health[:, ENEMY_SIDE] > 0)
+
+    @property
+    def winner(self):
+        winner = np.full(self.size, NO_WINNER, dtype=np.int64)
+        winner[self.health[:, ENEMY_SIDE] <= 0] = PLAYER_SIDE
+        winner[self.health[:, PLAYER_SIDE] <= 0] = ENEMY_SIDE
+        return winner
+
+    def step(self, rng):
+        """ Resolves one turn of every active battle with uniformly random actions. """
+        rows = self.rows[self.active]
+        if len(rows) == 0:
+            return 0
+
+        # choose the actions like logic.choose does
+        picks = (rng.random((len(rows), 2)) *
+                 self.action_count[rows]).astype(np.int64)
+        self.turn(rows, picks, rng)
+        return len(rows)
+
+    def turn(self, rows, picks, rng):
+        """ Resolves one turn of the battles in rows, with each side using the action at its (N, 2) picks. """
+        chosen = self.actions[rows[:, None], np.arange(2), picks]
+        self.usage[rows, PLAYER_SIDE, picks[:, PLAYER_SIDE]] += 1
+        self.usage[rows, ENEMY_SIDE, picks[:, ENEMY_SIDE]] += 1
+
+        # get the turn order
+        priority = self.arrays.priority[chosen]
+        speed = self.speed[rows]
+        coin = rng.random(len(rows)) < 0.5
+        player_first = np.where(
+            priority[:, 0] != priority[:, 1],
+            priority[:, 0] > priority[:, 1],
+            np.where(speed[:, 0] != speed[:, 1], speed[:, 0] > speed[:, 1], coin))
+        first = np.where(player_first, PLAYER_SIDE, ENEMY_SIDE)
+
+        for user in [first, 1 - first]:
+            alive = (self.health[rows, PLAYER_SIDE] > 0) & (
+                self.health[rows, ENEMY_SIDE] > 0)
+            action = chosen[np.arange(len(rows)), user]
+            self._act(rows[alive], action[alive], user[alive], rng)
+
+        self.defend[rows] = False
+        self.turns[rows] += 1
+
+    def _act(self, rows, action, user, rng):
+        target = 1 - user
+        for j in range(self.arrays.effect_type.shape[1]):
+            effect_type = self.arrays.effect_type[action, j]
+            power = self.arrays.power[action, j]
+
+            attack = effect_type == ATTACK_EFFECT
+            attack &= ~self.defend[rows, target]
+            hit = rng.random(len(rows)) <= self.arrays.accuracy[action, j]
+            attack &= hit
+            if attack.any():
+                r, u, t = rows[attack], user[attack], target[attack]
+                user_power = self.level[r, u] * self.strength[r, u]
+                target_power = self.strength[r, t] + \
+                    self.smarts[r, t] + self.speed[r, t]
+                scale = user_power / target_power
+                damage = (power[attack] * scale).astype(np.int64)
+                self.health[r, t] = np.maximum(self.health[r, t] - damage, 0)
+
+            heal = effect_type == HEAL_EFFECT
+            if heal.any():
+                r, u = rows[heal], user[heal]
+                value = (power[heal] * self.max_health[r, u]) // 100
+                self.health[r, u] = np.minimum(
+                    self.health[r, u] + value, self.max_health[r, u])
+
+            defend = effect_type == DEFEND_EFFECT
+            if defend.any():
+                self.defend[rows[defend], user[defend]] = True
+
+            defend = effect_type == TARGET_DEFEND_EFFECT
+            if defend.any():
+                self.defend[rows[defend], target[defend]] = True
+
+            condition = (effect_type == CONDITION_EFFECT) & ~self.defend[rows, target]
+            if condition.any():
+                r, t = rows[condition], target[condition]
+                self.conditions[r, t] |= self.arrays.condition[action[condition], j]
+
+    def run(self, rng, max_turns):
+        """ Steps until every battle is over or has hit the turn limit. """
+        for _ in range(max_turns):
+            if self.step(rng) == 0:
+                break
+        return self.winner, self.turns
+
+
+def simulate_batch(world, player, enemy, battles, max_turns, rng=None, arrays=None):
+    """ Fights the same two characters against each other in a batch of battles. """
+    if rng is None:
+        rng = np.random.default_rng()
+    if arrays is None:
+        arrays = ActionArrays(world.table)
+    batch = BattleBatch(arrays, [player] * battles, [enemy] * battles)
+    return batch.run(rng, max_turns)
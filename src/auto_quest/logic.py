@@ -0,0 +1,82 @@
+"""
+Decision makers for the player.
+
+A logic file is a python module that exports `choose(choices)`, which returns the
+index of one of the choice names, and/or `choose_batch(decisions)`, which gets a
+list of pending decisions and returns one index for each. Every decision is a dict of
+`choices` plus the `player` and `enemy` states (see character.character_state), either
+of which is None outside of battles.
+"""
+import importlib.util
+import os
+import random
+import sys
+
+from functools import partial
+
+from character import character_state
+from mcts import MCTS_LOGIC, MctsBot, parse_options
+from pipe import EXEC_PREFIX, PipeBot
+
+RANDOM_LOGIC = 'random'
+
+
+def choose(choices, rng=random):
+    return rng.randint(0, len(choices) - 1)
+
+
+def decision(choices, player=None, enemy=None):
+    """ Describes a pending decision for choose_batch. """
+    return {
+        'choices': list(choices),
+        'player': character_state(player),
+        'enemy': character_state(enemy),
+    }
+
+
+class Logic:
+    def __init__(self, choose=None, choose_batch=None):
+        """ Wraps a logic's decision functions so either one can answer any decision. """
+        if choose is None and choose_batch is None:
+            raise ValueError('a logic needs choose or choose_batch')
+        self.choose = choose
+        self.batched = choose_batch is not None
+        self._choose_batch = choose_batch
+
+    def __call__(self, choices, player=None, enemy=None):
+        if self.choose is not None:
+            return self.choose(choices)
+        return self.choose_batch([decision(choices, player, enemy)])[0]
+
+    def choose_batch(self, decisions):
+        if self.batched:
+            choices = list(self._choose_batch(decisions))
+            if len(choices) != len(decisions):
+                raise ValueError(
+                    f'choose_batch answered {len(choices)} of {len(decisions)} decisions')
+            return choices
+        return [self.choose(decision['choices']) for decision in decisions]
+
+
+def load_logic(logic, rng=random, world=None):
+    """ Resolves a logic argument into a decision function. Searching logic needs the world. """
+    if logic is None:
+        return None
+    elif logic == RANDOM_LOGIC:
+        return Logic(partial(choose, rng=rng))
+    elif logic.split(':', 1)[0] == MCTS_LOGIC:
+        if world is None:
+            raise ValueError(f'{MCTS_LOGIC} logic needs a world')
+        options = parse_options(logic[len(MCTS_LOGIC) + 1:])
+        return Logic(choose_batch=MctsBot(world, rng, **options).choose_batch)
+    elif logic.startswith(EXEC_PREFIX):
+        return Logic(choose_batch=PipeBot(logic[len(EXEC_PREFIX):]).choose_batch)
+    elif os.path.exists(logic) and os.path.splitext(logic)[-1] == '.py':
+        spec = importlib.util.spec_from_file_location(
+            'auto_quest.logic', logic)
+        module = importlib.util.module_from_spec(spec)
+        sys.modules['auto_quest.logic'] = module
+        spec.loader.exec_module(module)
+        return Logic(getattr(module, 'choose', None), getattr(module, 'choose_batch', None))
+    else:
+        raise ValueError(f'unknown logic {logic}')
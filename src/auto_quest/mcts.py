@@ -0,0 +1,201 @@
+"""
+Monte Carlo tree search logic.
+
+`--logic mcts` answers every battle decision by playing many short battles out from it,
+assuming the opponent chooses uniformly at random like the game's enemies do. Options
+follow a colon as comma separated key=value pairs, e.g. `mcts:rollouts=2000,workers=4`:
+
+- rollouts: how many rollouts to run for each decision
+- time: how many seconds to search each decision for instead of a rollout count
+- workers: how many processes search each decision, with their root visits summed. Inside a
+  worker process, like a campaign's, the searches run one after another in that process
+- depth: how many turns to play before scoring an unfinished battle by remaining health
+
+Decisions outside of battles are made at random.
+"""
+import atexit
+import math
+import multiprocessing
+import random
+import time
+
+from workers import create_pool, shared_state
+
+MCTS_LOGIC = 'mcts'
+ROLLOUTS = 1000
+ROLLOUT_DEPTH = 50
+EXPLORATION = math.sqrt(2)
+OPTIONS = {
+    'rollouts': ('rollouts', int),
+    'time': ('seconds', float),
+    'workers': ('workers', int),
+    'depth': ('depth', int),
+}
+
+
+def parse_options(options):
+    """ Parses 'key=value,...' into MctsBot arguments. """
+    arguments = {}
+    for option in filter(None, options.split(',')):
+        key, _, value = option.partition('=')
+        if key not in OPTIONS:
+            raise ValueError(f'unknown mcts option {key}')
+        name, parse = OPTIONS[key]
+        arguments[name] = parse(value)
+    return arguments
+
+
+class Node:
+    __slots__ = ['visits', 'value', 'children']
+
+    def __init__(self, choices):
+        """ The statistics of one sequence of player choices. """
+        self.visits = 0
+        self.value = 0.0
+        self.children = [None] * choices
+
+
+def _select(node, rng):
+    untried = [choice for choice, child in enumerate(
+        node.children) if child is None]
+    if untried:
+        return rng.choice(untried)
+    log_visits = math.log(node.visits)
+    return max(range(len(node.children)), key=lambda choice: (
+        node.children[choice].value / node.children[choice].visits +
+        EXPLORATION * math.sqrt(log_visits / node.children[choice].visits)))
+
+
+def _rollout(table, player, enemy, player_actions, enemy_actions, turns, rng):
+    """ Plays random turns and scores the battle from the player's side. """
+    for _ in range(turns):
+        if player.health <= 0 or enemy.health <= 0:
+            break
+        table.run_turn(
+            player,
+            player_actions[rng.randrange(len(player_actions))],
+            enemy,
+            enemy_actions[rng.randrange(len(enemy_actions))],
+            rng,
+        )
+    if enemy.health <= 0:
+        return 1.0
+    if player.health <= 0:
+        return 0.0
+    player_share = player.health / player.max_health
+    return player_share / (player_share + enemy.health / enemy.max_health)
+
+
+def search(table, player, enemy, rollouts=ROLLOUTS, seconds=None, depth=ROLLOUT_DEPTH, rng=random):
+    """
+    Searches the player's choices with open loop UCT and returns how often each one was visited.
+
+    Every rollout rewinds both characters to where they started instead of copying them. They
+    are left as they were found.
+    """
+    player_actions = table.action_ids(player.actions)
+    enemy_actions = table.action_ids(enemy.actions)
+    player_start = player.snapshot()
+    enemy_start = enemy.snapshot()
+    root = Node(len(player_actions))
+    deadline = None if seconds is None else time.perf_counter() + seconds
+
+    iterations = 0
+    while iterations < rollouts if deadline is None else time.perf_counter() < deadline:
+        iterations += 1
+        player.restore(player_start)
+        enemy.restore(enemy_start)
+
+        # walk down the tree, adding the first node that isn't in it yet
+        node = root
+        path = [root]
+        turns = 0
+        while player.health > 0 and enemy.health > 0 and turns < depth:
+            choice = _select(node, rng)
+            table.run_turn(
+                player,
+                player_actions[choice],
+                enemy,
+                enemy_actions[rng.randrange(len(enemy_actions))],
+                rng,
+            )
+            turns += 1
+            child = node.children[choice]
+            if child is None:
+                child = node.children[choice] = Node(len(player_actions))
+                path.append(child)
+                break
+            node = child
+            path.append(child)
+
+        value = _rollout(table, player, enemy, player_actions,
+                         enemy_actions, depth - turns, rng)
+        for node in path:
+            node.visits += 1
+            node.value += value
+
+    player.restore(player_start)
+    enemy.restore(enemy_start)
+    return [0 if child is None else child.visits for child in root.children]
+
+
+def _search_task(task, world=None):
+    player, enemy, rollouts, seconds, depth, seed = task
+    world = world or shared_state()
+    return search(
+        world.table,
+        world.load_character(player),
+        world.load_character(enemy),
+        rollouts,
+        seconds,
+        depth,
+        random.Random(seed),
+    )
+
+
+def _is_battle(decision):
+    # encounters and drops have both characters too, but only battle turns choose from a live fight
+    player, enemy = decision['player'], decision['enemy']
+    return player is not None and enemy is not None and enemy['health'] > 0 and \
+        decision['choices'] == player['actions']
+
+
+class MctsBot:
+    def __init__(self, world, rng=random, rollouts=ROLLOUTS, seconds=None, workers=1, depth=ROLLOUT_DEPTH):
+        """ Searches battle decisions, splitting each search across worker processes if there are several and this process can start them. """
+        self.world = world
+        self.rng = rng
+        self.rollouts = rollouts
+        self.seconds = seconds
+        self.workers = workers
+        self.depth = depth
+        self.pool = None
+        # pool workers are daemons, which can't have children of their own
+        if workers > 1 and not multiprocessing.current_process().daemon:
+            self.pool = create_pool(world, workers)
+            atexit.register(self.close)
+
+    def choose_batch(self, decisions):
+        """ Answers each decision with its most visited choice. """
+        battles = [i for i, decision in enumerate(decisions) if _is_battle(decision)]
+        rollouts = math.ceil(self.rollouts / self.workers)
+        tasks = [(decisions[i]['player'], decisions[i]['enemy'], rollouts, self.seconds, self.depth, self.rng.getrandbits(64))
+                 for i in battles for _ in range(self.workers)]
+        if self.pool is not None:
+            results = self.pool.map(_search_task, tasks)
+        else:
+            results = [_search_task(task, self.world) for task in tasks]
+
+        choices = [self.rng.randrange(len(decision['choices']))
+                   for decision in decisions]
+        for n, i in enumerate(battles):
+            visits = [sum(counts) for counts in zip(
+                *results[n * self.workers:(n + 1) * self.workers])]
+            choices[i] = visits.index(max(visits))
+        return choices
+
+    def close(self):
+        if self.pool is not None:
+            self.pool.close()
+            self.pool.join()
+            self.pool = None
@@ -0,0 +1,93 @@
+"""
+Logic that runs in another process.
+
+`--logic exec:<command>` starts the command once and keeps talking to it over its
+stdin and stdout for the whole run. Every message is a frame: a 4-byte big-endian
+length followed by that many bytes of utf-8 json. The game sends requests like
+`{"id": 7, "choices": [...], "player": {...}, "enemy": {...}}` and the bot answers
+each one with `{"id": 7, "choice": 2}`. Many requests can be in flight at once and
+the answers may come back in any order, so bots can batch however they like.
+"""
+import atexit
+import json
+import shlex
+import struct
+import subprocess
+import sys
+
+EXEC_PREFIX = 'exec:'
+FRAME = struct.Struct('>I')
+WINDOW = 64
+
+
+def write_frame(stream, message):
+    data = json.dumps(message, separators=(',', ':')).encode()
+    stream.write(FRAME.pack(len(data)))
+    stream.write(data)
+
+
+def read_frame(stream):
+    """ Reads a frame, or returns None at the end of the stream. """
+    header = stream.read(FRAME.size)
+    if len(header) < FRAME.size:
+        return None
+    (size,) = FRAME.unpack(header)
+    return json.loads(stream.read(size))
+
+
+class PipeBot:
+    def __init__(self, command):
+        """ Starts the bot process and keeps it for every decision. """
+        self.command = command
+        self.process = subprocess.Popen(
+            shlex.split(command),
+            stdin=subprocess.PIPE,
+            stdout=subprocess.PIPE,
+        )
+        self.next_id = 0
+        atexit.register(self.close)
+
+    def _send(self, decision):
+        request = dict(decision)
+        request['id'] = self.next_id
+        self.next_id += 1
+        write_frame(self.process.stdin, request)
+        return request['id']
+
+    def _receive(self, answers):
+        response = read_frame(self.process.stdout)
+        if response is None:
+            raise RuntimeError(f'bot {self.command} exited')
+        answers[response['id']] = response['choice']
+
+    def choose_batch(self, decisions):
+        """ Pipelines the decisions to the bot, keeping at most WINDOW of them in flight. """
+        ids = []
+        answers = {}
+        for decision in decisions:
+            ids.append(self._send(decision))
+            if len(ids) - len(answers) >= WINDOW:
+                self.process.stdin.flush()
+                self._receive(answers)
+        self.process.stdin.flush()
+        while len(answers) < len(ids):
+            self._receive(answers)
+        return [answers[id] for id in ids]
+
+    def close(self):
+        if self.process.poll() is None:
+            self.process.stdin.close()
+            self.process.wait()
+
+
+def serve_bot(choose_batch, stdin=None, stdout=None):
+    """ Runs a python bot on the protocol, answering each request as it arrives. """
+    stdin = stdin or sys.stdin.buffer
+    stdout = stdout or sys.stdout.buffer
+    while True:
+        request = read_frame(stdin)
+        if request is None:
+            return
+        choices = choose_batch([request])
+        write_frame(stdout, {'id': request['id'], 'choice': choices[0]})
+        stdout.flush()
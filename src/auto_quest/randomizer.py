@@ -1,29 +1,54 @@
-from random import random, randint
+import random
 
+from encounters import ENCOUNTER_KEYS
+from world import World
 
-def randomize_attributes(attributes_types, attribute_total):
-    attributes = {attribute: random() for attribute in attributes_types}
+ATTACK_POWER = (10, 100)
+ATTACK_ACCURACY = (50, 100)
+HEAL_POWER = (10, 60)
+
+
+def randomize_attributes(attributes_types, attribute_total, rng=random):
+    attributes = {attribute: rng.random() for attribute in attributes_types}
     total_attributes = sum(attributes.values())
     return {attribute: int(attribute_total * attributes[attribute] / total_attributes) for attribute in attributes}
 
 
-def randomize_actions(levels, actions_pool):
-    actions = {}
-    counter = 0
-    while len(actions) < len(levels):
-        action = actions_pool[randint(0, len(actions_pool) - 1)]
-        if action not in actions.values():
-            actions[levels[counter]] = action
-            counter += 1
-    return actions
+def randomize_actions(levels, actions_pool, rng=random):
+    """ Assigns a different action to every level. """
+    return dict(zip(levels, rng.sample(actions_pool, len(levels))))
 
 
-def randomize_species(species, actions):
-    return {
+def randomize_species(species, actions, rng=random):
+    """ Randomizes a species' attributes and actions, keeping where and how often it's encountered. """
+    randomized = {
         'name': species['name'],
-        'attributes': randomize_attributes(species['attributes'].keys(), sum(species['attributes'].values())),
+        'attributes': randomize_attributes(species['attributes'].keys(), sum(species['attributes'].values()), rng),
         'actions': randomize_actions(
             list(species['actions'].keys()),
-            list(actions.keys())
+            list(actions.keys()),
+            rng,
         ),
     }
+    for key in ENCOUNTER_KEYS:
+        if key in species:
+            randomized[key] = species[key]
+    return randomized
+
+
+def randomize_action(name, rng=random):
+    """ Creates a new attack or heal action in the world file format. """
+    if rng.random() < 0.5:
+        effect = {
+            'type': 'attack',
+            'power': rng.randint(*ATTACK_POWER),
+            'accuracy': rng.randint(*ATTACK_ACCURACY),
+        }
+    else:
+        effect = {'type': 'heal', 'power': rng.randint(*HEAL_POWER)}
+    return {'name': name, 'effects': [effect], 'priority': 0}
+
+
+def randomize_world(world, rng=random):
+    """ A copy of the world with every species randomized. """
+    return World([randomize_species(species, world.actions, rng) for species in world.species], world.actions)
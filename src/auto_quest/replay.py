@@ -0,0 +1,152 @@
+"""
+Compact game recordings.
+
+A game is fully determined by its world, its seed and the decisions made in it, so a
+replay stores only those: a header with the sha256 of the world's content, the seed and
+player name, the decision indices packed one byte each and deflated, and a digest of the
+final observation so a replay that no longer plays out the same way is caught.
+
+The game's engine is seeded with the seed alone. Logic draws from its own engine (see
+logic_rng) so the decisions, not the logic, are all a replay needs.
+"""
+import hashlib
+import json
+import struct
+import zlib
+
+from random import Random
+
+from env import QuestEnv
+from logic import Logic
+from randomizer import randomize_world
+from rng import derive_seed
+from world import world_to_dict
+
+REPLAY_MAGIC = b'AQRP'
+REPLAY_VERSION = 1
+HEADER = struct.Struct('<4sHB32s8sI')
+LENGTH = struct.Struct('<H')
+RANDOMIZED = 1
+NO_NAME = 0xFFFF
+
+
+def world_hash(world):
+    """ The sha256 of a world's content, whatever file or cache it came from. """
+    return hashlib.sha256(json.dumps(world_to_dict(world), sort_keys=True).encode()).digest()
+
+
+def observation_digest(observation):
+    return hashlib.blake2b(json.dumps(observation, sort_keys=True).encode(), digest_size=8).digest()
+
+
+def logic_rng(seed):
+    """ The engine logic draws from, kept apart from the game's so decisions can be replayed without it. """
+    return Random(derive_seed(seed, 'logic')) if seed is not None else Random()
+
+
+def _pack_string(value):
+    if value is None:
+        return LENGTH.pack(NO_NAME)
+    data = value.encode()
+    return LENGTH.pack(len(data)) + data
+
+
+def _unpack_string(data, offset):
+    (length,) = LENGTH.unpack_from(data, offset)
+    offset += LENGTH.size
+    if length == NO_NAME:
+        return None, offset
+    return data[offset:offset + length].decode(), offset + length
+
+
+def encode_replay(replay):
+    """ Packs a replay dict into bytes. """
+    if any(not 0 <= decision < 256 for decision in replay['decisions']):
+        raise ValueError('decisions have to fit in a byte')
+    return b''.join([
+        HEADER.pack(
+            REPLAY_MAGIC,
+            REPLAY_VERSION,
+            RANDOMIZED if replay['randomized'] else 0,
+            replay['world'],
+            replay['digest'],
+            len(replay['decisions']),
+        ),
+        _pack_string(replay['seed']),
+        _pack_string(replay['name']),
+        zlib.compress(bytes(replay['decisions']), 9),
+    ])
+
+
+def decode_replay(data):
+    """ Unpacks bytes from encode_replay. """
+    magic, version, flags, world, digest, count = HEADER.unpack_from(data)
+    if magic != REPLAY_MAGIC or version != REPLAY_VERSION:
+        raise ValueError('not a replay, or one from another version')
+    seed, offset = _unpack_string(data, HEADER.size)
+    name, offset = _unpack_string(data, offset)
+    decisions = list(zlib.decompress(data[offset:]))
+    if len(decisions) != count:
+        raise ValueError('the replay is truncated')
+    return {
+        'world': world,
+        'randomized': bool(flags & RANDOMIZED),
+        'seed': seed,
+        'name': name,
+        'decisions': decisions,
+        'digest': digest,
+    }
+
+
+def create_replay(world, seed, name, decisions, observation, randomized=False):
+    """ Describes a finished recording, where world is the base world before any randomizing. """
+    return {
+        'world': world_hash(world),
+        'randomized': randomized,
+        'seed': seed,
+        'name': name,
+        'decisions': list(decisions),
+        'digest': observation_digest(observation),
+    }
+
+
+def write_replay(path, replay):
+    with open(path, 'wb') as f:
+        f.write(encode_replay(replay))
+
+
+def read_replay(path):
+    with open(path, 'rb') as f:
+        return decode_replay(f.read())
+
+
+def replay_env(world, replay, events=None):
+    """ Sets up the game a replay was recorded in, with the world and engine it started from. """
+    if world_hash(world) != replay['world']:
+        raise ValueError('the replay was recorded in a different world')
+    rng = Random(replay['seed'])
+    if replay['randomized']:
+        world = randomize_world(world, rng)
+    env = QuestEnv(world, rng, events)
+    env.reset(replay['name'])
+    return env
+
+
+def run_replay(world, replay, events=None):
+    """ Plays every decision back as fast as possible and returns the finished env. """
+    env = replay_env(world, replay, events)
+    for decision in replay['decisions']:
+        env.advance(decision)
+    verify_replay(env, replay)
+    return env
+
+
+def verify_replay(env, replay):
+    if observation_digest(env.observation()) != replay['digest']:
+        raise ValueError('the replay played out differently than it was recorded')
+
+
+def replay_logic(decisions):
+    """ A logic that answers with the recorded decisions in order. """
+    decisions = iter(decisions)
+    return Logic(lambda choices: next(decisions))
@@ -0,0 +1,303 @@
+"""
+Columnar battle results.
+
+A ResultStore is a directory with one flat binary file per column, which records are
+appended to a chunk at a time so memory stays bounded however many are stored. Battles
+go into one table and the actions each side used into another, with a row per action
+pointing back at its battle. Species and action names are stored as codes into name
+lists.
+
+Every chunk updates the store's aggregates as it's written: wins, losses, draws and
+turns for every species pair, a histogram of battle lengths and how often each side
+used each action. Those are kept in store.json, next to the row counts, so queries
+read the aggregates instead of the columns. Columns are memory mapped for anything
+the aggregates don't cover.
+"""
+import json
+import os
+
+import numpy as np
+
+from kernel import ENEMY_SIDE, NO_WINNER, PLAYER_SIDE
+from simulator import ENEMY, PLAYER, action_usage
+
+STORE_VERSION = 1
+META_FILE = 'store.json'
+CHUNK_SIZE = 65536
+BATTLES = 'battles'
+ACTIONS = 'actions'
+SCHEMA = {
+    BATTLES: [
+        ('player', np.uint32),
+        ('enemy', np.uint32),
+        ('player_level', np.uint16),
+        ('enemy_level', np.uint16),
+        ('winner', np.int8),
+        ('turns', np.uint32),
+        ('player_health', np.int32),
+        ('enemy_health', np.int32),
+    ],
+    ACTIONS: [
+        ('battle', np.uint64),
+        ('side', np.uint8),
+        ('action', np.uint32),
+        ('count', np.uint32),
+    ],
+}
+WINNERS = {PLAYER: PLAYER_SIDE, ENEMY: ENEMY_SIDE, None: NO_WINNER}
+SIDES = [PLAYER, ENEMY]
+
+
+def battle_record(player, enemy, turns, usage=None):
+    """ The record of a battle from its two characters and usage counts, once run_battle is done with them. """
+    winner = None
+    if enemy.health <= 0:
+        winner = PLAYER
+    elif player.health <= 0:
+        winner = ENEMY
+    return {
+        'player': player.species,
+        'enemy': enemy.species,
+        'player_level': player.level,
+        'enemy_level': enemy.level,
+        'winner': winner,
+        'turns': turns,
+        'player_health': player.health,
+        'enemy_health': enemy.health,
+        'usage': None if usage is None else (action_usage(player, usage[0]), action_usage(enemy, usage[1])),
+    }
+
+
+def simulation_record(matchups, result):
+    """ The record of a simulate result with details. """
+    player, enemy = matchups[result['matchup']]
+    return {
+        'player': player['species'],
+        'enemy': enemy['species'],
+        'player_level': player['level'],
+        'enemy_level': enemy['level'],
+        'winner': result['winner'],
+        'turns': result['turns'],
+        'player_health': result['player_health'],
+        'enemy_health': result['enemy_health'],
+        'usage': result['usage'],
+    }
+
+
+def store_results(store, matchups, results):
+    """ Appends simulate results to a store as they stream past. """
+    for result in results:
+        store.append(simulation_record(matchups, result))
+        yield result
+
+
+def _column_path(directory, table, column):
+    return os.path.join(directory, f'{table}.{column}.bin')
+
+
+class ResultStore:
+    def __init__(self, directory, chunk_size=CHUNK_SIZE, read_only=False):
+        """
+        Opens or creates a store, dropping anything past the last complete chunk.
+
+        A read only store must already exist and is left exactly as it is on disk.
+        """
+        self.directory = directory
+        self.chunk_size = chunk_size
+        self.read_only = read_only
+        meta_path = os.path.join(directory, META_FILE)
+        if read_only and not os.path.exists(meta_path):
+            raise ValueError(f'{directory} is not a results store')
+        if not read_only:
+            os.makedirs(directory, exist_ok=True)
+        if os.path.exists(meta_path):
+            with open(meta_path, 'r') as f:
+                meta = json.load(f)
+            if meta['version'] != STORE_VERSION:
+                raise ValueError('the store is from another version')
+        else:
+            meta = {
+                'version': STORE_VERSION,
+                'rows': {table: 0 for table in SCHEMA},
+                'species': [],
+                'actions': [],
+                'pairs': [],
+                'turns': [],
+                'usage': [[], []],
+            }
+        self.rows = meta['rows']
+        self.species = meta['species']
+        self.actions = meta['actions']
+        self._species_codes = {name: i for i, name in enumerate(self.species)}
+        self._action_codes = {name: i for i, name in enumerate(self.actions)}
+        self.pairs = {(player, enemy): stats for player,
+                      enemy, *stats in meta['pairs']}
+        self.turns = np.array(meta['turns'], dtype=np.int64)
+        self.usage = np.array(meta['usage'], dtype=np.int64).reshape(2, -1)
+        self._pending = {table: 0 for table in SCHEMA}
+        if read_only:
+            return
+
+        for table, columns in SCHEMA.items():
+            for column, dtype in columns:
+                path = _column_path(directory, table, column)
+                with open(path, 'ab') as f:
+                    f.truncate(self.rows[table] * np.dtype(dtype).itemsize)
+
+        self._buffers = {table: {column: np.empty(chunk_size, dtype) for column, dtype in columns}
+                         for table, columns in SCHEMA.items()}
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    def _code(self, codes, names, name):
+        code = codes.get(name)
+        if code is None:
+            code = codes[name] = len(names)
+            names.append(name)
+        return code
+
+    def _add(self, table, values):
+        if self._pending[table] == self.chunk_size:
+            self.flush()
+        row = self._pending[table]
+        for (column, _), value in zip(SCHEMA[table], values):
+            self._buffers[table][column][row] = value
+        self._pending[table] += 1
+
+    def append(self, record):
+        """ Adds a battle record, like the ones battle_record and simulation_record make. """
+        if self.read_only:
+            raise ValueError('the store is read only')
+        battle = self.rows[BATTLES] + self._pending[BATTLES]
+        self._add(BATTLES, (
+            self._code(self._species_codes, self.species, record['player']),
+            self._code(self._species_codes, self.species, record['enemy']),
+            record['player_level'],
+            record['enemy_level'],
+            WINNERS[record['winner']],
+            record['turns'],
+            record['player_health'],
+            record['enemy_health'],
+        ))
+        for side, counts in enumerate(record.get('usage') or ()):
+            for action, count in counts.items():
+                self._add(ACTIONS, (battle, side, self._code(
+                    self._action_codes, self.actions, action), count))
+
+    def _aggregate_battles(self, battles):
+        keys = battles['player'].astype(np.uint64) << np.uint64(32) | battles['enemy']
+        pairs, inverse = np.unique(keys, return_inverse=True)
+        stats = [
+            np.bincount(inverse, battles['winner'] == PLAYER_SIDE, len(pairs)),
+            np.bincount(inverse, battles['winner'] == ENEMY_SIDE, len(pairs)),
+            np.bincount(inverse, battles['winner'] == NO_WINNER, len(pairs)),
+            np.bincount(inverse, battles['turns'], len(pairs)),
+        ]
+        for i, key in enumerate(pairs.tolist()):
+            pair = self.pairs.setdefault((key >> 32, key & 0xFFFFFFFF), [0, 0, 0, 0])
+            for j, values in enumerate(stats):
+                pair[j] += int(values[i])
+
+        histogram = np.bincount(battles['turns'])
+        if len(histogram) > len(self.turns):
+            self.turns = np.concatenate(
+                [self.turns, np.zeros(len(histogram) - len(self.turns), dtype=np.int64)])
+        self.turns[:len(histogram)] += histogram
+
+    def _aggregate_actions(self, actions):
+        width = len(self.actions)
+        usage = np.bincount(actions['side'].astype(np.int64) * width + actions['action'],
+                            actions['count'], 2 * width).astype(np.int64).reshape(2, width)
+        usage[:, :self.usage.shape[1]] += self.usage
+        self.usage = usage
+
+    def flush(self):
+        """ Writes the buffered rows to their columns and folds them into the aggregates. """
+        chunks = {table: {column: buffer[:self._pending[table]] for column, buffer in buffers.items()}
+                  for table, buffers in self._buffers.items()}
+        self._aggregate_battles(chunks[BATTLES])
+        self._aggregate_actions(chunks[ACTIONS])
+        for table, columns in chunks.items():
+            for column, values in columns.items():
+                with open(_column_path(self.directory, table, column), 'ab') as f:
+                    values.tofile(f)
+            self.rows[table] += self._pending[table]
+            self._pending[table] = 0
+        self._save_meta()
+
+    def _save_meta(self):
+        meta = {
+            'version': STORE_VERSION,
+            'rows': self.rows,
+            'species': self.species,
+            'actions': self.actions,
+            'pairs': [[player, enemy, *stats] for (player, enemy), stats in self.pairs.items()],
+            'turns': self.turns.tolist(),
+            'usage': self.usage.tolist(),
+        }
+        path = os.path.join(self.directory, META_FILE)
+        with open(path + '.tmp', 'w') as f:
+            json.dump(meta, f)
+        os.replace(path + '.tmp', path)
+
+    def close(self):
+        if not self.read_only:
+            self.flush()
+
+    def column(self, table, column):
+        """ A read only memory map of a column's written rows. """
+        dtype = dict(SCHEMA[table])[column]
+        if self.rows[table] == 0:
+            return np.zeros(0, dtype)
+        return np.memmap(_column_path(self.directory, table, column), dtype, 'r', shape=(self.rows[table],))
+
+    def win_rates(self):
+        """ Wins, losses, draws, battles and total turns of every species pair that has fought. """
+        rates = {}
+        for (player, enemy), (wins, losses, draws, turns) in self.pairs.items():
+            battles = wins + losses + draws
+            rates[(self.species[player], self.species[enemy])] = {
+                'wins': wins,
+                'losses': losses,
+                'draws': draws,
+                'battles': battles,
+                'win_rate': wins / battles,
+                'turns': turns,
+            }
+        return rates
+
+    def turn_histogram(self):
+        """ How many battles lasted each number of turns. """
+        return self.turns.copy()
+
+    def action_usage(self):
+        """ How often the player and enemy used each action. """
+        return {side: {action: int(count) for action, count in zip(self.actions, counts) if count}
+                for side, counts in zip(SIDES, self.usage)}
+
+
+def format_store(store):
+    lines = [f'BATTLES:{store.rows[BATTLES]}']
+    for (player, enemy), stats in sorted(store.win_rates().items()):
+        lines.append(' '.join([
+            f'{player} vs {enemy}',
+            f"W:{stats['wins']} L:{stats['losses']} D:{stats['draws']}",
+            f"WIN:{stats['win_rate']:.3f}",
+            f"TURNS:{stats['turns'] / stats['battles']:.2f}",
+        ]))
+    histogram = store.turn_histogram()
+    if histogram.sum():
+        cumulative = np.cumsum(histogram) / histogram.sum()
+        percentiles = [int(np.searchsorted(cumulative, q))
+                       for q in [0.5, 0.9, 0.99]]
+        lines.append('TURNS P50:{} P90:{} P99:{} MAX:{}'.format(
+            *percentiles, len(histogram) - 1))
+    for side, usage in store.action_usage().items():
+        total = sum(usage.values())
+        lines.append(f'{side.upper()} ACTIONS: ' + ' '.join(
+            f'{action}:{count / total:.3f}' for action, count in sorted(usage.items(), key=lambda item: -item[1])))
+    return lines
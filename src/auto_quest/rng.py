@@ -0,0 +1,31 @@
+"""
+Random engines for the game.
+
+Anything that rolls dice takes an `rng` argument which defaults to the global
+`random` module. Any object with `random()`, `randint(a, b)` and `sample(population, k)`
+works, so seeded `random.Random` instances or faster generators can be swapped in.
+"""
+import hashlib
+
+from random import Random, SystemRandom
+
+
+def new_seed():
+    """ Draws a fresh 64-bit seed from the os. """
+    return SystemRandom().getrandbits(64)
+
+
+def derive_seed(seed, *keys):
+    """
+    Hashes a seed and a path of keys, like (worker, battle), into an independent 64-bit seed.
+
+    The seed is hashed as a string so a printed seed passed back with --seed derives the same engines.
+    """
+    digest = hashlib.blake2b(
+        repr((str(seed),) + keys).encode(), digest_size=8).digest()
+    return int.from_bytes(digest, 'little')
+
+
+def derive_rng(seed, *keys):
+    """ Creates an independent random engine for a path of keys under the seed. """
+    return Random(derive_seed(seed, *keys))
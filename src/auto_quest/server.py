@@ -0,0 +1,86 @@
+"""
+Hosts many games at once over a socket.
+
+Each connection plays its own game as a coroutine. The protocol is json lines:
+the client first sends its name (a line that may be empty), then the server sends
+`{"log": [...], "observation": {...}}` before every decision and the client answers
+with the index or name of a choice. Bad answers get `{"error": "..."}` and are asked
+again. The connection is closed once the game is done.
+"""
+import asyncio
+import json
+
+from random import Random
+
+from env import QuestEnv
+from events import EventLog, LEVELS
+from rng import derive_seed, new_seed
+
+DEFAULT_ADDRESS = '127.0.0.1:7777'
+UNIX_PREFIX = 'unix:'
+LOG_LIMIT = 1000
+
+
+def parse_choice(line, choices):
+    """ Reads a choice the same way the cli does, by index or by name. """
+    line = line.strip()
+    try:
+        choice = int(line)
+    except ValueError:
+        if line in choices:
+            return choices.index(line)
+        raise ValueError(f'{line if line else None} is not valid!')
+    if not 0 <= choice < len(choices):
+        raise ValueError(f'{choice} is not valid!')
+    return choice
+
+
+class GameServer:
+    def __init__(self, world, seed=None, log_level='debug'):
+        self.world = world
+        self.seed = seed if seed is not None else new_seed()
+        self.log_level = LEVELS[log_level]
+        self.sessions = 0
+
+    async def send(self, writer, message):
+        writer.write(json.dumps(message).encode() + b'\n')
+        await writer.drain()
+
+    async def play(self, reader, writer):
+        """ Plays one game over a connection. """
+        session = self.sessions
+        self.sessions += 1
+        events = EventLog(self.log_level, limit=LOG_LIMIT)
+        env = QuestEnv(self.world, Random(
+            derive_seed(self.seed, session)), events)
+        try:
+            name = (await reader.readline()).decode().strip()
+            env.reset(name if name else None)
+            while True:
+                await self.send(writer, {'log': events.lines(), 'observation': env.observation()})
+                events.clear()
+                if env.done:
+                    break
+
+                line = await reader.readline()
+                if not line:
+                    break
+                try:
+                    choice = parse_choice(line.decode(), env.legal_actions())
+                except ValueError as error:
+                    await self.send(writer, {'error': str(error)})
+                    continue
+                env.advance(choice)
+        except ConnectionError:
+            pass
+        finally:
+            writer.close()
+
+    async def serve(self, address=DEFAULT_ADDRESS):
+        if address.startswith(UNIX_PREFIX):
+            server = await asyncio.start_unix_server(self.play, path=address[len(UNIX_PREFIX):])
+        else:
+            host, port = address.rsplit(':', 1)
+            server = await asyncio.start_server(self.play, host, int(port))
+        async with server:
+            await server.serve_forever()
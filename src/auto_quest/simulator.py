@@ -0,0 +1,331 @@
+import random
+
+from functools import partial
+
+from character import new_character
+from logic import RANDOM_LOGIC, Logic, choose, decision, load_logic
+from rng import derive_rng, derive_seed, new_seed
+from workers import create_pool, shared_state, worker_cache
+
+PLAYER = 'player'
+ENEMY = 'enemy'
+MAX_TURNS = 1000
+CHUNK_SIZE = 1000
+REFERENCE_ENGINE = 'reference'
+NUMPY_ENGINE = 'numpy'
+ENGINES = [REFERENCE_ENGINE, NUMPY_ENGINE]
+
+
+def parse_combatant(combatant):
+    """ Parses a 'species:level[:logic]' string into a combatant. """
+    fields = combatant.split(':', 2)
+    if len(fields) < 2:
+        raise ValueError(f'expected species:level[:logic], got {combatant}')
+    return {
+        'species': fields[0],
+        'level': int(fields[1]),
+        'logic': fields[2] if len(fields) > 2 else RANDOM_LOGIC,
+    }
+
+
+def parse_matchup(matchup):
+    """ Parses a 'player,enemy' string into a pair of combatants. """
+    combatants = matchup.split(',')
+    if len(combatants) != 2:
+        raise ValueError(f'expected player,enemy, got {matchup}')
+    return tuple(map(parse_combatant, combatants))
+
+
+def format_combatant(combatant):
+    return f"{combatant['species']}:{combatant['level']}"
+
+
+def run_battle(player, enemy, table, player_logic, enemy_logic, max_turns=MAX_TURNS, rng=random, usage=None):
+    """
+    Fights a battle on the compiled actions and returns the winner and the number of turns.
+
+    usage, if given, is a pair of lists counting how often the player and enemy chose each of their actions.
+    """
+    player_actions = table.action_ids(player.actions)
+    enemy_actions = table.action_ids(enemy.actions)
+    turns = 0
+    while player.health > 0 and enemy.health > 0:
+        if turns >= max_turns:
+            return None, turns
+        turns += 1
+        player_choice = player_logic(player.actions)
+        enemy_choice = enemy_logic(enemy.actions)
+        if usage is not None:
+            usage[0][player_choice] += 1
+            usage[1][enemy_choice] += 1
+        table.run_turn(
+            player,
+            player_actions[player_choice],
+            enemy,
+            enemy_actions[enemy_choice],
+            rng,
+        )
+    return (PLAYER if player.health > 0 else ENEMY), turns
+
+
+def _decide(logic, active, characters, opponents):
+    if isinstance(logic, Logic) and logic.batched:
+        return logic.choose_batch([decision(characters[i].actions, characters[i], opponents[i]) for i in active])
+    elif isinstance(logic, list):
+        return [logic[i](characters[i].actions) for i in active]
+    return [logic(characters[i].actions) for i in active]
+
+
+def run_battles(players, enemies, table, player_logic, enemy_logic, max_turns=MAX_TURNS, rngs=None, usages=None):
+    """
+    Fights many battles in lockstep so batched logic makes all of a turn's decisions in one call.
+
+    Each logic is either one decision function, a batched Logic, or a list with a function per battle.
+    usages, if given, holds a pair of counts for each battle like run_battle's usage.
+    """
+    if rngs is None:
+        rngs = [random] * len(players)
+    player_actions = [table.action_ids(player.actions) for player in players]
+    enemy_actions = [table.action_ids(enemy.actions) for enemy in enemies]
+    results = [None] * len(players)
+    turns = 0
+    active = list(range(len(players)))
+    while active:
+        still_active = []
+        for i in active:
+            if players[i].health <= 0 or enemies[i].health <= 0:
+                results[i] = (PLAYER if players[i].health > 0 else ENEMY), turns
+            elif turns >= max_turns:
+                results[i] = None, turns
+            else:
+                still_active.append(i)
+        active = still_active
+        if not active:
+            break
+
+        turns += 1
+        player_choices = _decide(player_logic, active, players, enemies)
+        enemy_choices = _decide(enemy_logic, active, enemies, players)
+        for i, player_choice, enemy_choice in zip(active, player_choices, enemy_choices):
+            if usages is not None:
+                usages[i][0][player_choice] += 1
+                usages[i][1][enemy_choice] += 1
+            table.run_turn(
+                players[i],
+                player_actions[i][player_choice],
+                enemies[i],
+                enemy_actions[i][enemy_choice],
+                rngs[i],
+            )
+    return results
+
+
+def battle_rng(seed, key, battle):
+    """ The random engine of a single battle, so it can be replayed on its own. """
+    return derive_rng(seed, key, battle)
+
+
+def replay_battle(world, matchup, seed, key, battle, max_turns=MAX_TURNS, engine=REFERENCE_ENGINE):
+    """ Re-runs one battle of a reference engine simulation from its seed, matchup key and battle index. """
+    if engine != REFERENCE_ENGINE:
+        raise ValueError(
+            f'only {REFERENCE_ENGINE} engine battles can be replayed')
+    rng = battle_rng(seed, key, battle)
+    player_species = world.find_species(matchup[0]['species'])
+    enemy_species = world.find_species(matchup[1]['species'])
+    player = new_character(player_species, level=matchup[0]['level'],
+                           table=world.level_table(player_species))
+    enemy = new_character(enemy_species, level=matchup[1]['level'],
+                          table=world.level_table(enemy_species))
+    return run_battles(
+        [player],
+        [enemy],
+        world.table,
+        load_logic(matchup[0]['logic'], rng, world),
+        load_logic(matchup[1]['logic'], rng, world),
+        max_turns,
+        [rng],
+    )[0]
+
+
+def _get_logic(logic, rng):
+    # random logic has to share the battle's engine to be reproducible
+    if logic == RANDOM_LOGIC:
+        return partial(choose, rng=rng)
+    logics = worker_cache()
+    if logic not in logics:
+        logics[logic] = load_logic(logic, world=shared_state())
+    return logics[logic]
+
+
+def _create_combatant(combatant):
+    world = shared_state()
+    species = world.find_species(combatant['species'])
+    return new_character(species, level=combatant['level'], table=world.level_table(species))
+
+
+def new_usage(player, enemy):
+    """ Zeroed usage counts for run_battle. """
+    return [0] * len(player.actions), [0] * len(enemy.actions)
+
+
+def action_usage(character, counts):
+    """ Names the usage counts of a character's actions. """
+    return {action: count for action, count in zip(character.actions, counts) if count}
+
+
+def _details(player, enemy, usage):
+    return player.health, enemy.health, (action_usage(player, usage[0]), action_usage(enemy, usage[1]))
+
+
+def _run_numpy_chunk(index, key, start, player, enemy, count, max_turns, seed, details):
+    # numpy is only needed for this engine
+    import numpy as np
+    from kernel import ActionArrays, BattleBatch, ENEMY_SIDE, PLAYER_SIDE
+
+    cache = worker_cache()
+    if ActionArrays not in cache:
+        cache[ActionArrays] = ActionArrays(shared_state().table)
+    rng = np.random.default_rng(derive_seed(seed, key, start))
+    batch = BattleBatch(cache[ActionArrays], [player] * count, [enemy] * count)
+    winners, turns = batch.run(rng, max_turns)
+    sides = {PLAYER_SIDE: PLAYER, ENEMY_SIDE: ENEMY}
+    results = [(index, start + i, sides.get(winner), turn, None)
+               for i, (winner, turn) in enumerate(zip(winners.tolist(), turns.tolist()))]
+    if details:
+        health = batch.health.tolist()
+        usage = batch.usage.tolist()
+        for i, result in enumerate(results):
+            results[i] = result[:4] + ((health[i][PLAYER_SIDE], health[i][ENEMY_SIDE], (
+                action_usage(player, usage[i][PLAYER_SIDE]), action_usage(enemy, usage[i][ENEMY_SIDE]))),)
+    return results
+
+
+def _run_lockstep_chunk(index, key, matchup, start, count, max_turns, seed, details):
+    battles = range(start, start + count)
+    rngs = [battle_rng(seed, key, battle) for battle in battles]
+
+    def side_logic(combatant):
+        if combatant['logic'] == RANDOM_LOGIC:
+            return [partial(choose, rng=rng) for rng in rngs]
+        return _get_logic(combatant['logic'], None)
+
+    players = [_create_combatant(matchup[0]) for _ in battles]
+    enemies = [_create_combatant(matchup[1]) for _ in battles]
+    usages = [new_usage(players[i], enemies[i]) for i in range(count)] if details else None
+    results = run_battles(
+        players,
+        enemies,
+        shared_state().table,
+        side_logic(matchup[0]),
+        side_logic(matchup[1]),
+        max_turns,
+        rngs,
+        usages,
+    )
+    return [(index, battle, winner, turns, _details(players[i], enemies[i], usages[i]) if details else None)
+            for i, (battle, (winner, turns)) in enumerate(zip(battles, results))]
+
+
+def _is_batched(combatant):
+    return combatant['logic'] != RANDOM_LOGIC and _get_logic(combatant['logic'], None).batched
+
+
+def _run_chunk(task):
+    index, key, matchup, start, count, max_turns, engine, seed, details = task
+    player = _create_combatant(matchup[0])
+    enemy = _create_combatant(matchup[1])
+    if engine == NUMPY_ENGINE:
+        return _run_numpy_chunk(index, key, start, player, enemy, count, max_turns, seed, details)
+    if _is_batched(matchup[0]) or _is_batched(matchup[1]):
+        return _run_lockstep_chunk(index, key, matchup, start, count, max_turns, seed, details)
+
+    results = []
+    for battle in range(start, start + count):
+        rng = battle_rng(seed, key, battle)
+        player.refresh()
+        enemy.refresh()
+        usage = new_usage(player, enemy) if details else None
+        winner, turns = run_battle(
+            player,
+            enemy,
+            shared_state().table,
+            _get_logic(matchup[0]['logic'], rng),
+            _get_logic(matchup[1]['logic'], rng),
+            max_turns,
+            rng,
+            usage,
+        )
+        results.append((index, battle, winner, turns,
+                        _details(player, enemy, usage) if details else None))
+    return results
+
+
+def _chunks(matchups, keys, battles, chunk_size, max_turns, engine, seed, details):
+    for index, (key, matchup) in enumerate(zip(keys, matchups)):
+        for start in range(0, battles, chunk_size):
+            yield index, key, matchup, start, min(chunk_size, battles - start), max_turns, engine, seed, details
+
+
+def simulate(world, matchups, battles, processes=None, chunk_size=CHUNK_SIZE, max_turns=MAX_TURNS, engine=REFERENCE_ENGINE, seed=None, keys=None, details=False):
+    """
+    Runs battles for every matchup across a process pool, yielding each result as it finishes.
+
+    With the reference engine every battle draws from its own engine derived from the seed,
+    its matchup's key and its index, so any single battle can be reproduced with
+    replay_battle. The numpy engine draws a whole chunk of battles from one engine derived
+    from the chunk's first battle instead, so its results depend on the chunk size and its
+    battles can only be reproduced by running their chunk again. The keys default to the
+    matchups' positions. With details, results also have the health both sides were
+    left with and the usage of each side's actions, as a pair of name to count dicts.
+    """
+    if engine not in ENGINES:
+        raise ValueError(f'unknown engine {engine}')
+    if engine == NUMPY_ENGINE:
+        for player, enemy in matchups:
+            if player['logic'] != RANDOM_LOGIC or enemy['logic'] != RANDOM_LOGIC:
+                raise ValueError(
+                    'the numpy engine only supports random logic')
+    if seed is None:
+        seed = new_seed()
+    if keys is None:
+        keys = range(len(matchups))
+    tasks = _chunks(matchups, keys, battles,
+                    chunk_size, max_turns, engine, seed, details)
+    with create_pool(world, processes) as pool:
+        for results in pool.imap_unordered(_run_chunk, tasks):
+            for index, battle, winner, turns, battle_details in results:
+                result = {'matchup': index, 'battle': battle,
+                          'winner': winner, 'turns': turns}
+                if battle_details is not None:
+                    result['player_health'], result['enemy_health'], result['usage'] = battle_details
+                yield result
+
+
+def summarize(matchups, results):
+    """ Tallies streamed results into per-matchup wins, losses, draws and turns. """
+    summary = [{'wins': 0, 'losses': 0, 'draws': 0, 'turns': 0}
+               for _ in matchups]
+    for result in results:
+        stats = summary[result['matchup']]
+        if result['winner'] == PLAYER:
+            stats['wins'] += 1
+        elif result['winner'] == ENEMY:
+            stats['losses'] += 1
+        else:
+            stats['draws'] += 1
+        stats['turns'] += result['turns']
+    return summary
+
+
+def format_summary(matchups, summary):
+    lines = []
+    for (player, enemy), stats in zip(matchups, summary):
+        battles = stats['wins'] + stats['losses'] + stats['draws']
+        lines.append(' '.join([
+            f'{format_combatant(player)} vs {format_combatant(enemy)}',
+            f"W:{stats['wins']} L:{stats['losses']} D:{stats['draws']}",
+            f"WIN:{stats['wins'] / max(battles, 1):.3f}",
+            f"TURNS:{stats['turns'] / max(battles, 1):.2f}",
+        ]))
+    return lines
@@ -0,0 +1,277 @@
+"""
+Exact battle outcomes.
+
+A battle is a Markov chain over the health of both sides. Defend is the only condition
+that changes how actions play out, whether a character defends itself or an action
+gives it to its target, and it never outlives the turn it was used in, so
+(player health, enemy health) is the whole state between turns. Every turn is expanded
+into its exact outcome distribution once for all reachable states, which is memoized as
+the battle's transition graph, and outcomes are then computed by pushing the probability
+of every state through the graph one turn at a time.
+
+Strategies are None for the uniform random choice of logic.choose, or a dict or a
+function mapping (player health, enemy health) to the index of the chosen action.
+"""
+import numpy as np
+
+from character import DEFEND
+from compiled import ATTACK_OP, CONDITION_OP, DEFEND_OP, HEAL_OP
+from simulator import MAX_TURNS
+
+# probability left unresolved before a battle counts as decided
+TOLERANCE = 1e-12
+
+PLAYER_SIDE = 0
+ENEMY_SIDE = 1
+
+
+def _concat(branches, rows):
+    """ Appends copies of the given rows to every column of the branches. """
+    return [np.concatenate([column, column[rows]]) for column in branches]
+
+
+class BattleSolver:
+    def __init__(self, player, enemy, table):
+        """ Solves battles from the current health of two characters on a compiled action table. """
+        self.table = table
+        self.start = (player.health, enemy.health)
+        self.actions = (table.action_ids(player.actions),
+                        table.action_ids(enemy.actions))
+        self.speed = (player.speed, enemy.speed)
+        self.max_health = (player.max_health, enemy.max_health)
+        # attack damage only depends on the stats, never on the state
+        self.scale = (
+            player.level * player.strength /
+            (enemy.strength + enemy.smarts + enemy.speed),
+            enemy.level * enemy.strength /
+            (player.strength + player.smarts + player.speed),
+        )
+        self._graph = None
+
+    def _act(self, branches, action, user):
+        """ Applies an action's effects to every branch, splitting branches on accuracy rolls. """
+        target = 1 - user
+        row, p, health0, health1, defend0, defend1 = branches
+        # the action goes ahead if both were alive before it, even if an effect ends the battle
+        alive = (health0 > 0) & (health1 > 0)
+        for op, value, chance in self.table.ops[action]:
+            health = [health0, health1]
+            defend = [defend0, defend1]
+            if op == ATTACK_OP:
+                hit = min(max(chance, 0.0), 1.0)
+                active = alive & ~defend[target]
+                if hit == 0 or not active.any():
+                    continue
+                if hit < 1:
+                    # misses are copies of the attacked branches with the rest of the chance
+                    misses = np.nonzero(active)[0]
+                    p = np.concatenate(
+                        [np.where(active, p * hit, p), p[misses] * (1 - hit)])
+                    row, health0, health1, defend0, defend1, alive = _concat(
+                        [row, health0, health1, defend0, defend1, alive], misses)
+                    active = np.concatenate(
+                        [active, np.zeros(len(misses), dtype=bool)])
+                    health = [health0, health1]
+                    defend = [defend0, defend1]
+                damage = int(value * self.scale[user])
+                health[target] = np.where(active, np.maximum(
+                    health[target] - damage, 0), health[target])
+            elif op == HEAL_OP:
+                heal = int((value * self.max_health[user]) // 100)
+                health[user] = np.where(alive, np.minimum(
+                    health[user] + heal, self.max_health[user]), health[user])
+            elif op == DEFEND_OP:
+                defend[user] = defend[user] | alive
+            elif op == CONDITION_OP and value & DEFEND:
+                defend[target] = defend[target] | alive
+            # other conditions don't change any action
+            health0, health1 = health
+            defend0, defend1 = defend
+        return [row, p, health0, health1, defend0, defend1]
+
+    def turn(self, player_health, enemy_health, player_action, enemy_action):
+        """
+        Expands one turn from many states at once.
+
+        Returns the source row, probability and resulting healths of every outcome.
+        """
+        priority = (self.table.priority[player_action],
+                    self.table.priority[enemy_action])
+        if priority[0] != priority[1]:
+            orders = [(priority[0] > priority[1], 1.0)]
+        elif self.speed[0] != self.speed[1]:
+            orders = [(self.speed[0] > self.speed[1], 1.0)]
+        else:
+            orders = [(True, 0.5), (False, 0.5)]
+
+        actions = (player_action, enemy_action)
+        count = len(player_health)
+        outcomes = []
+        for player_first, p in orders:
+            first = PLAYER_SIDE if player_first else ENEMY_SIDE
+            branches = [
+                np.arange(count),
+                np.full(count, p),
+                player_health,
+                enemy_health,
+                np.zeros(count, dtype=bool),
+                np.zeros(count, dtype=bool),
+            ]
+            branches = self._act(branches, actions[first], first)
+            branches = self._act(branches, actions[1 - first], 1 - first)
+            outcomes.append(branches[:4])
+        return [np.concatenate(column) for column in zip(*outcomes)]
+
+    def graph(self):
+        """
+        Explores every state reachable from the start under any choices.
+
+        Live states get indices in the order they are found, with the start at 0. Won and lost
+        battles are the two indices after the live states. Each transition records its source,
+        destination, probability and the choices of both sides.
+        """
+        if self._graph is not None:
+            return self._graph
+
+        width = self.max_health[ENEMY_SIDE] + 1
+        index = np.full((self.max_health[PLAYER_SIDE] + 1) * width, -1, dtype=np.int64)
+        player_states = [np.array([self.start[0]])]
+        enemy_states = [np.array([self.start[1]])]
+        index[self.start[0] * width + self.start[1]] = 0
+        count = 1
+        transitions = []
+
+        frontier = 0, player_states[0], enemy_states[0]
+        while len(frontier[1]):
+            base, player_health, enemy_health = frontier
+            found = []
+            for player_choice, player_action in enumerate(self.actions[PLAYER_SIDE]):
+                for enemy_choice, enemy_action in enumerate(self.actions[ENEMY_SIDE]):
+                    row, p, next_player, next_enemy = self.turn(
+                        player_health, enemy_health, player_action, enemy_action)
+                    transitions.append((
+                        base + row,
+                        next_player * width + next_enemy,
+                        p,
+                        np.full(len(row), player_choice),
+                        np.full(len(row), enemy_choice),
+                    ))
+                    live = (next_player > 0) & (next_enemy > 0)
+                    found.append(next_player[live] * width + next_enemy[live])
+
+            codes = np.unique(np.concatenate(found))
+            codes = codes[index[codes] < 0]
+            index[codes] = np.arange(count, count + len(codes))
+            frontier = count, codes // width, codes % width
+            player_states.append(frontier[1])
+            enemy_states.append(frontier[2])
+            count += len(codes)
+
+        source, codes, p, player_choice, enemy_choice = [
+            np.concatenate(column) for column in zip(*transitions)]
+        player_health, enemy_health = codes // width, codes % width
+        destination = np.where(enemy_health <= 0, count, np.where(
+            player_health <= 0, count + 1, index[codes]))
+        self._graph = {
+            'states': (np.concatenate(player_states), np.concatenate(enemy_states)),
+            'source': source,
+            'destination': destination,
+            'p': p,
+            'choices': (player_choice, enemy_choice),
+        }
+        return self._graph
+
+    def _weights(self, strategy, side):
+        """ How likely each transition's choice is under a strategy. """
+        graph = self.graph()
+        choices = graph['choices'][side]
+        if strategy is None:
+            return np.full(len(choices), 1 / len(self.actions[side]))
+        chosen = np.array([
+            strategy(int(player), int(enemy)) if callable(strategy) else strategy.get((int(player), int(enemy)), -1)
+            for player, enemy in zip(*graph['states'])])
+        return (chosen[graph['source']] == choices).astype(float)
+
+    def _matrix(self, weights, mask=None):
+        """ Merges the weighted transitions into one (source, destination, probability) matrix. """
+        graph = self.graph()
+        source, destination, p = graph['source'], graph['destination'], graph['p'] * weights
+        if mask is not None:
+            source, destination, p = source[mask], destination[mask], p[mask]
+        size = len(graph['states'][0]) + 2
+        keys, inverse = np.unique(
+            source * size + destination, return_inverse=True)
+        return keys // size, keys % size, np.bincount(inverse, weights=p)
+
+    def evaluate(self, player_strategy=None, enemy_strategy=None, max_turns=MAX_TURNS, tolerance=TOLERANCE):
+        """
+        The exact chances to win, lose or draw within max_turns and the expected number of turns.
+
+        Turns count draws as max_turns, the same way the simulator summarizes them.
+        """
+        if self.start[0] <= 0 or self.start[1] <= 0:
+            return {'win': float(self.start[0] > 0), 'loss': float(self.start[0] <= 0),
+                    'draw': 0.0, 'turns': 0.0, 'states': 0}
+
+        count = len(self.graph()['states'][0])
+        source, destination, p = self._matrix(self._weights(
+            player_strategy, PLAYER_SIDE) * self._weights(enemy_strategy, ENEMY_SIDE))
+        # states where a strategy has no choice would silently leak probability
+        stuck = np.bincount(source, weights=p, minlength=count) < 1 - 1e-9
+
+        distribution = np.zeros(count)
+        distribution[0] = 1.0
+        win = loss = turns = 0.0
+        for turn in range(1, max_turns + 1):
+            if distribution[stuck].any():
+                state = np.nonzero(distribution * stuck)[0][0]
+                raise ValueError(
+                    f'the strategy has no choice at {tuple(int(states[state]) for states in self.graph()["states"])}')
+            moved = np.bincount(destination, weights=p *
+                                distribution[source], minlength=count + 2)
+            win += moved[count]
+            loss += moved[count + 1]
+            turns += turn * (moved[count] + moved[count + 1])
+            distribution = moved[:count]
+            if distribution.sum() < tolerance:
+                break
+
+        draw = distribution.sum() if turn == max_turns else 0.0
+        return {
+            'win': float(win),
+            'loss': float(loss),
+            'draw': float(draw),
+            'turns': float(turns + max_turns * draw),
+            'states': count,
+        }
+
+    def optimal_policy(self, enemy_strategy=None, max_turns=MAX_TURNS, tolerance=TOLERANCE):
+        """
+        The player strategy with the highest chance to win within max_turns against the enemy strategy.
+
+        Returns the strategy as a dict from state to choice along with its evaluation.
+        """
+        if self.start[0] <= 0 or self.start[1] <= 0:
+            return {}, self.evaluate(max_turns=max_turns)
+
+        graph = self.graph()
+        count = len(graph['states'][0])
+        weights = self._weights(enemy_strategy, ENEMY_SIDE)
+        matrices = [self._matrix(weights, graph['choices'][PLAYER_SIDE] == choice)
+                    for choice in range(len(self.actions[PLAYER_SIDE]))]
+
+        # each sweep is the best chance to win with one more turn left
+        value = np.zeros(count + 2)
+        value[count] = 1.0
+        for _ in range(max_turns):
+            chances = np.stack([np.bincount(source, weights=p * value[destination], minlength=count)
+                                for source, destination, p in matrices])
+            best = chances.max(axis=0)
+            change = np.abs(best - value[:count]).max()
+            value[:count] = best
+            if change < tolerance:
+                break
+
+        policy = {(int(player), int(enemy)): int(choice) for player, enemy, choice in zip(
+            *graph['states'], chances.argmax(axis=0))}
+        return policy, self.evaluate(policy, enemy_strategy, max_turns, tolerance)
@@ -0,0 +1,37 @@
+import os
+import tempfile
+import unittest
+
+from benchmark import compare, load_history, run_benchmarks, save_history
+
+WORLD_FILE = os.path.join(os.path.dirname(__file__), 'test_world.json')
+
+
+def make_run(**seconds):
+    return {'results': {name: {'seconds': value, 'per_second': 1 / value} for name, value in seconds.items()}}
+
+
+class TestBenchmark(unittest.TestCase):
+    def test_run_benchmarks(self):
+        run = run_benchmarks(
+            WORLD_FILE, ['world_load', 'compiled_turn'], repeat=1)
+        self.assertEqual(list(run['results']), ['world_load', 'compiled_turn'])
+        for result in run['results'].values():
+            self.assertGreater(result['seconds'], 0)
+        with self.assertRaises(ValueError):
+            run_benchmarks(WORLD_FILE, ['nothing'], repeat=1)
+
+    def test_compare(self):
+        baseline = make_run(a=1.0, b=1.0, c=1.0)
+        run = make_run(a=1.05, b=1.5, c=0.5, d=9.0)
+        self.assertEqual(list(compare(run, baseline, 0.1)), ['b'])
+        self.assertEqual(list(compare(run, baseline, 0.01)), ['a', 'b'])
+
+    def test_history(self):
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'history.json')
+            history = load_history(path)
+            self.assertIsNone(history['baseline'])
+            history['runs'].append(make_run(a=1.0))
+            save_history(path, history)
+            self.assertEqual(load_history(path), history)
@@ -0,0 +1,97 @@
+import json
+import os
+import shutil
+import tempfile
+import time
+import unittest
+
+from cache import compile_world, load_cached_world, validate_world
+from character import CONDITION_BITS
+from compiled import CONDITION_OP
+from world import load_world
+
+WORLD_FILE = os.path.join(os.path.dirname(__file__), 'test_world.json')
+LARGE_WORLD_SPECIES = 20000
+
+
+def best_time(load, world_file):
+    times = []
+    for _ in range(3):
+        start = time.perf_counter()
+        world = load(world_file)
+        world.encounters
+        times.append(time.perf_counter() - start)
+    return min(times)
+
+
+class TestCache(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.world_file = os.path.join(self.directory, 'world.json')
+        shutil.copy(WORLD_FILE, self.world_file)
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def test_compile_world(self):
+        self.assertIsNone(load_cached_world(self.world_file))
+        compile_world(self.world_file)
+
+        world = load_cached_world(self.world_file)
+        expected = load_world(self.world_file)
+        self.assertEqual(world.species, expected.species)
+        self.assertEqual(
+            {name: action.to_dict() for name, action in world.actions.items()},
+            {name: action.to_dict() for name, action in expected.actions.items()})
+
+    def test_cached_table(self):
+        with open(self.world_file) as f:
+            world_dict = json.load(f)
+        world_dict['actions'].append({'name': 'taunt', 'priority': 0, 'effects': [
+            {'type': 'condition', 'condition': 'taunted'}]})
+        with open(self.world_file, 'w') as f:
+            json.dump(world_dict, f)
+        compile_world(self.world_file)
+
+        # another process can hand out the bits in any order
+        bits = dict(CONDITION_BITS)
+        CONDITION_BITS['cached elsewhere'] = CONDITION_BITS.pop('taunted')
+        try:
+            table = load_cached_world(self.world_file).table
+            expected = load_world(self.world_file).table
+            self.assertEqual(table.names, expected.names)
+            self.assertEqual(table.priority, expected.priority)
+            self.assertEqual(table.ops, expected.ops)
+            self.assertEqual(table.ops[table.ids['taunt']],
+                             ((CONDITION_OP, CONDITION_BITS['taunted'], 0),))
+        finally:
+            CONDITION_BITS.clear()
+            CONDITION_BITS.update(bits)
+
+    def test_cache_is_faster(self):
+        with open(self.world_file) as f:
+            world_dict = json.load(f)
+        species = world_dict['species']
+        world_dict['species'] = [dict(species[i % len(species)], name=f'species {i}')
+                                 for i in range(LARGE_WORLD_SPECIES)]
+        with open(self.world_file, 'w') as f:
+            json.dump(world_dict, f)
+        compile_world(self.world_file)
+
+        self.assertEqual(load_cached_world(self.world_file).species, load_world(self.world_file).species)
+        self.assertLess(best_time(load_cached_world, self.world_file), best_time(load_world, self.world_file))
+
+    def test_stale_cache(self):
+        compile_world(self.world_file)
+        with open(self.world_file) as f:
+            world_dict = json.load(f)
+        world_dict['species'][0]['attributes']['health'] += 1
+        with open(self.world_file, 'w') as f:
+            json.dump(world_dict, f)
+        self.assertIsNone(load_cached_world(self.world_file))
+
+    def test_validate_world(self):
+        world = load_world(self.world_file)
+        world.species[0]['actions'][4] = 'fireball'
+        with self.assertRaises(ValueError):
+            validate_world(world)
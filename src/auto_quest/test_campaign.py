@@ -0,0 +1,87 @@
+import os
+import tempfile
+import unittest
+
+from campaign import CampaignColumns, level_curve, play_campaign, read_campaigns, simulate_campaigns, summarize_campaigns, write_campaigns
+from world import load_world
+
+WORLD_FILE = os.path.join(os.path.dirname(__file__), 'test_world.json')
+
+
+class TestCampaign(unittest.TestCase):
+    def test_play_campaign(self):
+        world = load_world(WORLD_FILE)
+        for run in range(20):
+            stats = play_campaign(world, 'random', 'seed', run, max_turns=100)
+            self.assertEqual(stats, play_campaign(
+                world, 'random', 'seed', run, max_turns=100))
+            self.assertTrue(stats['died'] or stats['stalled'])
+            self.assertLessEqual(stats['tames'], stats['tame_attempts'])
+            self.assertEqual(len(stats['player_levels']),
+                             len(stats['enemy_levels']))
+            self.assertIn(len(stats['player_levels']),
+                          [stats['battles'], stats['battles'] + 1])
+
+    def test_printed_seed(self):
+        world = load_world(WORLD_FILE)
+        self.assertEqual(play_campaign(world, 'random', 1234, 0, max_turns=100),
+                         play_campaign(world, 'random', '1234', 0, max_turns=100))
+
+    def test_max_battles(self):
+        world = load_world(WORLD_FILE)
+        for run in range(20):
+            stats = play_campaign(world, 'random', 'seed',
+                                  run, max_battles=1, max_turns=100)
+            self.assertLessEqual(stats['battles'], 1)
+            if not stats['died'] and not stats['stalled']:
+                self.assertEqual(stats['battles'], 1)
+
+    def test_no_battles(self):
+        with self.assertRaises(ValueError):
+            play_campaign(load_world(WORLD_FILE), 'random', 'seed', 0, max_battles=0)
+
+    def test_searching_logic(self):
+        # logics that need the world get the one they're playing in
+        for world in [load_world(WORLD_FILE), load_world(WORLD_FILE)]:
+            stats = play_campaign(world, 'mcts:rollouts=5', 'seed', 0,
+                                  max_battles=1, max_turns=100)
+            self.assertLessEqual(stats['battles'], 1)
+
+    def test_simulate_campaigns(self):
+        world = load_world(WORLD_FILE)
+        runs = list(simulate_campaigns(world, 10, 'random', 'seed',
+                    processes=2, max_turns=100, chunk_size=3))
+        self.assertEqual([stats['run'] for stats in runs], list(range(10)))
+        self.assertEqual(runs[7], play_campaign(
+            world, 'random', 'seed', 7, max_turns=100))
+
+    def test_columns(self):
+        columns = CampaignColumns()
+        for run, levels in enumerate([[5, 6, 7], [5], [5, 8]]):
+            columns.append({
+                'run': run,
+                'battles': len(levels),
+                'decisions': 10,
+                'turns': 5,
+                'tames': 1,
+                'tame_attempts': 2,
+                'flees': 0,
+                'died': True,
+                'stalled': False,
+                'level': levels[-1],
+                'species': 'slime',
+                'player_levels': levels,
+                'enemy_levels': [level - 1 for level in levels],
+            })
+        self.assertEqual(level_curve(columns.arrays()).tolist(), [5, 7, 7])
+
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'runs.npz')
+            write_campaigns(path, columns)
+            arrays = read_campaigns(path)
+        self.assertEqual(arrays['offsets'].tolist(), [0, 3, 4, 6])
+        self.assertEqual(arrays['species'].tolist(), ['slime'] * 3)
+        summary = summarize_campaigns(arrays)
+        self.assertEqual(summary['deaths'], 3)
+        self.assertEqual(summary['tame_rate'], 0.5)
+        self.assertEqual(summary['curve'], {1: (5.0, 4.0)})
@@ -1,46 +1,123 @@
+import pickle
 import unittest
 
-from character import new_character
+from character import CONDITION_BITS, Character, new_character
 
 BASE_ATTRIBUTE = 10
+SPECIES = {
+    'name': 'onion',
+    'attributes': {
+        'health': BASE_ATTRIBUTE,
+        'strength': BASE_ATTRIBUTE,
+        'smarts': BASE_ATTRIBUTE,
+        'speed': BASE_ATTRIBUTE,
+    },
+    'actions': {1: 'attack', 3: 'heal'},
+}
 
 
 class TestCharacter(unittest.TestCase):
     def test_character(self):
-        character = new_character(species={
-            'name': 'onion',
-            'attributes': {
-                'health': BASE_ATTRIBUTE,
-                'strength': BASE_ATTRIBUTE,
-                'smarts': BASE_ATTRIBUTE,
-                'speed': BASE_ATTRIBUTE,
-            },
-            'moves': {},
-            'experience': [100, 125],
-        })
+        character = new_character(species=SPECIES)
 
         character.gain_level()
         self.assertEqual(
-            character.character['attributes'],
+            character.to_dict()['character']['attributes'],
             {
                 'health': BASE_ATTRIBUTE,
                 'strength': BASE_ATTRIBUTE,
                 'smarts': BASE_ATTRIBUTE,
                 'speed': BASE_ATTRIBUTE,
             })
-        self.assertEqual(character.status['health'], 0)
+        self.assertEqual(character.health, 0)
 
         character.refresh()
-        self.assertEqual(character.status['health'], BASE_ATTRIBUTE)
+        self.assertEqual(character.health, BASE_ATTRIBUTE)
 
         character.damage(1)
-        self.assertEqual(character.status['health'], BASE_ATTRIBUTE - 1)
+        self.assertEqual(character.health, BASE_ATTRIBUTE - 1)
 
         character.heal(1)
-        self.assertEqual(character.status['health'], BASE_ATTRIBUTE)
+        self.assertEqual(character.health, BASE_ATTRIBUTE)
 
         character.damage(100)
-        self.assertEqual(character.status['health'], 0)
+        self.assertEqual(character.health, 0)
 
         character.heal(100)
-        self.assertEqual(character.status['health'], BASE_ATTRIBUTE)
+        self.assertEqual(character.health, BASE_ATTRIBUTE)
+
+    def test_actions(self):
+        character = new_character(species=SPECIES, level=3)
+        self.assertEqual(character.actions, ('attack', 'heal'))
+
+        character.forget_action('attack')
+        self.assertEqual(character.actions, ('heal',))
+
+    def test_conditions(self):
+        character = new_character(species=SPECIES, level=1)
+        character.add_condition('defend')
+        character.add_condition('poison')
+        self.assertTrue(character.has_condition('defend'))
+        self.assertEqual(set(character.conditions), {'defend', 'poison'})
+
+        character.remove_condition('defend')
+        self.assertFalse(character.has_condition('defend'))
+        self.assertEqual(character.conditions, ('poison',))
+
+        character.refresh()
+        self.assertEqual(character.conditions, ())
+
+        # reading a condition that was never added doesn't register it
+        self.assertFalse(character.has_condition('unheard of'))
+        character.remove_condition('unheard of')
+        self.assertNotIn('unheard of', CONDITION_BITS)
+
+    def test_level_up(self):
+        for level in [1, 2, 3, 40, 150]:
+            stepped = new_character(species=SPECIES)
+            for _ in range(level):
+                stepped.gain_level()
+            jumped = new_character(species=SPECIES)
+            jumped.level_up(level)
+            self.assertEqual(jumped.to_dict(), stepped.to_dict())
+
+    def test_gain_experience(self):
+        character = new_character(species=SPECIES, level=1)
+        character.gain_experience(1000)
+        self.assertEqual(character.level, 1)
+        character.gain_experience(1)
+        self.assertEqual(character.level, 2)
+        character.gain_experience(5000)
+        self.assertEqual(character.level, 7)
+        self.assertEqual(character.actions, ('attack', 'heal'))
+        self.assertEqual(character.max_health, 7 * BASE_ATTRIBUTE)
+
+    def test_to_dict(self):
+        character = new_character(species=SPECIES, name='leek', level=3)
+        character.add_condition('defend')
+        state = character.to_dict()
+        self.assertEqual(state['status'], {
+            'health': 3 * BASE_ATTRIBUTE,
+            'conditions': {'defend'},
+        })
+
+        copy = Character(state['species'], state['character'], state['status'])
+        self.assertEqual(copy.to_dict(), state)
+        self.assertEqual(pickle.loads(pickle.dumps(character)).to_dict(), state)
+
+    def test_snapshot(self):
+        character = new_character(species=SPECIES, name='leek', level=2)
+        snapshot = character.snapshot()
+        character.damage(5)
+        character.add_condition('defend')
+        character.gain_experience(5000)
+        character.restore(snapshot)
+        self.assertEqual(character.snapshot(), snapshot)
+        self.assertEqual(character.actions, ('attack',))
+
+        fork = character.fork()
+        fork.damage(5)
+        fork.gain_level()
+        self.assertEqual(character.health, 2 * BASE_ATTRIBUTE)
+        self.assertEqual(character.level, 2)
+        self.assertEqual(fork.actions, ('attack', 'heal'))
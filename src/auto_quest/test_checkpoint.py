@@ -0,0 +1,75 @@
+import os
+import random
+import unittest
+
+from checkpoint import checkpoint, decode, encode, fork, from_json, restore, to_json
+from env import QuestEnv
+from logic import choose
+from randomizer import randomize_world
+from world import load_world
+
+WORLD_FILE = os.path.join(os.path.dirname(__file__), 'test_world.json')
+
+
+def play(env, logic, count):
+    decisions = []
+    while not env.done and len(decisions) < count:
+        decisions.append(choose(range(env.choice_count()), logic))
+        env.advance(decisions[-1])
+    return decisions
+
+
+class TestCheckpoint(unittest.TestCase):
+    def test_encode(self):
+        world = load_world(WORLD_FILE)
+        env = QuestEnv(world, random.Random('seed'))
+        env.reset('hero')
+        self.assertEqual(decode(encode(checkpoint(env))), checkpoint(env))
+        play(env, random.Random(0), 20)
+        state = checkpoint(env)
+        self.assertEqual(decode(encode(state)), state)
+        self.assertEqual(from_json(to_json(state)), state)
+
+    def test_fork(self):
+        world = load_world(WORLD_FILE)
+        env = QuestEnv(world, random.Random('seed'))
+        env.reset('hero')
+        play(env, random.Random(0), 20)
+        state = decode(encode(checkpoint(env)))
+
+        decisions = play(env, random.Random(1), 200)
+        forked = fork(world, state)
+        for decision in decisions:
+            forked.advance(decision)
+        self.assertEqual(forked.observation(), env.observation())
+        self.assertEqual(checkpoint(forked), checkpoint(env))
+
+    def test_fork_rng(self):
+        world = load_world(WORLD_FILE)
+        env = QuestEnv(world, random.Random('seed'))
+        env.reset('hero')
+        play(env, random.Random(0), 20)
+        state = checkpoint(env)
+        forks = [fork(world, state, random.Random(seed)) for seed in range(5)]
+        for forked in forks:
+            play(forked, random.Random(1), 200)
+        self.assertGreater(
+            len({str(checkpoint(forked)) for forked in forks}), 1)
+
+    def test_restore(self):
+        world = load_world(WORLD_FILE)
+        randomized = randomize_world(world, random.Random('seed'))
+        env = QuestEnv(randomized, random.Random('seed'))
+        env.reset('hero')
+        play(env, random.Random(0), 20)
+        state = decode(encode(checkpoint(env, world, 'seed', True)))
+        self.assertEqual(from_json(to_json(state)), state)
+
+        restored = restore(QuestEnv(randomized, random.Random()), state, world, 'seed', True)
+        self.assertEqual(restored.observation(), env.observation())
+        with self.assertRaisesRegex(ValueError, 'different world'):
+            restore(QuestEnv(randomized, random.Random()), state, randomized, 'seed', True)
+        with self.assertRaisesRegex(ValueError, 'randomized'):
+            restore(QuestEnv(randomized, random.Random()), state, world, 'seed')
+        with self.assertRaisesRegex(ValueError, 'seed seed, not no seed'):
+            restore(QuestEnv(randomized, random.Random()), state, world, None, True)
@@ -0,0 +1,32 @@
+import io
+import unittest
+
+from cli import BufferedDisplay, NullDisplay
+
+
+class TestCli(unittest.TestCase):
+    def test_buffered_display(self):
+        output = io.StringIO()
+        display = BufferedDisplay(logic=lambda choices: 1,
+                                  output=output, buffer_size=64)
+        display.display_log('hello')
+        self.assertEqual(output.getvalue(), '')
+
+        self.assertEqual(display.display_choice(['scout', 'battle']), 1)
+        display.display_log(['a' * 32, 'b' * 32])
+        self.assertIn('hello', output.getvalue())
+
+        display.close()
+        self.assertEqual(output.getvalue().splitlines(), [
+            '\t\t\t\t  hello',
+            '\t\t\t\t  scout  battle',
+            '\t\t\t\t  ' + 'a' * 32,
+            '\t\t\t\t  ' + 'b' * 32,
+        ])
+
+    def test_null_display(self):
+        with self.assertRaises(ValueError):
+            NullDisplay(None)
+        display = NullDisplay(lambda choices: len(choices) - 1)
+        self.assertEqual(display.display_choice(['scout', 'battle']), 1)
+        self.assertEqual(display.read_input(), '')
@@ -0,0 +1,53 @@
+import unittest
+
+from random import Random
+
+from action import Action, dict_to_effect, run_turn
+from character import new_character
+from world import World
+
+SPECIES = {
+    'name': 'onion',
+    'attributes': {'health': 30, 'strength': 10, 'smarts': 5, 'speed': 10},
+    'actions': {1: 'attack', 2: 'heal', 3: 'defend', 4: 'spores'},
+}
+ACTIONS = [
+    {'name': 'attack', 'effects': [
+        {'type': 'attack', 'power': 50, 'accuracy': 80}], 'priority': 0},
+    {'name': 'heal', 'effects': [{'type': 'heal', 'power': 30}], 'priority': 0},
+    {'name': 'defend', 'effects': [{'type': 'defend'}], 'priority': 5},
+    {'name': 'spores', 'effects': [
+        {'type': 'condition', 'condition': 'poison'},
+        {'type': 'attack', 'power': 20, 'accuracy': 50}], 'priority': 1},
+]
+
+
+class TestCompiled(unittest.TestCase):
+    def test_condition_effect(self):
+        effect = dict_to_effect({'type': 'condition', 'condition': 'poison'})
+        self.assertEqual(effect.to_dict(), {
+                         'type': 'condition', 'condition': 'poison'})
+
+    def test_matches_run_turn(self):
+        world = World([SPECIES], {action['name']: Action.from_dict(
+            action) for action in ACTIONS})
+        table = world.table
+
+        for seed in range(20):
+            choices = Random(seed)
+            reference_rng = Random(seed + 1000)
+            compiled_rng = Random(seed + 1000)
+            reference = [new_character(SPECIES, level=4),
+                         new_character(SPECIES, level=3)]
+            compiled = [new_character(SPECIES, level=4),
+                        new_character(SPECIES, level=3)]
+
+            while reference[0].health > 0 and reference[1].health > 0:
+                player, enemy = [choices.choice(reference[0].actions)
+                                 for _ in range(2)]
+                run_turn(reference[0], world.actions[player],
+                         reference[1], world.actions[enemy], reference_rng)
+                table.run_turn(compiled[0], table.ids[player],
+                               compiled[1], table.ids[enemy], compiled_rng)
+                for a, b in zip(reference, compiled):
+                    self.assertEqual(a.to_dict(), b.to_dict())
@@ -0,0 +1,76 @@
+import json
+import random
+import unittest
+
+from collections import Counter
+
+from encounters import AliasTable, EncounterIndex
+from world import parse_world, world_to_dict
+
+
+def records(count, **keys):
+    return [dict({'name': f'species-{i}'}, **{key: value(i) for key, value in keys.items()}) for i in range(count)]
+
+
+class TestEncounters(unittest.TestCase):
+    def test_alias_table(self):
+        weights = [1, 2, 3, 4, 0.5, 9.5]
+        table = AliasTable(weights)
+        rng = random.Random(0)
+        counts = Counter(table.sample(rng) for _ in range(100000))
+        for i, weight in enumerate(weights):
+            self.assertAlmostEqual(
+                counts[i] / 100000, weight / sum(weights), delta=0.01)
+
+    def test_uniform(self):
+        index = EncounterIndex(records(50))
+        rng = random.Random(0)
+        expected = random.Random(0)
+        for level in range(1, 100):
+            self.assertEqual(index.encounter(level, rng),
+                             expected.randint(0, 49))
+
+    def test_levels(self):
+        index = EncounterIndex(records(
+            30, levels=lambda i: [i, i + 5], weight=lambda i: i + 1))
+        rng = random.Random(0)
+        for level in range(0, 40):
+            bucket = set(index.bucket(level).members)
+            expected = {i for i in range(30) if i <= level <= i + 5}
+            self.assertEqual(bucket, expected or set(range(30)))
+            for _ in range(20):
+                self.assertIn(index.encounter(level, rng), bucket)
+
+    def test_starters(self):
+        index = EncounterIndex(records(20, starter=lambda i: i % 5 == 0))
+        rng = random.Random(0)
+        for _ in range(50):
+            starters = index.pick_starters(3, rng)
+            self.assertEqual(len(set(starters)), 3)
+            self.assertTrue(all(i % 5 == 0 for i in starters))
+        with self.assertRaises(ValueError):
+            index.pick_starters(5, rng)
+
+    def test_find(self):
+        index = EncounterIndex(records(10))
+        self.assertEqual(index.find('species-7'), 7)
+        with self.assertRaises(KeyError):
+            index.find('nothing')
+
+    def test_lazy_species(self):
+        world_dict = {
+            'species': [{
+                'name': f'species-{i}',
+                'attributes': {'health': 10, 'strength': 10, 'smarts': 10, 'speed': 10},
+                'actions': {'1': 'attack'},
+                'weight': i + 1,
+            } for i in range(1000)],
+            'actions': [{'name': 'attack', 'effects': [{'type': 'attack', 'power': 10, 'accuracy': 100}], 'priority': 0}],
+        }
+        world = parse_world(json.dumps(world_dict))
+        character = world.random_character(5, random.Random(0))
+        self.assertEqual(
+            sum(species is not None for species in world.species._species), 1)
+        self.assertEqual(
+            world.find_species(character.species)['actions'], {1: 'attack'})
+        self.assertEqual(world_to_dict(world), world_dict)
@@ -0,0 +1,184 @@
+import json
+import os
+import unittest
+
+from random import Random
+
+from env import BATTLE, DONE, EXPLORE, STARTER, QuestEnv
+from events import EventLog
+from rng import derive_rng
+from simulator import REFERENCE_ENGINE
+from world import load_world, parse_world
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+WORLD_FILE = os.path.join(os.path.dirname(__file__), 'test_world.json')
+
+
+class TestEnv(unittest.TestCase):
+    def test_reset(self):
+        env = QuestEnv(load_world(WORLD_FILE), Random(0))
+        observation = env.reset('leek')
+        self.assertEqual(observation['phase'], STARTER)
+        self.assertEqual(len(observation['choices']), 3)
+        self.assertIsNone(observation['player'])
+
+        with self.assertRaises(ValueError):
+            env.step(3)
+
+        observation, reward, done, _ = env.step(0)
+        self.assertEqual(observation['phase'], BATTLE)
+        self.assertEqual(observation['player']['name'], 'leek')
+        self.assertEqual(observation['player']['level'], 5)
+        self.assertEqual(observation['enemy']['level'], 3)
+        self.assertEqual(observation['choices'],
+                         observation['player']['actions'])
+        self.assertEqual((reward, done), (0, False))
+
+    def test_play(self):
+        rng = Random(1)
+        events = EventLog(limit=100)
+        env = QuestEnv(load_world(WORLD_FILE), rng, events)
+        env.reset()
+        phases = set()
+        for _ in range(5000):
+            if env.done:
+                break
+            phases.add(env.phase)
+            choices = env.legal_actions()
+            self.assertGreater(len(choices), 0)
+            env.step(rng.randint(0, len(choices) - 1))
+
+        self.assertIn(EXPLORE, phases)
+        if env.done:
+            self.assertEqual(env.phase, DONE)
+            self.assertEqual(events.lines()[-1], 'died')
+            self.assertEqual(env.legal_actions(), [])
+
+    def test_compiled_turns(self):
+        # games nobody listens to run on the compiled actions and must play out the same
+        world = load_world(WORLD_FILE)
+        envs = [QuestEnv(world, Random(2)), QuestEnv(world, Random(2), EventLog(limit=10))]
+        for env in envs:
+            env.reset()
+        choices = Random(3)
+        for _ in range(2000):
+            if envs[0].done:
+                break
+            choice = choices.randint(0, envs[0].choice_count() - 1)
+            first, second = [env.step(choice)[0] for env in envs]
+            self.assertEqual(first, second)
+
+
+@unittest.skipIf(np is None, 'numpy is not installed')
+class TestVectorEnv(unittest.TestCase):
+    def test_step(self):
+        from vector_env import FEATURES, PHASE_IDS, VectorQuestEnv
+
+        env = VectorQuestEnv(load_world(WORLD_FILE), 8, seed=0)
+        observations, masks = env.reset()
+        self.assertEqual(observations.shape, (8, len(FEATURES)))
+        self.assertTrue((observations[:, 0] == PHASE_IDS[STARTER]).all())
+        self.assertTrue((masks.sum(axis=1) == 3).all())
+
+        rng = np.random.default_rng(0)
+        finished = 0
+        for _ in range(3000):
+            choices = env.sample_choices(rng)
+            self.assertTrue(masks[np.arange(8), choices].all())
+            observations, masks, rewards, dones, info = env.step(choices)
+            finished += dones.sum()
+            self.assertTrue((observations[dones, 0] == PHASE_IDS[STARTER]).all())
+            final = info['final_observations'][dones]
+            self.assertTrue((final[:, 0] == PHASE_IDS[DONE]).all())
+            self.assertTrue((final[:, FEATURES.index('player_health')] == 0).all())
+        self.assertEqual(finished, env.episodes.sum())
+        decisions = env.decisions()
+        self.assertEqual([len(decision['choices']) for decision in decisions],
+                         masks.sum(axis=1).tolist())
+        # the characters of games in a battle catch up with the battle arrays
+        self.assertEqual([decision['player']['health'] if decision['player'] else 0
+                          for decision in decisions],
+                         observations[:, FEATURES.index('player_health')].tolist())
+        self.assertGreater(finished, 0)
+
+    def test_seeded(self):
+        from vector_env import VectorQuestEnv
+
+        world = load_world(WORLD_FILE)
+        envs = [VectorQuestEnv(world, 4, seed='same') for _ in range(2)]
+        first, second = [env.reset()[0] for env in envs]
+        rng = np.random.default_rng(0)
+        for _ in range(500):
+            choices = envs[0].sample_choices(rng)
+            first = envs[0].step(choices)[0]
+            second = envs[1].step(choices)[0]
+            self.assertTrue((first == second).all())
+
+    def test_matches_env(self):
+        from vector_env import VectorQuestEnv, encode_observation
+
+        world = load_world(WORLD_FILE)
+        vector = VectorQuestEnv(world, 4, seed='same', name='hero', engine=REFERENCE_ENGINE)
+        envs = [QuestEnv(world, derive_rng('same', i, 0)) for i in range(4)]
+        episodes = [0] * len(envs)
+        vector.reset()
+        for env in envs:
+            env.reset('hero')
+        rng = np.random.default_rng(0)
+        for _ in range(3000):
+            choices = vector.sample_choices(rng)
+            observations, masks, rewards, dones, info = vector.step(choices)
+            for i, env in enumerate(envs):
+                self.assertEqual(env.advance(int(choices[i])), rewards[i])
+                self.assertEqual(env.done, dones[i])
+                if env.done:
+                    self.assertEqual(encode_observation(env).tolist(),
+                                     info['final_observations'][i].tolist())
+                    # finished games start over with the next episode's engine
+                    episodes[i] += 1
+                    env.rng = derive_rng('same', i, episodes[i])
+                    env.reset('hero')
+                self.assertEqual(encode_observation(env).tolist(), observations[i].tolist())
+                self.assertEqual(env.observation(), vector.envs[i].observation())
+        self.assertGreater(sum(episodes), 0)
+
+    def test_conditions(self):
+        from vector_env import VectorQuestEnv
+
+        with open(WORLD_FILE) as f:
+            world_dict = json.load(f)
+        for action in world_dict['actions']:
+            if action['name'] == 'attack':
+                action['effects'].insert(0, {'type': 'condition', 'condition': 'marked'})
+        world = parse_world(json.dumps(world_dict).encode())
+
+        env = VectorQuestEnv(world, 8, seed=0)
+        env.reset()
+        rng = np.random.default_rng(0)
+        marked = False
+        for _ in range(200):
+            env.step(env.sample_choices(rng))
+            # only the player's attacks in battle, which run on the kernel's arrays, mark enemies
+            marked |= any('marked' in decision['enemy']['conditions']
+                          for decision in env.decisions() if decision['enemy'] is not None)
+        self.assertTrue(marked)
+
+    def test_most_choices(self):
+        from vector_env import VectorQuestEnv, most_choices
+
+        with open(WORLD_FILE) as f:
+            world_dict = json.load(f)
+        for species in world_dict['species']:
+            species['actions'] = {str(level): 'attack' for level in range(1, 11)}
+        world = parse_world(json.dumps(world_dict).encode())
+        self.assertEqual(most_choices(world), 10)
+
+        env = VectorQuestEnv(world, 8, seed=0)
+        self.assertEqual(env.reset()[1].shape, (8, 10))
+        rng = np.random.default_rng(0)
+        for _ in range(500):
+            env.step(env.sample_choices(rng))
@@ -0,0 +1,39 @@
+import unittest
+
+from random import Random
+
+from action import Action, run_turn
+from character import new_character
+from events import ACTION, DEBUG, FAINT, HIT, INFO, EventLog
+
+SPECIES = {
+    'name': 'onion',
+    'attributes': {'health': 10, 'strength': 10, 'smarts': 10, 'speed': 10},
+    'actions': {1: 'attack'},
+}
+ATTACK = Action.from_dict({'name': 'attack', 'effects': [
+    {'type': 'attack', 'power': 100, 'accuracy': 100}], 'priority': 0})
+
+
+class TestEvents(unittest.TestCase):
+    def test_run_turn(self):
+        player = new_character(SPECIES, name='leek', level=3)
+        enemy = new_character(SPECIES, level=1)
+        events = EventLog(DEBUG)
+        run_turn(player, ATTACK, enemy, ATTACK, Random(0), events)
+
+        self.assertEqual([event.kind for event in events.events], [
+                         ACTION, HIT, FAINT])
+        self.assertEqual(events.lines(), [
+            'leek uses attack',
+            'leek attacks onion',
+            'onion fainted',
+        ])
+
+    def test_level_and_limit(self):
+        events = EventLog(INFO, limit=2)
+        for i in range(5):
+            events.emit(ACTION, 'leek', f'attack{i}')
+            events.emit(HIT, 'leek', 'onion', i)
+        self.assertEqual(events.lines(), [
+                         'leek uses attack3', 'leek uses attack4'])
@@ -0,0 +1,43 @@
+import json
+import os
+import random
+import tempfile
+import unittest
+
+from generator import WORLD_FORMAT, generate_world, generate_worlds, world_seed, write_worlds
+from randomizer import randomize_actions
+from world import load_world, parse_world, world_to_dict
+
+WORLD_FILE = os.path.join(os.path.dirname(__file__), 'test_world.json')
+
+
+class TestGenerator(unittest.TestCase):
+    def test_randomize_actions(self):
+        pool = ['a', 'b', 'c']
+        actions = randomize_actions([1, 2, 3], pool, random.Random(0))
+        self.assertEqual(sorted(actions.values()), pool)
+        with self.assertRaises(ValueError):
+            randomize_actions([1, 2, 3, 4], pool)
+
+    def test_generate_worlds(self):
+        base = load_world(WORLD_FILE)
+        worlds = list(generate_worlds(base, 6, 'seed', processes=1, new_actions=2, chunk_size=4))
+        self.assertEqual(worlds, list(generate_worlds(
+            base, 6, 'seed', processes=2, new_actions=2, chunk_size=1)))
+
+        # any world can be regenerated on its own
+        line = json.loads(worlds[3])
+        self.assertEqual(line['index'], 3)
+        world = generate_world(base, world_seed('seed', 3), new_actions=2)
+        self.assertEqual(world_to_dict(world)['species'], line['species'])
+        self.assertEqual(world_to_dict(parse_world(worlds[3])), world_to_dict(world))
+        self.assertEqual(len(world.actions), len(base.actions) + 2)
+
+    def test_write_worlds(self):
+        base = load_world(WORLD_FILE)
+        with tempfile.TemporaryDirectory() as directory:
+            count = write_worlds(generate_worlds(
+                base, 3, 0, processes=1), directory, WORLD_FORMAT)
+            self.assertEqual(count, 3)
+            world = load_world(os.path.join(directory, 'world-2.json'))
+            self.assertEqual(len(world.species), len(base.species))
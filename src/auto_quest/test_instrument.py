@@ -0,0 +1,74 @@
+import os
+import random
+import unittest
+
+import action
+import compiled
+import env
+from cli import NullDisplay
+from env import QuestEnv
+from events import create_sink
+from instrument import ACTION, EFFECT, LEVEL_UP, RNG, TURN, Profile
+from logic import choose
+from world import load_world
+
+WORLD_FILE = os.path.join(os.path.dirname(__file__), 'test_world.json')
+
+
+class TestInstrument(unittest.TestCase):
+    def test_profile(self):
+        world = load_world(WORLD_FILE)
+        run_turn = action.run_turn
+        ops = list(compiled.OPS)
+        randint = random.randint
+
+        profile = Profile()
+        profile.install()
+        try:
+            game = QuestEnv(world, random.Random(0))
+            game.reset()
+            while not game.done:
+                game.advance(choose(range(game.choice_count()), game.rng))
+            NullDisplay(choose).write('hidden')
+        finally:
+            profile.uninstall()
+
+        summary = profile.to_dict()
+        self.assertGreater(summary[TURN]['compiled']['count'], 0)
+        # each side acts at most once a turn
+        actions = sum(counter['count'] for counter in summary[ACTION].values())
+        self.assertLessEqual(actions, 2 * summary[TURN]['compiled']['count'])
+        self.assertIn('attack', summary[ACTION])
+        self.assertGreater(summary[EFFECT]['attack']['count'], 0)
+        self.assertGreater(sum(counter['count']
+                           for counter in summary[LEVEL_UP].values()), 0)
+        self.assertGreater(summary[RNG]['randint']['count'], 0)
+        self.assertNotIn('randrange', summary[RNG])
+        self.assertEqual(summary['display_write']['NullDisplay']['count'], 1)
+
+        # nothing is left wrapped
+        self.assertIs(action.run_turn, run_turn)
+        self.assertIs(env.run_turn, run_turn)
+        self.assertIs(random.randint, randint)
+        self.assertEqual(compiled.OPS, ops)
+        self.assertNotIn('random', vars(random.Random))
+
+    def test_profile_headless(self):
+        world = load_world(WORLD_FILE)
+        profile = Profile()
+        profile.install()
+        try:
+            # the null display is quiet, so games run headless like they do from the cli
+            display = NullDisplay(choose)
+            game = QuestEnv(world, random.Random(1), create_sink(display, 'info'))
+            game.reset()
+            while not game.done:
+                game.advance(display.display_choice(game.legal_actions()))
+        finally:
+            profile.uninstall()
+
+        summary = profile.to_dict()
+        self.assertGreater(summary[TURN]['compiled']['count'], 0)
+        self.assertNotIn('reference', summary[TURN])
+        self.assertGreater(summary[EFFECT]['attack']['count'], 0)
+        self.assertLessEqual(set(summary[EFFECT]), set(compiled.OP_NAMES))
@@ -0,0 +1,89 @@
+import os
+import unittest
+
+from action import Action
+from character import new_character
+from logic import choose
+from simulator import ENEMY, PLAYER, run_battle
+from world import World, load_world
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+WORLD_FILE = os.path.join(os.path.dirname(__file__), 'test_world.json')
+BATTLES = 2000
+MAX_TURNS = 100
+SPECIES = [
+    {
+        'name': 'onion',
+        'attributes': {'health': 60, 'strength': 10, 'smarts': 5, 'speed': 10},
+        'actions': {1: 'attack', 2: 'heal', 3: 'shield', 4: 'quick'},
+    },
+    {
+        'name': 'leek',
+        'attributes': {'health': 50, 'strength': 12, 'smarts': 8, 'speed': 8},
+        'actions': {1: 'attack', 2: 'defend', 3: 'heal'},
+    },
+]
+ACTIONS = [
+    {'name': 'attack', 'effects': [
+        {'type': 'attack', 'power': 50, 'accuracy': 80}], 'priority': 0},
+    {'name': 'heal', 'effects': [{'type': 'heal', 'power': 30}], 'priority': 0},
+    {'name': 'defend', 'effects': [{'type': 'defend'}], 'priority': 5},
+    # shields the target from the rest of the turn
+    {'name': 'shield', 'effects': [
+        {'type': 'condition', 'condition': 'defend'}], 'priority': 5},
+    {'name': 'quick', 'effects': [
+        {'type': 'attack', 'power': 20, 'accuracy': 100}], 'priority': 1},
+]
+
+
+@unittest.skipIf(np is None, 'numpy is not installed')
+class TestKernel(unittest.TestCase):
+    def assert_matches_reference(self, world, player, enemy, level=1):
+        from kernel import ENEMY_SIDE, PLAYER_SIDE, simulate_batch
+
+        player = new_character(world.find_species(player), level=level)
+        enemy = new_character(world.find_species(enemy), level=level)
+
+        wins = 0
+        losses = 0
+        turns = 0
+        for _ in range(BATTLES):
+            player.refresh()
+            enemy.refresh()
+            winner, battle_turns = run_battle(
+                player, enemy, world.table, choose, choose, MAX_TURNS)
+            wins += winner == PLAYER
+            losses += winner == ENEMY
+            turns += battle_turns
+
+        player.refresh()
+        enemy.refresh()
+        winners, batch_turns = simulate_batch(
+            world, player, enemy, BATTLES, MAX_TURNS, rng=np.random.default_rng(0))
+        self.assertAlmostEqual(
+            (winners == PLAYER_SIDE).mean(), wins / BATTLES, delta=0.05)
+        self.assertAlmostEqual(
+            (winners == ENEMY_SIDE).mean(), losses / BATTLES, delta=0.05)
+        self.assertAlmostEqual(
+            batch_turns.mean(), turns / BATTLES, delta=0.05 * turns / BATTLES + 0.5)
+
+    def test_matches_reference(self):
+        world = load_world(WORLD_FILE)
+        self.assert_matches_reference(world, 'zombie', 'wolf')
+        self.assert_matches_reference(world, 'imp', 'slime')
+
+    def test_heal_and_defend(self):
+        # at level 5 everyone has learned heal and defend
+        world = load_world(WORLD_FILE)
+        self.assert_matches_reference(world, 'slime', 'zombie', 5)
+        self.assert_matches_reference(world, 'wolf', 'imp', 5)
+
+    def test_priority_and_conditions(self):
+        world = World(SPECIES, {action['name']: Action.from_dict(
+            action) for action in ACTIONS})
+        self.assert_matches_reference(world, 'onion', 'leek', 4)
+        self.assert_matches_reference(world, 'leek', 'onion', 3)
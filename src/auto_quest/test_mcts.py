@@ -0,0 +1,74 @@
+import os
+import random
+import unittest
+
+from multiprocessing import Pool
+
+from campaign import simulate_campaigns
+from character import character_state, new_character
+from env import ENCOUNTER_CHOICES
+from logic import decision, load_logic
+from mcts import MctsBot, parse_options, search
+from world import load_world
+
+WORLD_FILE = os.path.join(os.path.dirname(__file__), 'test_world.json')
+
+
+def _worker_pool(world):
+    return MctsBot(world, workers=2).pool
+
+
+class TestMcts(unittest.TestCase):
+    def setUp(self):
+        self.world = load_world(WORLD_FILE)
+        self.player = new_character(
+            self.world.find_species('wolf'), name='wolf', level=5)
+        self.enemy = new_character(
+            self.world.find_species('zombie'), name='zombie', level=5)
+        # one hit finishes the enemy
+        self.enemy.damage(self.enemy.health - 1)
+
+    def test_parse_options(self):
+        self.assertEqual(parse_options('rollouts=10,time=0.5,workers=2'), {
+                         'rollouts': 10, 'seconds': 0.5, 'workers': 2})
+        with self.assertRaises(ValueError):
+            parse_options('speed=1')
+
+    def test_load_character(self):
+        state = character_state(self.enemy)
+        self.assertEqual(character_state(
+            self.world.load_character(state)), state)
+
+    def test_search(self):
+        start = (self.player.snapshot(), self.enemy.snapshot())
+        visits = search(self.world.table, self.player,
+                        self.enemy, 300, rng=random.Random(0))
+        self.assertEqual(sum(visits), 300)
+        self.assertEqual(visits.index(max(visits)),
+                         self.player.actions.index('attack'))
+        self.assertEqual(
+            (self.player.snapshot(), self.enemy.snapshot()), start)
+
+    def test_logic(self):
+        logic = load_logic('mcts:rollouts=100', random.Random(0), self.world)
+        encounter = decision(ENCOUNTER_CHOICES, self.player, self.enemy)
+        # searching it as a battle would pick attack, past the last encounter choice
+        encounter['player']['actions'] = ['heal', 'defend', 'heal', 'attack']
+        choices = logic.choose_batch([
+            decision(self.player.actions, self.player, self.enemy),
+            decision(['scout', 'battle']),
+            encounter,
+        ])
+        self.assertEqual(choices[0], self.player.actions.index('attack'))
+        self.assertIn(choices[1], [0, 1])
+        # encounters have an enemy too but aren't searched as battles
+        self.assertIn(choices[2], range(len(ENCOUNTER_CHOICES)))
+        with self.assertRaises(ValueError):
+            load_logic('mcts')
+
+    def test_workers_in_worker(self):
+        with Pool(1) as pool:
+            self.assertIsNone(pool.apply(_worker_pool, (self.world,)))
+        runs = list(simulate_campaigns(self.world, 2, 'mcts:rollouts=10,workers=2', 'seed',
+                                       processes=1, max_battles=1, max_turns=20))
+        self.assertEqual([stats['run'] for stats in runs], [0, 1])
@@ -0,0 +1,34 @@
+import os
+import sys
+import tempfile
+import unittest
+
+from logic import decision, load_logic
+
+BOT = '''
+import sys
+sys.path.insert(0, {path!r})
+from pipe import serve_bot
+
+def choose_batch(decisions):
+    return [len(d['choices']) - 1 for d in decisions]
+
+serve_bot(choose_batch)
+'''
+
+
+class TestPipe(unittest.TestCase):
+    def test_exec_logic(self):
+        with tempfile.TemporaryDirectory() as directory:
+            bot = os.path.join(directory, 'bot.py')
+            with open(bot, 'w') as f:
+                f.write(BOT.format(path=os.path.dirname(
+                    os.path.abspath(__file__))))
+
+            logic = load_logic(f'exec:{sys.executable} {bot}')
+            self.assertTrue(logic.batched)
+            self.assertEqual(logic(['a', 'b', 'c']), 2)
+
+            decisions = [decision(['a'] * (i % 5 + 1)) for i in range(300)]
+            self.assertEqual(logic.choose_batch(decisions), [
+                             i % 5 for i in range(300)])
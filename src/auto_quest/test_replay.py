@@ -0,0 +1,52 @@
+import os
+import random
+import unittest
+
+from env import QuestEnv
+from logic import choose
+from randomizer import randomize_world
+from replay import create_replay, decode_replay, encode_replay, run_replay
+from world import load_world
+
+WORLD_FILE = os.path.join(os.path.dirname(__file__), 'test_world.json')
+
+
+def record(world, seed, randomized=False):
+    rng = random.Random(seed)
+    played = randomize_world(world, rng) if randomized else world
+    env = QuestEnv(played, rng)
+    env.reset('hero')
+    decisions = []
+    logic = random.Random(0)
+    while not env.done and len(decisions) < 500:
+        decisions.append(choose(range(env.choice_count()), logic))
+        env.advance(decisions[-1])
+    return env, create_replay(world, seed, 'hero', decisions, env.observation(), randomized)
+
+
+class TestReplay(unittest.TestCase):
+    def test_encode(self):
+        world = load_world(WORLD_FILE)
+        _, replay = record(world, 'seed')
+        data = encode_replay(replay)
+        self.assertEqual(decode_replay(data), replay)
+        self.assertLess(len(data), len(replay['decisions']))
+
+    def test_run_replay(self):
+        world = load_world(WORLD_FILE)
+        for randomized in [False, True]:
+            env, replay = record(world, 'seed', randomized)
+            self.assertEqual(
+                run_replay(world, replay).observation(), env.observation())
+
+    def test_mismatch(self):
+        world = load_world(WORLD_FILE)
+        _, replay = record(world, 'seed')
+        replay['seed'] = 'other'
+        with self.assertRaises(ValueError):
+            run_replay(world, replay)
+
+        _, replay = record(world, 'seed')
+        world.species[0]['attributes']['health'] += 1
+        with self.assertRaises(ValueError):
+            run_replay(world, replay)
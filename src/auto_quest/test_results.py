@@ -0,0 +1,157 @@
+import os
+import random
+import shutil
+import tempfile
+import unittest
+
+from functools import partial
+
+from character import new_character
+from logic import choose
+from simulator import ENEMY, NUMPY_ENGINE, PLAYER, REFERENCE_ENGINE, new_usage, parse_matchup, run_battle, simulate
+from world import load_world
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+WORLD_FILE = os.path.join(os.path.dirname(__file__), 'test_world.json')
+
+
+def make_record(rng):
+    return {
+        'player': rng.choice(['slime', 'wolf']),
+        'enemy': rng.choice(['imp', 'zombie', 'wolf']),
+        'player_level': rng.randint(1, 10),
+        'enemy_level': rng.randint(1, 10),
+        'winner': rng.choice([PLAYER, ENEMY, None]),
+        'turns': rng.randint(1, 30),
+        'player_health': rng.randint(0, 100),
+        'enemy_health': rng.randint(0, 100),
+        'usage': ({'attack': rng.randint(1, 5)}, {'heal': 1, 'defend': rng.randint(1, 5)}),
+    }
+
+
+@unittest.skipIf(np is None, 'numpy is not installed')
+class TestResults(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def test_aggregates(self):
+        from results import ResultStore
+
+        rng = random.Random(0)
+        records = [make_record(rng) for _ in range(50)]
+        with ResultStore(self.directory, chunk_size=7) as store:
+            for record in records[:30]:
+                store.append(record)
+        with ResultStore(self.directory, chunk_size=7) as store:
+            for record in records[30:]:
+                store.append(record)
+
+        store = ResultStore(self.directory)
+        self.assertEqual(store.rows['battles'], 50)
+        self.assertEqual(store.column('battles', 'turns').tolist(), [
+                         record['turns'] for record in records])
+        self.assertEqual([store.species[code] for code in store.column('battles', 'enemy')], [
+                         record['enemy'] for record in records])
+
+        rates = store.win_rates()
+        for pair in {(record['player'], record['enemy']) for record in records}:
+            matching = [record for record in records if (
+                record['player'], record['enemy']) == pair]
+            self.assertEqual(rates[pair]['wins'], sum(
+                record['winner'] == PLAYER for record in matching))
+            self.assertEqual(rates[pair]['draws'], sum(
+                record['winner'] is None for record in matching))
+            self.assertEqual(rates[pair]['turns'], sum(
+                record['turns'] for record in matching))
+        histogram = store.turn_histogram()
+        self.assertEqual(histogram.sum(), 50)
+        self.assertEqual(histogram[7], sum(
+            record['turns'] == 7 for record in records))
+        usage = store.action_usage()
+        self.assertEqual(usage[PLAYER], {'attack': sum(
+            record['usage'][0]['attack'] for record in records)})
+        self.assertEqual(usage[ENEMY]['heal'], 50)
+
+    def test_unflushed_rows(self):
+        from results import ResultStore
+
+        rng = random.Random(0)
+        store = ResultStore(self.directory, chunk_size=4)
+        for _ in range(6):
+            store.append(dict(make_record(rng), usage=None))
+        # rows past the last flush are dropped when the store is opened again
+        store = ResultStore(self.directory)
+        self.assertEqual(store.rows['battles'], 4)
+        self.assertEqual(len(store.column('battles', 'player')), 4)
+        store.append(make_record(rng))
+        store.close()
+        self.assertEqual(ResultStore(self.directory).rows['battles'], 5)
+
+    def test_read_only(self):
+        from results import ResultStore
+
+        with self.assertRaises(ValueError):
+            ResultStore(os.path.join(self.directory, 'missing'), read_only=True)
+        self.assertFalse(os.path.exists(os.path.join(self.directory, 'missing')))
+
+        rng = random.Random(0)
+        store = ResultStore(self.directory, chunk_size=4)
+        for _ in range(6):
+            store.append(dict(make_record(rng), usage=None))
+        # a reader leaves the unflushed rows of a store that's still being written alone
+        path = os.path.join(self.directory, 'battles.turns.bin')
+        size = os.path.getsize(path)
+        reader = ResultStore(self.directory, read_only=True)
+        self.assertEqual(reader.rows['battles'], 4)
+        self.assertEqual(len(reader.column('battles', 'turns')), 4)
+        with self.assertRaises(ValueError):
+            reader.append(make_record(rng))
+        reader.close()
+        self.assertEqual(os.path.getsize(path), size)
+        store.close()
+        self.assertEqual(ResultStore(self.directory, read_only=True).rows['battles'], 6)
+
+    def test_battle_record(self):
+        from results import ResultStore, battle_record
+
+        world = load_world(WORLD_FILE)
+        rng = random.Random(0)
+        player = new_character(world.find_species('wolf'), level=5)
+        enemy = new_character(world.find_species('imp'), level=3)
+        usage = new_usage(player, enemy)
+        logic = partial(choose, rng=rng)
+        _, turns = run_battle(player, enemy, world.table,
+                              logic, logic, rng=rng, usage=usage)
+        record = battle_record(player, enemy, turns, usage)
+        self.assertEqual(sum(record['usage'][0].values()), turns)
+        self.assertEqual(sum(record['usage'][1].values()), turns)
+        with ResultStore(self.directory) as store:
+            store.append(record)
+        rates = ResultStore(self.directory).win_rates()
+        self.assertEqual(rates[('wolf', 'imp')]['battles'], 1)
+
+    def test_simulate_details(self):
+        from results import ResultStore, store_results
+
+        world = load_world(WORLD_FILE)
+        matchups = [parse_matchup('wolf:5,zombie:5')]
+        for engine in [REFERENCE_ENGINE, NUMPY_ENGINE]:
+            shutil.rmtree(self.directory)
+            with ResultStore(self.directory) as store:
+                results = list(store_results(store, matchups, simulate(
+                    world, matchups, 50, 1, max_turns=100, engine=engine, seed=0, details=True)))
+            for result in results:
+                self.assertEqual(
+                    sum(result['usage'][0].values()), result['turns'])
+                if result['winner'] == PLAYER:
+                    self.assertLessEqual(result['enemy_health'], 0)
+            store = ResultStore(self.directory)
+            self.assertEqual(store.rows['battles'], 50)
+            self.assertEqual(store.turn_histogram().sum(), 50)
@@ -0,0 +1,57 @@
+import asyncio
+import json
+import os
+import tempfile
+import unittest
+
+from random import Random
+
+from server import GameServer, parse_choice
+from world import load_world
+
+WORLD_FILE = os.path.join(os.path.dirname(__file__), 'test_world.json')
+
+
+async def client(path, seed, decisions):
+    reader, writer = await asyncio.open_unix_connection(path)
+    writer.write(b'leek\n')
+    rng = Random(seed)
+    messages = []
+    for _ in range(decisions):
+        message = json.loads(await reader.readline())
+        messages.append(message)
+        if message['observation']['phase'] == 'done':
+            break
+        choices = message['observation']['choices']
+        writer.write(f'{rng.randint(0, len(choices) - 1)}\n'.encode())
+    writer.close()
+    return messages
+
+
+class TestServer(unittest.TestCase):
+    def test_parse_choice(self):
+        self.assertEqual(parse_choice('1\n', ['a', 'b']), 1)
+        self.assertEqual(parse_choice('b', ['a', 'b']), 1)
+        with self.assertRaises(ValueError):
+            parse_choice('2', ['a', 'b'])
+        with self.assertRaises(ValueError):
+            parse_choice('c', ['a', 'b'])
+
+    def test_sessions(self):
+        server = GameServer(load_world(WORLD_FILE), seed=0)
+
+        async def run(path):
+            task = asyncio.ensure_future(server.serve('unix:' + path))
+            while not os.path.exists(path):
+                await asyncio.sleep(0.01)
+            results = await asyncio.gather(*[client(path, i, 50) for i in range(10)])
+            task.cancel()
+            return results
+
+        with tempfile.TemporaryDirectory() as directory:
+            results = asyncio.run(run(os.path.join(directory, 'quest.sock')))
+
+        self.assertEqual(server.sessions, 10)
+        for messages in results:
+            self.assertEqual(messages[0]['observation']['phase'], 'starter')
+            self.assertEqual(messages[1]['observation']['player']['name'], 'leek')
@@ -0,0 +1,82 @@
+import os
+import tempfile
+import unittest
+
+from simulator import ENEMY, NUMPY_ENGINE, PLAYER, parse_matchup, replay_battle, simulate, summarize
+from world import load_world
+
+WORLD_FILE = os.path.join(os.path.dirname(__file__), 'test_world.json')
+
+
+class TestSimulator(unittest.TestCase):
+    def test_parse_matchup(self):
+        player, enemy = parse_matchup('slime:5,wolf:3:random')
+        self.assertEqual(
+            player, {'species': 'slime', 'level': 5, 'logic': 'random'})
+        self.assertEqual(
+            enemy, {'species': 'wolf', 'level': 3, 'logic': 'random'})
+
+    def test_simulate(self):
+        world = load_world(WORLD_FILE)
+        matchups = [parse_matchup('wolf:5,slime:1'),
+                    parse_matchup('slime:1,wolf:5')]
+        results = list(simulate(
+            world, matchups, 10, processes=1, chunk_size=3))
+        self.assertEqual(len(results), 20)
+
+        summary = summarize(matchups, results)
+        self.assertEqual(summary[0]['wins'], 10)
+        self.assertEqual(summary[1]['losses'], 10)
+        for result in results:
+            self.assertIn(result['winner'], [PLAYER, ENEMY])
+            self.assertGreater(result['turns'], 0)
+
+    def test_replay_battle(self):
+        world = load_world(WORLD_FILE)
+        matchups = [parse_matchup('imp:1,slime:1')]
+        results = list(simulate(
+            world, matchups, 10, processes=1, chunk_size=3, seed='replay'))
+        again = list(simulate(
+            world, matchups, 10, processes=1, chunk_size=5, seed='replay'))
+        self.assertEqual(
+            sorted(map(str, results)), sorted(map(str, again)))
+
+        for result in results:
+            self.assertEqual(
+                replay_battle(world, matchups[0], 'replay', 0, result['battle']),
+                (result['winner'], result['turns']))
+        # numpy engine battles share their chunk's engine
+        with self.assertRaises(ValueError):
+            replay_battle(world, matchups[0], 'replay', 0, 0, engine=NUMPY_ENGINE)
+
+    def test_printed_seed(self):
+        # a seed drawn as an int and printed comes back from --seed as a string
+        world = load_world(WORLD_FILE)
+        matchups = [parse_matchup('imp:1,slime:1')]
+        results = [sorted(map(str, simulate(world, matchups, 10, processes=1, seed=seed)))
+                   for seed in [1234, '1234']]
+        self.assertEqual(results[0], results[1])
+
+    def test_batched_logic(self):
+        world = load_world(WORLD_FILE)
+        with tempfile.TemporaryDirectory() as directory:
+            batched = os.path.join(directory, 'batched.py')
+            with open(batched, 'w') as f:
+                f.write('def choose_batch(decisions):\n')
+                f.write('    assert all(d["player"]["health"] > 0 for d in decisions)\n')
+                f.write('    return [0 for _ in decisions]\n')
+            single = os.path.join(directory, 'single.py')
+            with open(single, 'w') as f:
+                f.write('def choose(choices):\n')
+                f.write('    return 0\n')
+
+            results = []
+            for logic in [batched, single]:
+                matchups = [parse_matchup(f'imp:1:{logic},slime:1')]
+                results.append(sorted(map(str, simulate(
+                    world, matchups, 10, processes=1, chunk_size=4, seed=0))))
+            self.assertEqual(results[0], results[1])
+
+            matchup = parse_matchup(f'imp:1:{batched},slime:1')
+            self.assertEqual(replay_battle(world, matchup, 0, 0, 3),
+                             replay_battle(world, parse_matchup(f'imp:1:{single},slime:1'), 0, 0, 3))
@@ -0,0 +1,90 @@
+import os
+import unittest
+
+from action import Action
+from character import new_character
+from simulator import parse_matchup, simulate, summarize
+from solver import BattleSolver
+from world import World, load_world
+
+WORLD_FILE = os.path.join(os.path.dirname(__file__), 'test_world.json')
+SPECIES = [
+    {
+        'name': 'onion',
+        'attributes': {'health': 60, 'strength': 10, 'smarts': 5, 'speed': 10},
+        'actions': {1: 'attack', 2: 'feint'},
+    },
+    {
+        'name': 'leek',
+        'attributes': {'health': 60, 'strength': 10, 'smarts': 5, 'speed': 8},
+        'actions': {1: 'attack'},
+    },
+]
+ACTIONS = [
+    {'name': 'attack', 'effects': [
+        {'type': 'attack', 'power': 50, 'accuracy': 80}], 'priority': 0},
+    # defends its own target first, so the attack never lands
+    {'name': 'feint', 'effects': [
+        {'type': 'condition', 'condition': 'defend'},
+        {'type': 'attack', 'power': 50, 'accuracy': 80}], 'priority': 0},
+]
+
+
+def create_solver(world, player, enemy, level=5):
+    return BattleSolver(
+        new_character(world.find_species(player), level=level),
+        new_character(world.find_species(enemy), level=level),
+        world.table,
+    )
+
+
+class TestSolver(unittest.TestCase):
+    def test_evaluate(self):
+        world = load_world(WORLD_FILE)
+        outcome = create_solver(world, 'wolf', 'zombie').evaluate()
+        self.assertAlmostEqual(
+            outcome['win'] + outcome['loss'] + outcome['draw'], 1.0)
+
+        # the mirror matchup is a coin flip
+        mirror = create_solver(world, 'slime', 'slime').evaluate()
+        self.assertAlmostEqual(mirror['win'], mirror['loss'])
+
+    def test_matches_simulation(self):
+        world = load_world(WORLD_FILE)
+        outcome = create_solver(world, 'wolf', 'zombie').evaluate()
+
+        self.assert_matches_simulation(
+            world, parse_matchup('wolf:5,zombie:5'), outcome)
+
+    def assert_matches_simulation(self, world, matchup, outcome, battles=2000):
+        summary = summarize([matchup], simulate(
+            world, [matchup], battles, processes=1, seed=0))[0]
+        # well within four standard errors
+        self.assertAlmostEqual(
+            summary['wins'] / battles, outcome['win'], delta=0.03)
+        self.assertAlmostEqual(
+            summary['draws'] / battles, outcome['draw'], delta=0.03)
+
+    def test_conditions(self):
+        world = World(SPECIES, {action['name']: Action.from_dict(
+            action) for action in ACTIONS})
+        outcome = create_solver(world, 'onion', 'leek', 2).evaluate()
+        self.assert_matches_simulation(
+            world, parse_matchup('onion:2,leek:2'), outcome)
+
+    def test_optimal_policy(self):
+        world = load_world(WORLD_FILE)
+        solver = create_solver(world, 'wolf', 'zombie')
+        policy, outcome = solver.optimal_policy()
+        self.assertGreater(outcome['win'], solver.evaluate()['win'])
+        self.assertEqual(outcome['win'], solver.evaluate(policy)['win'])
+
+        # any single fixed choice can't beat the optimal one
+        for choice in range(len(solver.actions[0])):
+            fixed = solver.evaluate(lambda player, enemy: choice)
+            self.assertLessEqual(fixed['win'], outcome['win'] + 1e-9)
+
+    def test_missing_choice(self):
+        world = load_world(WORLD_FILE)
+        with self.assertRaises(ValueError):
+            create_solver(world, 'wolf', 'zombie').evaluate({})
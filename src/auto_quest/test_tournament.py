@@ -0,0 +1,57 @@
+import json
+import os
+import tempfile
+import unittest
+
+from tournament import run_tournament, wilson_interval
+from world import load_world
+
+WORLD_FILE = os.path.join(os.path.dirname(__file__), 'test_world.json')
+
+
+class TestTournament(unittest.TestCase):
+    def test_wilson_interval(self):
+        low, high = wilson_interval(50, 100)
+        self.assertLess(low, 0.5)
+        self.assertGreater(high, 0.5)
+        self.assertAlmostEqual(0.5 - low, high - 0.5)
+        self.assertEqual(wilson_interval(0, 10)[0], 0.0)
+
+    def test_cache(self):
+        world = load_world(WORLD_FILE)
+        with tempfile.TemporaryDirectory() as directory:
+            cache = os.path.join(directory, 'cache.json')
+            cells, computed = run_tournament(
+                world, [1], 5, cache_path=cache, processes=1)
+            count = len(world.species) ** 2
+            self.assertEqual(len(cells), count)
+            self.assertEqual(computed, count)
+
+            again, computed = run_tournament(
+                world, [1], 5, cache_path=cache, processes=1)
+            self.assertEqual(computed, 0)
+            self.assertEqual(json.dumps(cells), json.dumps(again))
+
+            # editing one species only invalidates its row and column
+            world.species[0]['attributes']['health'] += 1
+            _, computed = run_tournament(
+                world, [1], 5, cache_path=cache, processes=1)
+            self.assertEqual(computed, 2 * len(world.species) - 1)
+
+    def test_logic_file(self):
+        world = load_world(WORLD_FILE)
+        with tempfile.TemporaryDirectory() as directory:
+            cache = os.path.join(directory, 'cache.json')
+            logic = os.path.join(directory, 'first.py')
+            with open(logic, 'w') as f:
+                f.write('def choose(choices):\n')
+                f.write('    return 0\n')
+            run_tournament(world, [1], 5, logic, cache_path=cache, processes=1)
+
+            # the same file with a different logic in it is a different player
+            with open(logic, 'w') as f:
+                f.write('def choose(choices):\n')
+                f.write('    return len(choices) - 1\n')
+            _, computed = run_tournament(
+                world, [1], 5, logic, cache_path=cache, processes=1)
+            self.assertEqual(computed, len(world.species) ** 2)
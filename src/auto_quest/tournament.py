@@ -0,0 +1,136 @@
+"""
+Species against species win rate matrices.
+
+Every cell of the matrix is cached under a hash of exactly what decides its outcome:
+the two species records, the actions they can learn, the levels, the logics (with
+the contents of logic files), the battle count, the engine and its version and the
+seed. Editing one species only invalidates the cells in its row and column.
+"""
+import hashlib
+import json
+import math
+import os
+
+from simulator import REFERENCE_ENGINE, simulate, summarize
+
+# bump whenever battles play out differently
+ENGINE_VERSION = 1
+CACHE_SUFFIX = '.tournament.json'
+Z_95 = 1.959963984540054
+
+
+def species_record(world, species):
+    """ Everything about a species that can change its battles, in a hashable form. """
+    return {
+        'attributes': species['attributes'],
+        'actions': {str(level): world.actions[action].to_dict() for level, action in sorted(species['actions'].items())},
+    }
+
+
+def logic_record(logic):
+    """ A logic argument, along with the hash of its file if it's a logic file. """
+    if os.path.splitext(logic)[-1] == '.py' and os.path.exists(logic):
+        with open(logic, 'rb') as f:
+            return [logic, hashlib.sha256(f.read()).hexdigest()]
+    return logic
+
+
+def cell_key(world, player, enemy, level, player_logic, enemy_logic, battles, engine, seed):
+    record = json.dumps([
+        ENGINE_VERSION,
+        engine,
+        species_record(world, player),
+        species_record(world, enemy),
+        level,
+        player_logic,
+        enemy_logic,
+        battles,
+        str(seed),
+    ], sort_keys=True)
+    return hashlib.sha256(record.encode()).hexdigest()
+
+
+def wilson_interval(wins, battles, z=Z_95):
+    """ The confidence interval of a win rate. """
+    if battles == 0:
+        return 0.0, 1.0
+    rate = wins / battles
+    center = (rate + z * z / (2 * battles)) / (1 + z * z / battles)
+    margin = z * math.sqrt(rate * (1 - rate) / battles + z *
+                           z / (4 * battles * battles)) / (1 + z * z / battles)
+    return max(center - margin, 0.0), min(center + margin, 1.0)
+
+
+def load_cache(path):
+    if path is None or not os.path.exists(path):
+        return {}
+    with open(path, 'r') as f:
+        return json.load(f)
+
+
+def save_cache(path, cache):
+    with open(path + '.tmp', 'w') as f:
+        json.dump(cache, f)
+    os.replace(path + '.tmp', path)
+
+
+def run_tournament(world, levels, battles, player_logic='random', enemy_logic='random', cache_path=None, processes=None, engine=REFERENCE_ENGINE, seed=0):
+    """
+    Fights every species against every species at each level and returns the matrix cells.
+
+    Cells found in the cache are reused and only the missing ones are simulated.
+    """
+    cache = load_cache(cache_path)
+    player_record = logic_record(player_logic)
+    enemy_record = logic_record(enemy_logic)
+    cells = []
+    for level in levels:
+        for player in world.species:
+            for enemy in world.species:
+                cells.append({
+                    'player': player['name'],
+                    'enemy': enemy['name'],
+                    'level': level,
+                    'key': cell_key(world, player, enemy, level, player_record, enemy_record, battles, engine, seed),
+                })
+
+    missing = [cell for cell in cells if cell['key'] not in cache]
+    if missing:
+        matchups = [(
+            {'species': cell['player'], 'level': cell['level'], 'logic': player_logic},
+            {'species': cell['enemy'], 'level': cell['level'], 'logic': enemy_logic},
+        ) for cell in missing]
+        results = simulate(world, matchups, battles, processes, engine=engine,
+                           seed=seed, keys=[cell['key'] for cell in missing])
+        for cell, tally in zip(missing, summarize(matchups, results)):
+            cache[cell['key']] = tally
+        if cache_path is not None:
+            save_cache(cache_path, cache)
+
+    for cell in cells:
+        tally = cache[cell['key']]
+        cell.update(tally)
+        cell['battles'] = battles
+        cell['win_rate'] = tally['wins'] / battles
+        cell['interval'] = wilson_interval(tally['wins'], battles)
+        cell['average_turns'] = tally['turns'] / battles
+    return cells, len(missing)
+
+
+def format_matrix(world, cells):
+    """ Renders one win rate matrix per level, with players as rows and enemies as columns. """
+    names = [species['name'] for species in world.species]
+    width = max([len(name) for name in names] + [6]) + 1
+    by_cell = {(cell['level'], cell['player'], cell['enemy'])
+                : cell for cell in cells}
+
+    lines = []
+    for level in sorted({cell['level'] for cell in cells}):
+        lines.append(f'LVL:{level}')
+        lines.append(''.rjust(width) + ''.join(name.rjust(width)
+                     for name in names))
+        for player in names:
+            lines.append(player.rjust(width) + ''.join(
+                f"{by_cell[(level, player, enemy)]['win_rate']:.3f}".rjust(width) for enemy in names))
+        lines.append('')
+    return lines
@@ -0,0 +1,200 @@
+"""
+Many Auto-Quest games stepped in lockstep.
+
+Each step takes one decision per game and returns numpy arrays of observations,
+legal choice masks, rewards and done flags, plus an info dict with the last
+observation of every game that finished. Finished games are reset right away
+with a fresh engine derived from the seed, the game's slot and its episode count.
+
+With the numpy engine, battle turns of every game in a battle are resolved together
+on the kernel's arrays, with one engine for all of them, and only the games whose
+battles ended go back through their QuestEnv. The characters of games still fighting,
+conditions included, are brought up to date whenever decisions() is asked for. With
+the reference engine every decision goes through the game's own QuestEnv, so each game
+plays out exactly like a QuestEnv seeded the same way.
+
+Masks are as wide as the most choices any game can have: the starters, the explore and
+encounter choices, or the biggest learnset in the world.
+"""
+import numpy as np
+
+from env import BATTLE, DONE, DROP, ENCOUNTER, ENCOUNTER_CHOICES, EXPLORE, EXPLORE_CHOICES, STARTER, QuestEnv
+from kernel import ENEMY_SIDE, PLAYER_SIDE, ActionArrays, BattleBatch
+from logic import decision
+from rng import derive_rng, derive_seed, new_seed
+from simulator import ENGINES, NUMPY_ENGINE
+from world import STARTER_COUNT
+
+PHASES = [STARTER, BATTLE, DROP, EXPLORE, ENCOUNTER, DONE]
+PHASE_IDS = {phase: i for i, phase in enumerate(PHASES)}
+CHARACTER_FEATURES = ['level', 'health', 'max_health',
+                      'strength', 'smarts', 'speed', 'defend']
+FEATURES = ['phase', 'battles', 'turn'] + \
+    [f'player_{feature}' for feature in CHARACTER_FEATURES] + \
+    [f'enemy_{feature}' for feature in CHARACTER_FEATURES]
+TURN = FEATURES.index('turn')
+PLAYER_HEALTH = FEATURES.index('player_health')
+ENEMY_HEALTH = FEATURES.index('enemy_health')
+DEFENDING = [FEATURES.index('player_defend'), FEATURES.index('enemy_defend')]
+
+
+def _encode_character(row, offset, character):
+    if character is None:
+        row[offset:offset + len(CHARACTER_FEATURES)] = 0
+        return
+    row[offset] = character.level
+    row[offset + 1] = character.health
+    row[offset + 2] = character.max_health
+    row[offset + 3] = character.strength
+    row[offset + 4] = character.smarts
+    row[offset + 5] = character.speed
+    row[offset + 6] = character.has_condition('defend')
+
+
+def encode_observation(env, row=None):
+    """ Writes a QuestEnv's observation into a row of features, a new one if none is given. """
+    if row is None:
+        row = np.zeros(len(FEATURES), dtype=np.int64)
+    row[0] = PHASE_IDS[env.phase]
+    row[1] = env.battles
+    row[2] = env.turn
+    _encode_character(row, 3, env.player)
+    _encode_character(row, 3 + len(CHARACTER_FEATURES), env.enemy)
+    return row
+
+
+def most_choices(world):
+    """ The most choices a game in the world can have. """
+    # a character can't know more actions than its species learns
+    return max([STARTER_COUNT, len(EXPLORE_CHOICES), len(ENCOUNTER_CHOICES)] +
+               [len(species['actions']) for species in world.species])
+
+
+class VectorQuestEnv:
+    def __init__(self, world, count, seed=None, name=None, max_choices=None, engine=NUMPY_ENGINE):
+        """ Games in a world, with masks max_choices wide, or most_choices(world) by default. """
+        if engine not in ENGINES:
+            raise ValueError(f'unknown engine {engine}')
+        self.world = world
+        self.count = count
+        self.seed = seed if seed is not None else new_seed()
+        self.name = name
+        self.max_choices = max_choices if max_choices is not None else most_choices(world)
+        self.engine = engine
+        self.envs = [QuestEnv(world) for _ in range(count)]
+        self.episodes = np.zeros(count, dtype=np.int64)
+        self.battles = None
+        if engine == NUMPY_ENGINE:
+            self.battles = BattleBatch(ActionArrays(world.table), [None] * count, [None] * count)
+            self.battle_rng = np.random.default_rng(derive_seed(self.seed, 'battles'))
+
+        self.observations = np.zeros((count, len(FEATURES)), dtype=np.int64)
+        self.masks = np.zeros((count, self.max_choices), dtype=bool)
+
+    def _reset_game(self, i):
+        env = self.envs[i]
+        env.rng = derive_rng(self.seed, i, int(self.episodes[i]))
+        env.reset(self.name)
+
+    def _encode(self, i):
+        env = self.envs[i]
+        encode_observation(env, self.observations[i])
+
+        choices = env.choice_count()
+        if choices > self.max_choices:
+            raise ValueError(
+                f'{choices} choices do not fit in {self.max_choices}')
+        self.masks[i] = False
+        self.masks[i, :choices] = True
+
+    def reset(self):
+        """ Starts every game over and returns the (observations, masks) arrays. """
+        for i in range(self.count):
+            self._reset_game(i)
+            self._encode(i)
+        return self.observations.copy(), self.masks.copy()
+
+    def _sync(self, rows):
+        # copy what the battle arrays know back into the characters
+        battles = self.battles
+        for i, (player, enemy), (player_bits, enemy_bits), turns in zip(
+                rows.tolist(), battles.health[rows].tolist(), battles.conditions[rows].tolist(),
+                battles.turns[rows].tolist()):
+            env = self.envs[i]
+            env.player.health = player
+            env.enemy.health = enemy
+            # defend never lasts past the end of a turn
+            env.player.condition_bits = player_bits
+            env.enemy.condition_bits = enemy_bits
+            env.turn = turns + 1 if player > 0 and enemy > 0 else turns
+
+    def _battle_turns(self, rows, picks):
+        """ Resolves a turn of the battles in rows and returns the rows whose battles ended. """
+        battles = self.battles
+        if ((picks < 0) | (picks >= battles.action_count[rows, PLAYER_SIDE])).any():
+            raise ValueError('a choice is not legal')
+        enemy_picks = (self.battle_rng.random(len(rows)) *
+                       battles.action_count[rows, ENEMY_SIDE]).astype(np.int64)
+        battles.turn(rows, np.stack([picks, enemy_picks], axis=1), self.battle_rng)
+
+        ongoing = battles.active[rows]
+        fighting = rows[ongoing]
+        self.observations[fighting, TURN] = battles.turns[fighting] + 1
+        self.observations[fighting, PLAYER_HEALTH] = battles.health[fighting, PLAYER_SIDE]
+        self.observations[fighting, ENEMY_HEALTH] = battles.health[fighting, ENEMY_SIDE]
+        self.observations[fighting[:, None], DEFENDING] = 0
+        return rows[~ongoing]
+
+    def step(self, choices):
+        """
+        Makes one decision per game and returns (observations, masks, rewards, dones, info).
+
+        info['final_observations'] holds the last observation of each game that finished, before it was reset.
+        """
+        choices = np.asarray(choices)
+        if choices.shape != (self.count,):
+            raise ValueError(f'expected {self.count} choices')
+
+        rewards = np.zeros(self.count, dtype=np.float64)
+        dones = np.zeros(self.count, dtype=bool)
+        final_observations = np.zeros_like(self.observations)
+        # only the numpy engine takes battle turns off the games
+        battling = self.observations[:, 0] == PHASE_IDS[BATTLE]
+        if self.battles is None:
+            battling[:] = False
+        rows = np.flatnonzero(battling)
+        ended = rows
+        if len(rows):
+            ended = self._battle_turns(rows, choices[rows])
+            self._sync(ended)
+
+        for i in np.concatenate([np.flatnonzero(~battling), ended]).tolist():
+            env = self.envs[i]
+            if battling[i]:
+                rewards[i] = env.end_turn()
+            else:
+                rewards[i] = env.advance(int(choices[i]))
+            self._encode(i)
+            if env.done:
+                dones[i] = True
+                final_observations[i] = self.observations[i]
+                self.episodes[i] += 1
+                self._reset_game(i)
+                self._encode(i)
+            elif env.phase == BATTLE and not battling[i] and self.battles is not None:
+                self.battles.load(i, env.player, env.enemy)
+        info = {'final_observations': final_observations}
+        return self.observations.copy(), self.masks.copy(), rewards, dones, info
+
+    def decisions(self):
+        """ The pending decision of every game, in the format choose_batch takes. """
+        if self.battles is not None:
+            self._sync(np.flatnonzero(self.observations[:, 0] == PHASE_IDS[BATTLE]))
+        return [decision(env.legal_actions(), env.player, env.enemy) for env in self.envs]
+
+    def sample_choices(self, rng=None):
+        """ Picks a uniformly random legal choice for every game. """
+        if rng is None:
+            rng = np.random.default_rng()
+        counts = self.masks.sum(axis=1)
+        return (rng.random(self.count) * counts).astype(np.int64)
@@ -0,0 +1,35 @@
+"""
+Process pools with shared per-process state.
+
+A pool is created with the object its tasks all need, usually the world, which every
+worker receives once when it starts instead of with every task. Tasks reach it through
+shared_state(), and anything a worker builds from it, like loaded logics, goes in
+worker_cache() so it's built once per worker.
+"""
+import os
+
+from multiprocessing import Pool
+
+_shared = None
+_cache = {}
+
+
+def _init_worker(shared):
+    global _shared
+    _shared = shared
+    _cache.clear()
+
+
+def create_pool(shared, processes=None):
+    """ A process pool whose workers can all reach shared. """
+    return Pool(processes or os.cpu_count(), initializer=_init_worker, initargs=(shared,))
+
+
+def shared_state():
+    """ What this worker's pool was created with. """
+    return _shared
+
+
+def worker_cache():
+    """ A dict for what this worker builds from its shared state. """
+    return _cache
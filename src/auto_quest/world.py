@@ -1,23 +1,152 @@
-from random import randint
+import json
+import random
 
-from character import new_character
+from collections.abc import Sequence
+
+from action import Action
+from character import Character, LevelTable, new_character
+from compiled import ActionTable
+from encounters import ENCOUNTER_KEYS, EncounterIndex
 
 STARTER_COUNT = 3
 
 
+def load_world(world_file):
+    """ Reads a world from its json file. """
+    with open(world_file, 'rb') as f:
+        return parse_world(f.read())
+
+
+def parse_world(data):
+    """ Builds a world from the contents of a json world file. """
+    world_dict = json.loads(data)
+    return World(
+        species=SpeciesList(world_dict['species']),
+        actions={action.name: action for action in map(
+            Action.from_dict, world_dict['actions'])}
+    )
+
+
+def species_record(species):
+    """ A species from its json world file form. """
+    record = {
+        'name': species['name'],
+        'attributes': species['attributes'],
+        # TODO: json can't have dicts of ints -> obj
+        'actions': {int(k): v for k, v in species['actions'].items()}
+    }
+    for key in ENCOUNTER_KEYS:
+        if key in species:
+            record[key] = species[key]
+    return record
+
+
+def world_to_dict(world):
+    """ The json world file form of a world. """
+    species_dicts = []
+    for species in world.species:
+        species_dict = {
+            'name': species['name'],
+            'attributes': species['attributes'],
+            'actions': {str(level): action for level, action in species['actions'].items()},
+        }
+        for key in ENCOUNTER_KEYS:
+            if key in species:
+                species_dict[key] = species[key]
+        species_dicts.append(species_dict)
+    return {
+        'species': species_dicts,
+        'actions': [action.to_dict() for action in world.actions.values()],
+    }
+
+
+class SpeciesList(Sequence):
+    def __init__(self, records):
+        """ Species in their json form, each turned into a species the first time it's used. """
+        self.records = records
+        self._species = [None] * len(records)
+
+    def __len__(self):
+        return len(self.records)
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self[i] for i in range(*index.indices(len(self)))]
+        species = self._species[index]
+        if species is None:
+            species = self._species[index] = self._record(index)
+        return species
+
+    def _record(self, index):
+        return species_record(self.records[index])
+
+    def __eq__(self, other):
+        return isinstance(other, Sequence) and list(self) == list(other)
+
+    def encounter_index(self):
+        return EncounterIndex(self.records)
+
+
 class World:
     def __init__(self, species, actions):
         self.species = species
         self.actions = actions
+        self._table = None
+        self._encounters = None
+        self._level_tables = {}
+
+    @property
+    def table(self):
+        """ The compiled actions, built on first use. """
+        if self._table is None:
+            self._table = ActionTable(self.actions)
+        return self._table
+
+    @property
+    def encounters(self):
+        """ The encounter index, built on first use. """
+        if self._encounters is None:
+            if isinstance(self.species, SpeciesList):
+                self._encounters = self.species.encounter_index()
+            else:
+                self._encounters = EncounterIndex(self.species)
+        return self._encounters
+
+    def create_starters(self, rng=random):
+        return [self.species[species] for species in self.encounters.pick_starters(STARTER_COUNT, rng)]
+
+    def level_table(self, species):
+        """ The level table of a species, cached by name. """
+        table = self._level_tables.get(species['name'])
+        if table is None:
+            table = self._level_tables[species['name']] = LevelTable(species)
+        return table
+
+    def random_character(self, level, rng=random):
+        species = self.species[self.encounters.encounter(level, rng)]
+        return new_character(species, level=level, table=self.level_table(species))
+
+    def load_character(self, state):
+        """ Rebuilds a character from its character_state. """
+        species = self.find_species(state['species'])
+        return Character(
+            species,
+            {
+                'name': state['name'],
+                'attributes': {
+                    'health': state['max_health'],
+                    'strength': state['strength'],
+                    'smarts': state['smarts'],
+                    'speed': state['speed'],
+                },
+                'actions': state['actions'],
+                'experience': state['experience'],
+                'level': state['level'],
+            },
+            {'health': state['health'], 'conditions': state['conditions']},
+            table=self.level_table(species),
+        )
 
-    def create_starters(self):
-        starters = []
-        while len(starters) < STARTER_COUNT:
-            # TODO: find a way to provide a custom random engine
-            species = randint(0, len(self.species) - 1)
-            if species not in starters:
-                starters.append(species)
-        return [self.species[species] for species in starters]
-
-    def random_character(self, level):
-        return new_character(self.species[randint(0, len(self.species) - 1)], level=level)
+    def find_species(self, name):
+        """ Looks up a species by name. """
+        return self.species[self.encounters.find(name)]